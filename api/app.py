@@ -3,14 +3,17 @@ Flask API backend for Twitch Clips Scraper
 Exposes Python functionality as REST API endpoints
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 import os
 import sys
+import copy
+import hmac
 import json
 from datetime import datetime
 import threading
 import time
+from contextlib import nullcontext
 
 # Add parent directory to path to import modules
 sys.path.append('..')
@@ -21,72 +24,191 @@ from clip_scraper.excel_generator import create_clips_excel
 from highlight_scraper.highlights_getter import get_top_highlights_by_channel
 from highlight_scraper.excel_generator import create_highlights_excel
 from highlight_scraper.channel_config import get_preset, list_presets, DEFAULT_CONFIG
+from shared.sharding import MAX_SHARDS
+from shared.clip_registry import ClipRegistry
+from shared.clip_model import json_ready
+from shared.scoring import rank_clips, validate_scoring
+from shared.metrics import collect_request_metrics
+from shared.tracing import trace_run
+from shared.profiling import profile_run
+from shared.cancellation import JobCancelled, cancellable
+from api.monitoring import JOB_METRICS, READINESS, render_prometheus
+from api.job_store import ScrapingJob, RECORD_COLUMNS, get_job_store
+from api.job_queue import WORKER_TOKEN
+from api.scheduler import create_scheduler
+from api.batch import MAX_BATCH_CONFIGS, plan_batch, run_batch
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
 
-# Global state for tracking scraping jobs
-scraping_jobs = {}
-job_counter = 0
-
-class ScrapingJob:
-    def __init__(self, job_type, config):
-        global job_counter
-        job_counter += 1
-        self.id = job_counter
-        self.job_type = job_type  # 'top_clips' or 'channel_highlights'
-        self.config = config
-        self.status = 'pending'  # pending, running, completed, failed
-        self.progress = 0
-        self.result = None
-        self.error = None
-        self.created_at = datetime.now()
-        self.completed_at = None
-        self.output_file = None
-
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'job_type': self.job_type,
-            'config': self.config,
-            'status': self.status,
-            'progress': self.progress,
-            'result': self.result,
-            'error': self.error,
-            'created_at': self.created_at.isoformat(),
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'output_file': self.output_file
-        }
+# Where profile: true jobs write their CPU/memory profiles
+PROFILE_DIR = os.getenv("API_PROFILE_DIR", os.path.join('api_output', 'profiles'))
+
+# 'inline' runs jobs on threads of this process; 'worker' leaves them in the
+# shared job store for the job executors (api/worker.py)
+JOB_EXECUTION = os.getenv("API_JOB_EXECUTION", "inline")
+
+# Jobs of this server: in-process dict, or SQLite shared by all workers (API_JOB_STORE)
+job_store = get_job_store()
+if JOB_EXECUTION == 'worker' and not job_store.shared:
+    raise RuntimeError("API_JOB_EXECUTION=worker needs a shared job store; set API_JOB_STORE")
+
+def run_job_with_metrics(job_func, job):
+    """Run a job function while collecting its own Twitch API usage metrics, stage trace and profile"""
+    tracing = trace_run(f"{job.job_type} job {job.id}") if job.config.get('trace', True) else nullcontext()
+    profiling = profile_run(f"job_{job.id}_{job.job_type}", PROFILE_DIR) if job.config.get('profile') else nullcontext()
+    try:
+        with collect_request_metrics() as request_metrics, tracing as tracer, profiling as profile, \
+                cancellable(job.is_cancelled):
+            job.request_metrics = request_metrics
+            job.trace = tracer
+            job_func(job)
+    except JobCancelled:
+        job.status = 'cancelled'
+        job.error = 'Cancelled'
+    job.profile = profile  # Only filled in once profiling has stopped
+    
+    if not job.completed_at:
+        job.completed_at = datetime.now()
+    job.update()  # Final state, trace and profile in one write
+    JOB_METRICS.observe_job(job)
+
+def execute_job(job):
+    """Run a job that is in the job store (on an API thread or in a job executor)"""
+    if job.status == 'cancelled' or job.is_cancelled():
+        return  # Cancelled before it started
+    runner = JOB_RUNNERS[job.job_type]
+    run_job_with_metrics(runner, job)
+
+def submit_job(job):
+    """Store a new job and, in inline mode, start it on a background thread"""
+    job_store.add(job)
+    if JOB_EXECUTION == 'inline':
+        thread = threading.Thread(target=execute_job, args=(job,))
+        thread.daemon = True
+        thread.start()
+    return job
+
+def serve_prewarmed(job_type, config):
+    """Answer a scrape request from the latest fresh scheduled run: a new job, completed at once"""
+    run = scheduler.fresh_run(job_type, config) if scheduler else None
+    if run is None or not run.result:
+        return None
+    # Only the run's id is stored; the result is read from the run when served
+    job = job_store.add(ScrapingJob(job_type, dict(config, prewarmed_from=run.id)))
+    job.update(status='completed', progress=100, completed_at=datetime.now())
+    JOB_METRICS.observe_job(with_prewarmed_result(job, run))
+    return job
+
+def with_prewarmed_result(job, run=None):
+    """A prewarmed job as served: a copy carrying its scheduled run's result, or the job itself"""
+    run_id = job.config.get('prewarmed_from')
+    if run_id is None or job.result is not None:
+        return job
+    run = run or job_store.get(run_id)
+    if run is None or not run.result:
+        return job  # Run deleted meanwhile; the scheduler deletes the jobs it served too
+    served = copy.copy(job)
+    served.result = dict(run.result, prewarmed_from={'job_id': run.id, 'completed_at': run.completed_at.isoformat()})
+    return served
+
+
+def validate_top_clips_config(config):
+    """Error message for an invalid top clips config, None if it is valid"""
+    days_back = config.get('days_back', 1)
+    limit = config.get('limit', 150)
+    
+    if not isinstance(days_back, int) or days_back < 1 or days_back > 30:
+        return 'days_back must be between 1 and 30'
+    
+    if not isinstance(limit, int) or limit < 1 or limit > 500:
+        return 'limit must be between 1 and 500'
+    
+    shards = config.get('shards', 1)
+    if not isinstance(shards, int) or shards < 1 or shards > MAX_SHARDS:
+        return f'shards must be between 1 and {MAX_SHARDS}'
+    
+    if config.get('strategy', 'adaptive') not in ('adaptive', 'mixed'):
+        return "strategy must be 'adaptive' or 'mixed'"
+    
+    if config.get('sort', 'views') not in ('views', 'trending'):
+        return "sort must be 'views' or 'trending'"
+    
+    if not isinstance(config.get('cluster', False), bool):
+        return 'cluster must be true or false'
+    return validate_scoring(config.get('scoring'))
+
+def validate_channel_highlights_config(config):
+    """Error message for an invalid channel highlights config, None if it is valid"""
+    channels = config.get('channels', [])
+    if not channels or not isinstance(channels, list):
+        return 'channels must be a non-empty list'
+    
+    days_back = config.get('days_back', 7)
+    clips_per_channel = config.get('clips_per_channel', 10)
+    
+    if not isinstance(days_back, int) or days_back < 1 or days_back > 30:
+        return 'days_back must be between 1 and 30'
+    
+    if not isinstance(clips_per_channel, int) or clips_per_channel < 1 or clips_per_channel > 100:
+        return 'clips_per_channel must be between 1 and 100'
+    
+    shards = config.get('shards', 1)
+    if not isinstance(shards, int) or shards < 1 or shards > MAX_SHARDS:
+        return f'shards must be between 1 and {MAX_SHARDS}'
+    
+    if not isinstance(config.get('cluster', False), bool):
+        return 'cluster must be true or false'
+    return validate_scoring(config.get('scoring'))
+
+CONFIG_VALIDATORS = {
+    'top_clips': validate_top_clips_config,
+    'channel_highlights': validate_channel_highlights_config
+}
 
 def run_top_clips_job(job):
     """Run top clips scraping job in background thread"""
     try:
-        job.status = 'running'
-        job.progress = 10
+        job.update(status='running', progress=10)
         
         # Get authentication token
         token = get_twitch_token()
-        job.progress = 20
+        job.update(progress=20)
         
         # Extract config
         days_back = job.config.get('days_back', 1)
         limit = job.config.get('limit', 150)
         english_only = job.config.get('english_only', True)
         game_filter = job.config.get('game_filter', None)
+        incremental = job.config.get('incremental', False)
+        segment_cache = job.config.get('segment_cache', False)
+        shards = job.config.get('shards', 1)
+        strategy = job.config.get('strategy', 'adaptive')
+        sort = job.config.get('sort', 'views')
+        scoring = job.config.get('scoring')
+        cluster = job.config.get('cluster', False)
         
-        job.progress = 30
+        job.update(progress=30)
         
         # Get clips
+        registry = ClipRegistry()
         clips = get_top_clips(
             token=token,
             days_back=days_back,
             limit=limit,
-            strategy='mixed',
+            strategy=strategy,
             english_only=english_only,
-            game_filter=game_filter
+            game_filter=game_filter,
+            incremental=incremental,
+            segment_cache=segment_cache,
+            shards=shards,
+            registry=registry,
+            sort=sort,
+            scoring=scoring,
+            cluster=cluster
         )
         
-        job.progress = 80
+        job.update(progress=80)
         
         if not clips:
             job.status = 'failed'
@@ -100,7 +222,8 @@ def run_top_clips_job(job):
             'total_clips': len(clips),
             'clips': clips,  # Return all clips data
             'top_clip': clips[0] if clips else None,
-            'game_breakdown': {}
+            'game_breakdown': {},
+            'dedup': registry.report()
         }
         
         # Calculate game breakdown
@@ -120,29 +243,40 @@ def run_top_clips_job(job):
 def run_channel_highlights_job(job):
     """Run channel highlights scraping job in background thread"""
     try:
-        job.status = 'running'
-        job.progress = 10
+        job.update(status='running', progress=10)
         
         # Get authentication token
         token = get_twitch_token()
-        job.progress = 20
+        job.update(progress=20)
         
         # Extract config
         channels = job.config.get('channels', [])
         days_back = job.config.get('days_back', 7)
         clips_per_channel = job.config.get('clips_per_channel', 10)
+        incremental = job.config.get('incremental', False)
+        segment_cache = job.config.get('segment_cache', False)
+        shards = job.config.get('shards', 1)
+        scoring = job.config.get('scoring')
+        cluster = job.config.get('cluster', False)
         
-        job.progress = 30
+        job.update(progress=30)
         
         # Get highlights
+        registry = ClipRegistry()
         highlights_data = get_top_highlights_by_channel(
             token,
             channels,
             days_back=days_back,
-            clips_per_channel=clips_per_channel
+            clips_per_channel=clips_per_channel,
+            incremental=incremental,
+            segment_cache=segment_cache,
+            shards=shards,
+            registry=registry,
+            scoring=scoring,
+            cluster=cluster
         )
         
-        job.progress = 80
+        job.update(progress=80)
         
         total_clips = sum(len(clips) for clips in highlights_data.values())
         if total_clips == 0:
@@ -154,21 +288,19 @@ def run_channel_highlights_job(job):
         job.status = 'completed'
         job.progress = 100
         
-        # Flatten all clips into a single list for display
+        # Merge every channel's clips into one list ranked by views (or the job's scoring) for display
         all_clips = []
         for channel, clips in highlights_data.items():
             for clip in clips:
                 clip['channel_name'] = channel
                 all_clips.append(clip)
         
-        # Sort by view count
-        all_clips.sort(key=lambda x: x.get('view_count', 0), reverse=True)
-        
         job.result = {
             'total_clips': total_clips,
-            'clips': all_clips,  # Return all clips data
+            'clips': rank_clips(all_clips, scoring=scoring),  # Return all clips data
             'channels': {channel: len(clips) for channel, clips in highlights_data.items()},
-            'highlights_data': highlights_data
+            'highlights_data': highlights_data,
+            'dedup': registry.report()
         }
         job.completed_at = datetime.now()
         
@@ -177,26 +309,75 @@ def run_channel_highlights_job(job):
         job.error = str(e)
         job.completed_at = datetime.now()
 
+def run_batch_job(job):
+    """Run a batch of top clips / channel highlights configs with their shared work done once"""
+    try:
+        job.update(status='running', progress=10)
+        
+        segment_cache = job.config.get('segment_cache', False)
+        plan = plan_batch(job.config['configs'])
+        
+        def progress(done, steps):
+            job.update(progress=10 + 80 * done // steps)
+        
+        results, summary = run_batch(plan, segment_cache=segment_cache, progress=progress)
+        
+        total_clips = sum(result['total_clips'] for result in results)
+        if total_clips == 0:
+            job.status = 'failed'
+            job.error = 'No clips found for any config'
+            return
+        
+        job.status = 'completed'
+        job.progress = 100
+        job.result = {
+            'total_clips': total_clips,
+            'configs': results,
+            'plan': summary
+        }
+        job.completed_at = datetime.now()
+        
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+        job.completed_at = datetime.now()
+
+JOB_RUNNERS = {
+    'top_clips': run_top_clips_job,
+    'channel_highlights': run_channel_highlights_job,
+    'batch': run_batch_job
+}
+
+# Re-runs popular scrapes in the background so matching requests are answered at once
+scheduler = create_scheduler(job_store, submit_job)
+
 # API Routes
 
+@app.before_request
+def start_scheduler():
+    """Start scheduling in processes that actually serve requests (not the reloader or job executors)"""
+    if scheduler:
+        scheduler.start()
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the process is up and serving, no external calls"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/api/health/ready', methods=['GET'])
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    try:
-        # Validate environment
-        env_valid = validate_environment()
-        if not env_valid:
-            return jsonify({'status': 'error', 'message': 'Environment not configured'}), 500
-        
-        # Test authentication
-        token = get_twitch_token()
-        return jsonify({
-            'status': 'healthy',
-            'message': 'API is running',
-            'auth_status': 'valid' if token else 'invalid'
-        })
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    """Readiness probe: environment and Twitch auth, cached so probes don't spend our token budget"""
+    result = READINESS.check()
+    status_code = 200 if result['status'] == 'healthy' else 500
+    return jsonify(result), status_code
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus-style metrics for jobs, Twitch API usage, caches and memory"""
+    totals = job_store.metrics_totals()
+    return Response(render_prometheus(job_store.list(with_results=False), totals),
+                    mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/presets', methods=['GET'])
 def get_presets():
@@ -216,31 +397,31 @@ def get_preset_config(preset_name):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/schedules', methods=['GET'])
+def get_schedules():
+    """Recurring scrapes, when they run next and their latest result"""
+    if not scheduler:
+        return jsonify({'error': 'Scheduler is disabled'}), 404
+    return jsonify(scheduler.status())
+
 @app.route('/api/scrape/top-clips', methods=['POST'])
 def start_top_clips_scrape():
     """Start top clips scraping job"""
     try:
         config = request.json or {}
+        config.pop('schedule', None)  # Reserved for the scheduler's own jobs
+        config.pop('prewarmed_from', None)  # Set by serve_prewarmed only
         
-        # Validate config
-        days_back = config.get('days_back', 1)
-        limit = config.get('limit', 150)
-        english_only = config.get('english_only', True)
+        error = validate_top_clips_config(config)
+        if error:
+            return jsonify({'error': error}), 400
         
-        if not isinstance(days_back, int) or days_back < 1 or days_back > 30:
-            return jsonify({'error': 'days_back must be between 1 and 30'}), 400
+        job = serve_prewarmed('top_clips', config)
+        if job:
+            return jsonify({'job_id': job.id, 'status': 'completed', 'prewarmed': True})
         
-        if not isinstance(limit, int) or limit < 1 or limit > 500:
-            return jsonify({'error': 'limit must be between 1 and 500'}), 400
-        
-        # Create job
-        job = ScrapingJob('top_clips', config)
-        scraping_jobs[job.id] = job
-        
-        # Start background thread
-        thread = threading.Thread(target=run_top_clips_job, args=(job,))
-        thread.daemon = True
-        thread.start()
+        # Create job (started here or picked up by a job executor)
+        job = submit_job(ScrapingJob('top_clips', config))
         
         return jsonify({'job_id': job.id, 'status': 'started'})
         
@@ -252,29 +433,52 @@ def start_channel_highlights_scrape():
     """Start channel highlights scraping job"""
     try:
         config = request.json or {}
+        config.pop('schedule', None)  # Reserved for the scheduler's own jobs
+        config.pop('prewarmed_from', None)  # Set by serve_prewarmed only
         
-        # Validate config
-        channels = config.get('channels', [])
-        if not channels or not isinstance(channels, list):
-            return jsonify({'error': 'channels must be a non-empty list'}), 400
-        
-        days_back = config.get('days_back', 7)
-        clips_per_channel = config.get('clips_per_channel', 10)
+        error = validate_channel_highlights_config(config)
+        if error:
+            return jsonify({'error': error}), 400
         
-        if not isinstance(days_back, int) or days_back < 1 or days_back > 30:
-            return jsonify({'error': 'days_back must be between 1 and 30'}), 400
+        job = serve_prewarmed('channel_highlights', config)
+        if job:
+            return jsonify({'job_id': job.id, 'status': 'completed', 'prewarmed': True})
         
-        if not isinstance(clips_per_channel, int) or clips_per_channel < 1 or clips_per_channel > 100:
-            return jsonify({'error': 'clips_per_channel must be between 1 and 100'}), 400
+        # Create job (started here or picked up by a job executor)
+        job = submit_job(ScrapingJob('channel_highlights', config))
         
-        # Create job
-        job = ScrapingJob('channel_highlights', config)
-        scraping_jobs[job.id] = job
+        return jsonify({'job_id': job.id, 'status': 'started'})
         
-        # Start background thread
-        thread = threading.Thread(target=run_channel_highlights_job, args=(job,))
-        thread.daemon = True
-        thread.start()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scrape/batch', methods=['POST'])
+def start_batch_scrape():
+    """Start one job for many top clips / channel highlights configs, fetching shared work once"""
+    try:
+        body = request.json or {}
+        configs = body.get('configs')
+        if not configs or not isinstance(configs, list):
+            return jsonify({'error': 'configs must be a non-empty list'}), 400
+        
+        if len(configs) > MAX_BATCH_CONFIGS:
+            return jsonify({'error': f'A batch takes at most {MAX_BATCH_CONFIGS} configs'}), 400
+        
+        for i, config in enumerate(configs):
+            if not isinstance(config, dict) or config.get('type') not in CONFIG_VALIDATORS:
+                return jsonify({'error': f"configs[{i}].type must be 'top_clips' or 'channel_highlights'"}), 400
+            if config.get('incremental'):
+                return jsonify({'error': f'configs[{i}]: incremental runs are not supported in a batch'}), 400
+            error = CONFIG_VALIDATORS[config['type']](config)
+            if error:
+                return jsonify({'error': f'configs[{i}]: {error}'}), 400
+        
+        job = submit_job(ScrapingJob('batch', {
+            'configs': configs,
+            'segment_cache': body.get('segment_cache', False),
+            'trace': body.get('trace', True),
+            'profile': body.get('profile', False)
+        }))
         
         return jsonify({'job_id': job.id, 'status': 'started'})
         
@@ -284,45 +488,149 @@ def start_channel_highlights_scrape():
 @app.route('/api/jobs/<int:job_id>', methods=['GET'])
 def get_job_status(job_id):
     """Get job status and progress"""
-    if job_id not in scraping_jobs:
+    job = job_store.get(job_id)
+    if job is None:
         return jsonify({'error': 'Job not found'}), 404
     
-    job = scraping_jobs[job_id]
-    return jsonify(job.to_dict())
+    return jsonify(with_prewarmed_result(job).to_dict())
 
 @app.route('/api/jobs', methods=['GET'])
 def list_jobs():
     """List all jobs"""
-    jobs = [job.to_dict() for job in scraping_jobs.values()]
+    jobs = [with_prewarmed_result(job).to_dict() for job in job_store.list()]
     return jsonify({'jobs': jobs})
 
 @app.route('/api/jobs/<int:job_id>/clips', methods=['GET'])
 def get_job_clips(job_id):
     """Get clips data from a completed job"""
-    if job_id not in scraping_jobs:
+    job = job_store.get(job_id)
+    if job is None:
         return jsonify({'error': 'Job not found'}), 404
+    job = with_prewarmed_result(job)
     
-    job = scraping_jobs[job_id]
     if job.status != 'completed' or not job.result:
         return jsonify({'error': 'Job not completed or no results available'}), 400
     
+    # Batch jobs: ?config=i picks one config's results
+    result = job.result
+    if job.job_type == 'batch':
+        index = request.args.get('config', type=int)
+        if index is None or not 0 <= index < len(result['configs']):
+            return jsonify({'error': f"config must be between 0 and {len(result['configs']) - 1}"}), 400
+        result = result['configs'][index]
+    
     return jsonify({
         'job_id': job_id,
-        'clips': job.result.get('clips', []),
-        'total_clips': job.result.get('total_clips', 0),
-        'game_breakdown': job.result.get('game_breakdown', {}),
-        'channels': job.result.get('channels', {})
+        'clips': json_ready(result.get('clips', [])),
+        'total_clips': result.get('total_clips', 0),
+        'game_breakdown': result.get('game_breakdown', {}),
+        'channels': result.get('channels', {})
     })
 
+@app.route('/api/jobs/<int:job_id>/trace', methods=['GET'])
+def get_job_trace(job_id):
+    """Get the stage timeline of a job (?format=chrome for Chrome trace-event JSON)"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if not job.config.get('trace', True):
+        return jsonify({'error': 'Tracing was not enabled for this job'}), 404
+    trace = job.trace_timeline()
+    if trace is None:
+        # Only the process running a job holds its live trace; the store gets it at the end
+        return jsonify({'error': 'Trace is available once the job finishes'}), 400
+    
+    if request.args.get('format') == 'chrome':
+        response = jsonify(job.chrome_trace())
+        response.headers['Content-Disposition'] = f'attachment; filename=job_{job_id}_trace.json'
+        return response
+    
+    trace['job_id'] = job_id
+    return jsonify(trace)
+
+@app.route('/api/jobs/<int:job_id>/profile', methods=['GET'])
+def get_job_profile(job_id):
+    """Get the hot functions and peak memory of a job run with profile: true"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if not job.config.get('profile'):
+        return jsonify({'error': 'Profiling was not enabled for this job'}), 404
+    profile = job.profile_summary()
+    if not profile:
+        return jsonify({'error': 'Profile is available once the job finishes'}), 400
+    
+    profile['job_id'] = job_id
+    return jsonify(profile)
+
 @app.route('/api/jobs/<int:job_id>', methods=['DELETE'])
 def delete_job(job_id):
-    """Delete a job"""
-    if job_id not in scraping_jobs:
+    """Delete a job (a running job is stopped at its next Twitch API call)"""
+    if not job_store.delete(job_id):
         return jsonify({'error': 'Job not found'}), 404
     
-    del scraping_jobs[job_id]
     return jsonify({'message': 'Job deleted'})
 
+@app.route('/api/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a pending or running job; running jobs stop at their next Twitch API call"""
+    status = job_store.request_cancel(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if status not in ('pending', 'running', 'cancelled'):
+        return jsonify({'error': f'Job already {status}'}), 400
+    
+    return jsonify({'job_id': job_id, 'status': status})
+
+# Job queue for executors on other machines (api/worker.py with API_QUEUE_URL).
+# Only served in worker mode and with API_WORKER_TOKEN set.
+
+def _queue_enabled():
+    token = request.headers.get('X-Worker-Token', '')
+    return JOB_EXECUTION == 'worker' and bool(WORKER_TOKEN) and hmac.compare_digest(token, WORKER_TOKEN)
+
+@app.route('/api/queue/claim', methods=['POST'])
+def queue_claim():
+    """Lease the next job to a remote executor (204 when there is none)"""
+    if not _queue_enabled():
+        return jsonify({'error': 'Not found'}), 404
+    
+    worker = (request.json or {}).get('worker')
+    if not worker:
+        return jsonify({'error': 'worker is required'}), 400
+    
+    job = job_store.claim(worker)
+    if job is None:
+        return '', 204
+    return jsonify({'job': {'id': job.id, 'job_type': job.job_type, 'config': job.config, 'attempts': job.attempts}})
+
+@app.route('/api/queue/<int:job_id>/heartbeat', methods=['POST'])
+def queue_heartbeat(job_id):
+    """Renew a remote executor's lease; continue: false tells it to stop the job"""
+    if not _queue_enabled():
+        return jsonify({'error': 'Not found'}), 404
+    
+    return jsonify({'continue': job_store.heartbeat(job_id, (request.json or {}).get('worker'))})
+
+@app.route('/api/queue/<int:job_id>', methods=['PUT'])
+def queue_upload(job_id):
+    """Store progress or results uploaded by the executor holding the job's lease"""
+    if not _queue_enabled():
+        return jsonify({'error': 'Not found'}), 404
+    
+    payload = request.json or {}
+    record = payload.get('record') or {}
+    if not isinstance(record, dict) or set(record) - set(RECORD_COLUMNS):
+        return jsonify({'error': f'record may only contain {", ".join(RECORD_COLUMNS)}'}), 400
+    
+    if not job_store.save_record(job_id, payload.get('worker'), record):
+        if job_store.get(job_id) is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify({'error': 'Lease is held by another worker'}), 409
+    return jsonify({'saved': True})
+
 if __name__ == '__main__':
     # Validate environment before starting
     if not validate_environment():
@@ -0,0 +1,163 @@
+"""
+Batch scrapes: many top-clips and highlights configs planned as one
+Every channel is fetched once per window (days_back) the configs ask of
+it, and top-clips configs that only differ in limit share one run at the
+largest limit. Game and user lookups are shared through the response cache.
+Each config's output is then sliced out of the shared results: the best
+clips, up to its limit.
+"""
+
+import json
+from datetime import datetime
+
+from shared.clip_registry import ClipRegistry, canonical_work_key
+from shared.clip_model import Clip
+from shared.scoring import rank_clips, uses_scoring
+from shared.clustering import keep_best_per_moment
+from clip_scraper.clips_getter import get_top_clips
+from highlight_scraper.highlights_getter import get_channel_clips
+
+MAX_BATCH_CONFIGS = 20
+
+# Clips fetched per channel and window; the Helix page maximum costs the same
+# one call as a smaller page and serves every clips_per_channel up to it
+CHANNEL_FETCH_LIMIT = 100
+
+CONFIG_DEFAULTS = {
+    'top_clips': {'days_back': 1, 'limit': 150, 'english_only': True, 'game_filter': None, 'strategy': 'adaptive',
+                  'sort': 'views', 'scoring': None, 'cluster': False},
+    'channel_highlights': {'days_back': 7, 'clips_per_channel': 10, 'scoring': None, 'cluster': False}
+}
+
+
+def plan_batch(configs):
+    """
+    Group configs into shared work.
+    configs: [{'type': 'top_clips' | 'channel_highlights', ...settings}]
+    """
+    # A wider window spreads each game's allocation over more days, so its top list
+    # isn't a superset of a narrower one's: only configs with the same days_back share a run
+    top_clips_runs = {}  # (days_back, strategy, english_only, game_filter, sort, scoring, cluster) -> run settings
+    # Likewise a channel's top 100 over 30 days can hold few or none of its best clips of
+    # the last day, so each channel is fetched once per distinct days_back
+    channels = {}        # (canonical login, days_back) -> {'name', 'days_back', 'shards'}
+
+    for index, config in enumerate(configs):
+        settings = dict(CONFIG_DEFAULTS[config['type']], **config)
+        if config['type'] == 'top_clips':
+            key = (settings['days_back'], settings['strategy'], bool(settings['english_only']), settings['game_filter'],
+                   settings['sort'], json.dumps(settings['scoring'], sort_keys=True), settings['cluster'])
+            run = top_clips_runs.setdefault(key, {'limit': 0, 'shards': 1, 'configs': []})
+            run['limit'] = max(run['limit'], settings['limit'])
+            run['shards'] = max(run['shards'], settings.get('shards', 1))
+            run['configs'].append(index)
+        else:
+            for channel in settings['channels']:
+                key = (canonical_work_key('channel', channel)[1], settings['days_back'])
+                entry = channels.setdefault(key, {'name': channel, 'days_back': settings['days_back'], 'shards': 1})
+                entry['shards'] = max(entry['shards'], settings.get('shards', 1))
+
+    return {
+        'configs': configs,
+        'top_clips_runs': [dict(run, days_back=key[0], strategy=key[1], english_only=key[2], game_filter=key[3],
+                                sort=key[4], scoring=json.loads(key[5]), cluster=key[6])
+                           for key, run in top_clips_runs.items()],
+        'channels': channels
+    }
+
+
+def _slice(clips, limit, now, scoring=None, cluster=False):
+    """
+    Best `limit` clips of a shared fetch. Plain clips are already best
+    first; scored or clustered clips are copied, since other configs may
+    score or cluster the same clips differently.
+    """
+    if not (uses_scoring(scoring) or cluster):
+        return clips[:limit]
+    clips = [Clip.from_helix(clip.to_dict()) for clip in clips]
+    if cluster:
+        return keep_best_per_moment(rank_clips(clips, scoring=scoring, now=now), limit)
+    return rank_clips(clips, limit, scoring, now)
+
+
+def _top_clips_result(clips):
+    game_counts = {}
+    for clip in clips:
+        game = clip.get('game_name', 'Unknown')
+        game_counts[game] = game_counts.get(game, 0) + 1
+    return {
+        'total_clips': len(clips),
+        'clips': clips,
+        'top_clip': clips[0] if clips else None,
+        'game_breakdown': dict(sorted(game_counts.items(), key=lambda x: x[1], reverse=True))
+    }
+
+
+def _highlights_result(highlights_data, scoring=None):
+    all_clips = [clip for clips in highlights_data.values() for clip in clips]
+    return {
+        'total_clips': len(all_clips),
+        'clips': rank_clips(all_clips, scoring=scoring),
+        'channels': {channel: len(clips) for channel, clips in highlights_data.items()},
+        'highlights_data': highlights_data
+    }
+
+
+def run_batch(plan, segment_cache=False, progress=None):
+    """Run a plan_batch() plan once; returns (per-config results, summary of the shared work)"""
+    configs = plan['configs']
+    steps = len(plan['top_clips_runs']) + len(plan['channels'])
+    done = 0
+
+    def step():
+        nonlocal done
+        done += 1
+        if progress:
+            progress(done, steps)
+
+    top_clips = {}  # config index -> shared run's clips
+    for run in plan['top_clips_runs']:
+        try:
+            clips = get_top_clips(None, days_back=run['days_back'], limit=run['limit'], strategy=run['strategy'],
+                                  english_only=run['english_only'], game_filter=run['game_filter'],
+                                  segment_cache=segment_cache, shards=run['shards'], registry=ClipRegistry(),
+                                  sort=run['sort'], scoring=run['scoring'], cluster=run['cluster'])
+        except Exception as e:
+            print(f"⚠️ Batch top clips run failed: {e}")
+            clips = []
+        for index in run['configs']:
+            top_clips[index] = clips
+        step()
+
+    channel_clips = {}  # (canonical login, days_back) -> the channel's top clips of that window
+    for key, entry in plan['channels'].items():
+        channel_clips[key] = get_channel_clips(None, [entry['name']], entry['days_back'], CHANNEL_FETCH_LIMIT,
+                                                 segment_cache=segment_cache, shards=entry['shards'])
+        step()
+
+    now = datetime.utcnow()
+    results = []
+    for index, config in enumerate(configs):
+        settings = dict(CONFIG_DEFAULTS[config['type']], **config)
+        if config['type'] == 'top_clips':
+            # Same window, sort, scoring and clustering as the shared run: just the first `limit`
+            result = _top_clips_result(top_clips[index][:settings['limit']])
+        else:
+            result = _highlights_result({
+                channel: _slice(channel_clips[(canonical_work_key('channel', channel)[1], settings['days_back'])],
+                                settings['clips_per_channel'], now, settings['scoring'], settings['cluster'])
+                for channel in settings['channels']
+            }, settings['scoring'])
+        result['type'] = config['type']
+        result['config'] = config
+        results.append(result)
+
+    requested_channels = sum(len(config['channels']) for config in configs if config['type'] == 'channel_highlights')
+    summary = {
+        'configs': len(configs),
+        'top_clips_configs': sum(1 for config in configs if config['type'] == 'top_clips'),
+        'top_clips_runs': len(plan['top_clips_runs']),
+        'channels_requested': requested_channels,
+        'channels_fetched': len(plan['channels'])
+    }
+    return results, summary
@@ -0,0 +1,85 @@
+"""
+Job queues for the job executors (api/worker.py)
+An executor on the API host leases jobs straight from the SQLite job store.
+Executors on other machines use HttpJobQueue instead, which leases jobs,
+renews the leases and uploads progress and results through the API server's
+/api/queue endpoints. Any object with claim, heartbeat, save and
+cancel_requested (see SqliteJobStore) can serve as a queue.
+"""
+
+import os
+import time
+
+import requests
+
+from api.job_store import ScrapingJob, get_job_store, job_record
+
+# API server to take jobs from; unset = use the local job store (API_JOB_STORE)
+QUEUE_URL = os.getenv("API_QUEUE_URL")
+
+# Shared secret for the /api/queue endpoints; they are disabled on servers without one
+WORKER_TOKEN = os.getenv("API_WORKER_TOKEN")
+
+# Attempts at uploading a job's state before giving up on that update
+UPLOAD_ATTEMPTS = 3
+
+
+class HttpJobQueue:
+    """Lease jobs from a remote API server; progress and results go back over HTTP"""
+
+    shared = True
+
+    def __init__(self, base_url, token, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['X-Worker-Token'] = token or ''
+
+    def _url(self, path):
+        return f"{self.base_url}/api/queue{path}"
+
+    def claim(self, worker):
+        response = self.session.post(self._url('/claim'), json={'worker': worker}, timeout=self.timeout)
+        response.raise_for_status()
+        if response.status_code == 204:
+            return None
+        data = response.json()['job']
+        job = ScrapingJob(data['job_type'], data['config'])
+        job.id = data['id']
+        job.status = 'running'
+        job.worker = worker
+        job.attempts = data['attempts']
+        job.store = self
+        return job
+
+    def heartbeat(self, job_id, worker):
+        try:
+            response = self.session.post(self._url(f'/{job_id}/heartbeat'), json={'worker': worker},
+                                         timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            # Keep working through a blip; if the server stays away the lease lapses and the upload is refused
+            print(f"⚠️ Heartbeat for job {job_id} failed: {e}")
+            return True
+        return response.ok and response.json().get('continue', False)
+
+    def save(self, job):
+        payload = {'worker': job.worker, 'record': job_record(job)}
+        for attempt in range(1, UPLOAD_ATTEMPTS + 1):
+            try:
+                response = self.session.put(self._url(f'/{job.id}'), json=payload, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                print(f"⚠️ Upload of job {job.id} failed (attempt {attempt}/{UPLOAD_ATTEMPTS}): {e}")
+                time.sleep(attempt)
+                continue
+            return response.ok  # 409: our lease was taken over, 404: the job was deleted
+        return True
+
+    def cancel_requested(self, job_id):
+        return False  # Cancellation arrives as a failed heartbeat
+
+
+def get_job_queue():
+    """Queue for this executor: the API server at API_QUEUE_URL, otherwise the local job store"""
+    if QUEUE_URL:
+        return HttpJobQueue(QUEUE_URL, WORKER_TOKEN)
+    return get_job_store()
@@ -0,0 +1,440 @@
+"""
+Job state for the API server
+MemoryJobStore keeps jobs in a dict inside this process (the single-process
+dev server). SqliteJobStore keeps them in a SQLite file shared by every web
+worker and job executor on the host, so whichever process serves a request
+can report status and results for, or cancel, a job started by another.
+Job executors (api/worker.py) lease jobs from the SQLite store: a lease is
+renewed by heartbeats, and a job whose executor stopped renewing it is
+handed to another executor, up to MAX_JOB_ATTEMPTS times.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime
+
+from shared.clip_model import json_ready
+from shared.metrics import RequestMetrics
+
+# SQLite file shared by all server processes; unset = jobs live in this process only
+JOB_STORE_PATH = os.getenv("API_JOB_STORE")
+
+# How often a running job re-reads its cancel flag from a shared store
+CANCEL_POLL_SECONDS = 1.0
+
+# Jobs that will never change again
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+# Seconds an executor may go without a heartbeat before its job is given to another executor
+LEASE_SECONDS = float(os.getenv("API_JOB_LEASE_SECONDS", "60"))
+
+# Runs of one job (the first plus retries after its executor died)
+MAX_JOB_ATTEMPTS = int(os.getenv("API_JOB_MAX_ATTEMPTS", "3"))
+
+# Columns a job's runner may write
+RECORD_COLUMNS = ('status', 'progress', 'result', 'error', 'completed_at', 'output_file', 'request_metrics',
+                  'trace', 'profile')
+
+
+class ScrapingJob:
+    def __init__(self, job_type, config):
+        self.id = None
+        self.job_type = job_type  # 'top_clips' or 'channel_highlights'
+        self.config = config
+        self.status = 'pending'  # pending, running, completed, failed, cancelled
+        self.progress = 0
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.completed_at = None
+        self.output_file = None
+        self.request_metrics = None  # Live RequestMetrics while running here, snapshot dict from the store
+        self.trace = None            # Tracer while running here, {'timeline', 'chrome'} from the store
+        self.profile = None          # ProfileReport when config has profile: true, dict from the store
+        self.cancel_requested = False
+        self.worker = None           # Executor holding the job's lease
+        self.attempts = 0
+        self.store = None
+        self._cancel_checked_at = 0.0
+
+    def update(self, **fields):
+        """Set fields and write the job back to its store"""
+        for name, value in fields.items():
+            setattr(self, name, value)
+        if self.store is not None and not self.store.save(self):
+            self.cancel_requested = True  # Deleted while running: stop at the next Helix call
+
+    def is_cancelled(self):
+        """Cancel check for shared.cancellation; polls a shared store at most every CANCEL_POLL_SECONDS"""
+        if not self.cancel_requested and self.store is not None and self.store.shared:
+            now = time.monotonic()
+            if now - self._cancel_checked_at >= CANCEL_POLL_SECONDS:
+                self._cancel_checked_at = now
+                self.cancel_requested = self.store.cancel_requested(self.id)
+        return self.cancel_requested
+
+    def metrics_snapshot(self):
+        if self.request_metrics is None or isinstance(self.request_metrics, dict):
+            return self.request_metrics
+        return self.request_metrics.snapshot()
+
+    def trace_timeline(self):
+        """Spans plus per-stage summary, or None if tracing was off (or the trace isn't stored yet)"""
+        if self.trace is None or isinstance(self.trace, dict):
+            return self.trace and self.trace['timeline']
+        timeline = self.trace.to_dict()
+        timeline['summary'] = self.trace.summary()
+        return timeline
+
+    def chrome_trace(self):
+        if self.trace is None or isinstance(self.trace, dict):
+            return self.trace and self.trace['chrome']
+        return self.trace.to_chrome_trace()
+
+    def profile_summary(self):
+        if self.profile is None or isinstance(self.profile, dict):
+            return self.profile
+        return self.profile.to_dict()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'config': self.config,
+            'status': self.status,
+            'progress': self.progress,
+            'result': json_ready(self.result),  # Clips become plain dicts only when served
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'output_file': self.output_file,
+            'request_metrics': self.metrics_snapshot(),
+            'attempts': self.attempts
+        }
+
+
+class MemoryJobStore:
+    """Jobs in this process only; the job objects themselves are shared with the runner threads"""
+
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._counter = 0
+
+    def add(self, job):
+        with self._lock:
+            self._counter += 1
+            job.id = self._counter
+            job.store = self
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list(self, with_results=True):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def save(self, job):
+        return job.id in self._jobs
+
+    def delete(self, job_id):
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None:
+            job.cancel_requested = True  # Stop it if it is still running
+        return job is not None
+
+    def save_record(self, job_id, worker, record):
+        return job_id in self._jobs
+
+    def metrics_totals(self):
+        """None: every job runs in this process, so its own counters are the totals"""
+        return None
+
+    def request_cancel(self, job_id):
+        """Cancel a job; returns its status afterwards, or None if there is no such job"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            if job.status == 'pending':
+                job.status = 'cancelled'
+                job.completed_at = datetime.now()
+                job.cancel_requested = True  # Its thread may already be starting
+            elif job.status == 'running':
+                job.cancel_requested = True
+        return job.status
+
+    def cancel_requested(self, job_id):
+        job = self.get(job_id)
+        return job is None or job.cancel_requested
+
+    def claim(self, worker):
+        """Mark the oldest pending job as running and return it (None if there is none)"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status == 'pending':
+                    job.status = 'running'
+                    job.worker = worker
+                    job.attempts += 1
+                    return job
+        return None
+
+    def heartbeat(self, job_id, worker):
+        """Jobs here can't outlive their executor; only reports whether to keep going"""
+        return not self.cancel_requested(job_id)
+
+
+def job_record(job):
+    """RECORD_COLUMNS values for a job, JSON-encoded; the trace and profile only once it has finished"""
+    finished = job.status in FINISHED_STATUSES
+    timeline = job.trace_timeline() if finished else None
+    return {
+        'status': job.status,
+        'progress': job.progress,
+        'result': _dumps(job.result),
+        'error': job.error,
+        'completed_at': job.completed_at.isoformat() if job.completed_at else None,
+        'output_file': job.output_file,
+        'request_metrics': _dumps(job.metrics_snapshot()),
+        'trace': _dumps({'timeline': timeline, 'chrome': job.chrome_trace()}) if timeline else None,
+        'profile': _dumps(job.profile_summary()) if finished else None
+    }
+
+
+def _dumps(value):
+    return json.dumps(json_ready(value)) if value is not None else None
+
+
+def _loads(value):
+    return json.loads(value) if value is not None else None
+
+
+class SqliteJobStore:
+    """Jobs in a SQLite file; every call opens its own connection, so any thread or process can use it"""
+
+    shared = True
+
+    def __init__(self, path=JOB_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute('PRAGMA journal_mode=WAL')  # Readers don't block the job writing its progress
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_type TEXT NOT NULL,
+                    config TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    completed_at TEXT,
+                    output_file TEXT,
+                    request_metrics TEXT,
+                    trace TEXT,
+                    profile TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_expires_at REAL
+                )
+            ''')
+            # Stores created before leases existed
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+            if 'attempts' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+            if 'lease_expires_at' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN lease_expires_at REAL')
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)')
+            # Job and Twitch API totals of every process using the store ('jobs', 'requests' -> JSON)
+            conn.execute('CREATE TABLE IF NOT EXISTS metrics (name TEXT PRIMARY KEY, data TEXT NOT NULL)')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _job(self, row):
+        job = ScrapingJob(row['job_type'], json.loads(row['config']))
+        job.id = row['id']
+        job.status = row['status']
+        job.progress = row['progress']
+        job.result = _loads(row['result'])
+        job.error = row['error']
+        job.created_at = datetime.fromisoformat(row['created_at'])
+        job.completed_at = datetime.fromisoformat(row['completed_at']) if row['completed_at'] else None
+        job.output_file = row['output_file']
+        job.request_metrics = _loads(row['request_metrics'])
+        job.trace = _loads(row['trace'])
+        job.profile = _loads(row['profile'])
+        job.cancel_requested = bool(row['cancel_requested'])
+        job.worker = row['worker']
+        job.attempts = row['attempts']
+        job.store = self
+        return job
+
+    def add(self, job):
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                'INSERT INTO jobs (job_type, config, status, progress, created_at) VALUES (?, ?, ?, ?, ?)',
+                (job.job_type, json.dumps(job.config), job.status, job.progress, job.created_at.isoformat())
+            )
+            job.id = cursor.lastrowid
+        job.store = self
+        return job
+
+    def get(self, job_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def list(self, with_results=True):
+        """All jobs, oldest first; with_results=False skips the large result/trace/profile columns"""
+        columns = '*' if with_results else ('id, job_type, config, status, progress, NULL AS result, error, '
+                                            'created_at, completed_at, output_file, request_metrics, '
+                                            'NULL AS trace, NULL AS profile, cancel_requested, worker, attempts')
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f'SELECT {columns} FROM jobs ORDER BY id').fetchall()
+        return [self._job(row) for row in rows]
+
+    def save(self, job):
+        """Write a runner's view of the job; False if the job was deleted or its lease taken over meanwhile"""
+        return self.save_record(job.id, job.worker, job_record(job))
+
+    def save_record(self, job_id, worker, record):
+        """
+        Write a job_record() for the job's current lease holder (None for jobs run inline).
+        A job cancelled while pending is never written again, so its runner can't revive it.
+        """
+        unknown = set(record) - set(RECORD_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown job columns: {', '.join(sorted(unknown))}")
+        assignments = ', '.join(f'{column} = ?' for column in record)
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')  # The finished check and the metrics update must see the same row
+            try:
+                row = conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+                finishing = (row is not None and row['status'] not in FINISHED_STATUSES
+                             and record.get('status') in FINISHED_STATUSES)
+                cursor = conn.execute(f"UPDATE jobs SET {assignments} "
+                                      f"WHERE id = ? AND worker IS ? AND status != 'cancelled'",
+                                      (*record.values(), job_id, worker))
+                if cursor.rowcount and finishing:
+                    self._add_to_totals(conn, job_id)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return cursor.rowcount > 0
+
+    def _add_to_totals(self, conn, job_id):
+        """Count a job that just finished in the shared job and Twitch API totals"""
+        from api.monitoring import JobMetrics  # api.monitoring pulls in the Twitch client
+
+        job = self._job(conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+        totals = self._totals(conn)
+        job_metrics = JobMetrics.from_snapshot(totals['jobs'])
+        job_metrics.observe_job(job)
+        request_metrics = RequestMetrics()
+        for snapshot in (totals['requests'], job.request_metrics):
+            if snapshot:
+                request_metrics.merge_snapshot(snapshot)
+        conn.executemany('INSERT OR REPLACE INTO metrics (name, data) VALUES (?, ?)',
+                         [('jobs', json.dumps(job_metrics.snapshot())),
+                          ('requests', json.dumps(request_metrics.snapshot()))])
+
+    def _totals(self, conn):
+        totals = {'jobs': None, 'requests': None}
+        for row in conn.execute('SELECT name, data FROM metrics'):
+            totals[row['name']] = json.loads(row['data'])
+        return totals
+
+    def metrics_totals(self):
+        """Job and Twitch API totals of the jobs every process finished, for /api/metrics"""
+        with closing(self._connect()) as conn:
+            totals = self._totals(conn)
+        if totals['requests'] is None:
+            totals['requests'] = RequestMetrics().snapshot()
+        return totals
+
+    def delete(self, job_id):
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        return cursor.rowcount > 0
+
+    def request_cancel(self, job_id):
+        """Cancel a job; returns its status afterwards, or None if there is no such job"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE jobs SET status = 'cancelled', completed_at = ?, cancel_requested = 1 "
+                         "WHERE id = ? AND status = 'pending'", (datetime.now().isoformat(), job_id))
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+            row = conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return row['status'] if row else None
+
+    def cancel_requested(self, job_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return row is None or bool(row['cancel_requested'])
+
+    def claim(self, worker, lease_seconds=LEASE_SECONDS):
+        """
+        Atomically lease the oldest job that is pending, or running under an
+        expired lease (its executor died), to `worker` and return it.
+        Jobs that have used up MAX_JOB_ATTEMPTS are failed instead.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')  # Take the write lock before choosing, so two workers can't pick one job
+            try:
+                expired = "status = 'running' AND lease_expires_at < ?"
+                conn.execute(f"UPDATE jobs SET status = 'cancelled', completed_at = ? "
+                             f"WHERE {expired} AND cancel_requested = 1", (datetime.now().isoformat(), now))
+                conn.execute(f"UPDATE jobs SET status = 'failed', completed_at = ?, "
+                             f"error = 'Job executor stopped responding ' || attempts || ' times' "
+                             f"WHERE {expired} AND attempts >= ?", (datetime.now().isoformat(), now, MAX_JOB_ATTEMPTS))
+                row = conn.execute(f"SELECT id FROM jobs WHERE status = 'pending' OR ({expired}) ORDER BY id LIMIT 1",
+                                   (now,)).fetchone()
+                if row:
+                    # A retry starts over: drop whatever the dead executor had uploaded
+                    conn.execute("UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                                 "lease_expires_at = ?, progress = 0, result = NULL, error = NULL, "
+                                 "request_metrics = NULL WHERE id = ?", (worker, now + lease_seconds, row['id']))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return self.get(row['id']) if row else None
+
+    def heartbeat(self, job_id, worker, lease_seconds=LEASE_SECONDS):
+        """Renew worker's lease on a job; False when it should stop (cancelled, deleted or taken over)"""
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute("UPDATE jobs SET lease_expires_at = ? "
+                                  "WHERE id = ? AND worker = ? AND status = 'running' AND cancel_requested = 0",
+                                  (time.time() + lease_seconds, job_id, worker))
+        return cursor.rowcount > 0
+
+
+# Global instance for easy access
+_job_store = None
+_job_store_lock = threading.Lock()
+
+def get_job_store():
+    """Get shared job store: SQLite when API_JOB_STORE is set, otherwise in-process"""
+    global _job_store
+    if _job_store is None:
+        with _job_store_lock:
+            if _job_store is None:
+                _job_store = SqliteJobStore(JOB_STORE_PATH) if JOB_STORE_PATH else MemoryJobStore()
+    return _job_store
@@ -0,0 +1,291 @@
+"""
+Monitoring helpers for the job server
+Job duration/size histograms, a cached readiness check, process memory
+and rendering of everything in the Prometheus text exposition format
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.append('..')
+from shared.auth import get_twitch_auth, validate_environment
+from shared.metrics import REQUEST_METRICS, LATENCY_BUCKETS, cache_stats
+from shared.retry import CIRCUIT_BREAKER
+from shared.rate_limit import rate_budget_stats
+
+# Upper bounds of the job histograms
+JOB_DURATION_BUCKETS = (5, 15, 30, 60, 120, 300, 600, 1800, float('inf'))
+JOB_CLIPS_BUCKETS = (0, 10, 50, 100, 150, 300, 500, 1000, float('inf'))
+
+# How long a readiness result is reused before checking again
+READINESS_TTL = float(os.getenv("API_READINESS_TTL", "30"))
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def to_dict(self):
+        return {'counts': self.counts, 'total': self.total, 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, buckets, data):
+        hist = cls(buckets)
+        hist.counts, hist.total, hist.count = list(data['counts']), data['total'], data['count']
+        return hist
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class JobMetrics:
+    """Histograms of finished jobs, labelled by job type"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations = {}   # job_type -> Histogram of seconds
+        self.clips = {}       # job_type -> Histogram of clips returned
+        self.finished = {}    # (job_type, status) -> count
+
+    def observe_job(self, job):
+        if not job.completed_at:
+            return
+        duration = (job.completed_at - job.created_at).total_seconds()
+        clips = (job.result or {}).get('total_clips', 0)
+        with self._lock:
+            self.durations.setdefault(job.job_type, Histogram(JOB_DURATION_BUCKETS)).observe(duration)
+            self.clips.setdefault(job.job_type, Histogram(JOB_CLIPS_BUCKETS)).observe(clips)
+            key = (job.job_type, job.status)
+            self.finished[key] = self.finished.get(key, 0) + 1
+
+    def snapshot(self):
+        """Plain-dict copy, for keeping the totals in a shared job store"""
+        with self._lock:
+            return {
+                'durations': {job_type: hist.to_dict() for job_type, hist in self.durations.items()},
+                'clips': {job_type: hist.to_dict() for job_type, hist in self.clips.items()},
+                'finished': [[job_type, status, count] for (job_type, status), count in self.finished.items()]
+            }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        metrics = cls()
+        if snapshot:
+            metrics.durations = {job_type: Histogram.from_dict(JOB_DURATION_BUCKETS, data)
+                                 for job_type, data in snapshot['durations'].items()}
+            metrics.clips = {job_type: Histogram.from_dict(JOB_CLIPS_BUCKETS, data)
+                             for job_type, data in snapshot['clips'].items()}
+            metrics.finished = {(job_type, status): count for job_type, status, count in snapshot['finished']}
+        return metrics
+
+
+JOB_METRICS = JobMetrics()
+
+
+class ReadinessCheck:
+    """Readiness probe that reuses its last result for READINESS_TTL seconds.
+    Only asks Twitch for a token when we don't already hold a valid one."""
+
+    def __init__(self, ttl=READINESS_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._result = None
+        self._checked_at = 0.0
+
+    def check(self):
+        with self._lock:
+            if self._result and time.time() - self._checked_at < self.ttl:
+                return self._result
+
+            if not validate_environment():
+                result = {'status': 'error', 'message': 'Environment not configured', 'auth_status': 'invalid'}
+            else:
+                try:
+                    auth = get_twitch_auth()
+                    token = auth.access_token if auth._is_token_valid() else auth.get_token()
+                    result = {
+                        'status': 'healthy',
+                        'message': 'API is running',
+                        'auth_status': 'valid' if token else 'invalid'
+                    }
+                except Exception as e:
+                    result = {'status': 'error', 'message': str(e), 'auth_status': 'invalid'}
+
+            result['checked_at'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            self._result = result
+            self._checked_at = time.time()
+            return result
+
+
+READINESS = ReadinessCheck()
+
+
+def process_memory_bytes():
+    """Resident set size of this process, or None if the platform can't tell us"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024  # Peak, not current
+    except ImportError:
+        return None
+
+
+def _labels(**labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+class _Exposition:
+    def __init__(self):
+        self.lines = []
+
+    def metric(self, name, metric_type, help_text):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {metric_type}")
+
+    def sample(self, name, value, **labels):
+        self.lines.append(f"{name}{_labels(**labels)} {value}")
+
+    def histogram(self, name, buckets, counts, total, count, **labels):
+        cumulative = 0
+        for bound, bucket_count in zip(buckets, counts):
+            cumulative += bucket_count
+            self.sample(f"{name}_bucket", cumulative, le=_bound(bound), **labels)
+        self.sample(f"{name}_sum", total, **labels)
+        self.sample(f"{name}_count", count, **labels)
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def render_prometheus(jobs, totals=None):
+    """
+    Everything /api/metrics exposes, in Prometheus text format.
+    totals: job and Twitch API totals kept in a shared job store (see
+    SqliteJobStore.metrics_totals), which cover jobs run by every process;
+    without them this process's own counters are used.
+    """
+    out = _Exposition()
+    job_metrics = JOB_METRICS if totals is None else JobMetrics.from_snapshot(totals['jobs'])
+
+    # Jobs
+    by_status_type = {}
+    for job in jobs:
+        key = (job.job_type, job.status)
+        by_status_type[key] = by_status_type.get(key, 0) + 1
+
+    out.metric('scraper_jobs', 'gauge', 'Jobs currently known to the server by type and status')
+    for (job_type, status), count in sorted(by_status_type.items()):
+        out.sample('scraper_jobs', count, type=job_type, status=status)
+
+    out.metric('scraper_job_queue_depth', 'gauge', 'Jobs waiting or running')
+    out.sample('scraper_job_queue_depth', sum(1 for job in jobs if job.status in ('pending', 'running')))
+
+    with job_metrics._lock:
+        out.metric('scraper_jobs_finished_total', 'counter', 'Jobs finished since startup by type and status')
+        for (job_type, status), count in sorted(job_metrics.finished.items()):
+            out.sample('scraper_jobs_finished_total', count, type=job_type, status=status)
+
+        out.metric('scraper_job_duration_seconds', 'histogram', 'Wall time from submission to completion')
+        for job_type, hist in sorted(job_metrics.durations.items()):
+            out.histogram('scraper_job_duration_seconds', hist.buckets, hist.counts, hist.total, hist.count,
+                          type=job_type)
+
+        out.metric('scraper_job_clips', 'histogram', 'Clips returned per finished job')
+        for job_type, hist in sorted(job_metrics.clips.items()):
+            out.histogram('scraper_job_clips', hist.buckets, hist.counts, hist.total, hist.count, type=job_type)
+
+    # Twitch API
+    snapshot = REQUEST_METRICS.snapshot() if totals is None else totals['requests']
+    out.metric('twitch_api_requests_total', 'counter', 'Twitch API requests by endpoint and HTTP status')
+    for endpoint, stats in sorted(snapshot['endpoints'].items()):
+        for status, count in sorted(stats['status_codes'].items(), key=lambda x: str(x[0])):
+            out.sample('twitch_api_requests_total', count, endpoint=endpoint,
+                       status=status if status not in (None, 'null') else 'network_error')
+
+    out.metric('twitch_api_request_duration_seconds', 'histogram', 'Twitch API request latency by endpoint')
+    for endpoint, stats in sorted(snapshot['endpoints'].items()):
+        out.histogram('twitch_api_request_duration_seconds', LATENCY_BUCKETS,
+                      list(stats['latency_histogram'].values()), stats['latency_total'], stats['calls'],
+                      endpoint=endpoint)
+
+    out.metric('twitch_api_received_bytes_total', 'counter', 'Response bytes received by endpoint')
+    for endpoint, stats in sorted(snapshot['endpoints'].items()):
+        out.sample('twitch_api_received_bytes_total', stats['bytes_received'], endpoint=endpoint)
+
+    out.metric('twitch_api_retries_total', 'counter', 'Retried Twitch API requests')
+    out.sample('twitch_api_retries_total', snapshot['retries'])
+    out.metric('twitch_api_token_refreshes_total', 'counter', 'Token refreshes triggered by 401 responses')
+    out.sample('twitch_api_token_refreshes_total', snapshot['token_refreshes'])
+    out.metric('twitch_api_rate_limit_wait_seconds_total', 'counter', 'Time spent waiting on rate limits')
+    out.sample('twitch_api_rate_limit_wait_seconds_total', snapshot['rate_limit_wait_seconds'])
+    out.metric('twitch_api_coalesced_requests_total', 'counter', 'Calls saved by sharing identical in-flight requests')
+    out.sample('twitch_api_coalesced_requests_total', snapshot['coalesced_calls'])
+    
+    breaker = CIRCUIT_BREAKER.snapshot()
+    out.metric('twitch_api_circuit_open', 'gauge', '1 while the Twitch circuit breaker is failing calls fast')
+    out.sample('twitch_api_circuit_open', 0 if breaker['state'] == 'closed' else 1)
+    out.metric('twitch_api_circuit_rejected_total', 'counter', 'Calls failed fast by the circuit breaker')
+    out.sample('twitch_api_circuit_rejected_total', breaker['rejected_calls'])
+
+    budget = rate_budget_stats()
+    if budget is not None:
+        out.metric('twitch_rate_budget_per_minute', 'gauge', 'Client-side request budget per minute')
+        out.sample('twitch_rate_budget_per_minute', budget['rate_per_minute'])
+        # A shared budget reports every process on the host; a local one only this process
+        processes = budget.get('processes') or {str(os.getpid()): dict(budget, name='api')}
+        out.metric('twitch_rate_budget_acquired_total', 'counter', 'Requests admitted by the rate budget per process')
+        for pid, usage in sorted(processes.items()):
+            out.sample('twitch_rate_budget_acquired_total', usage['acquired'], pid=pid, process=usage['name'])
+        out.metric('twitch_rate_budget_wait_seconds_total', 'counter', 'Time spent waiting for the rate budget per process')
+        for pid, usage in sorted(processes.items()):
+            out.sample('twitch_rate_budget_wait_seconds_total', usage['waited_seconds'], pid=pid,
+                       process=usage['name'])
+
+    # Caches
+    caches = cache_stats()
+    out.metric('scraper_cache_hits_total', 'counter', 'Cache hits by cache')
+    for name, stats in sorted(caches.items()):
+        out.sample('scraper_cache_hits_total', stats.get('hits', 0), cache=name)
+    out.metric('scraper_cache_misses_total', 'counter', 'Cache misses by cache')
+    for name, stats in sorted(caches.items()):
+        out.sample('scraper_cache_misses_total', stats.get('misses', 0), cache=name)
+    out.metric('scraper_cache_hit_ratio', 'gauge', 'Cache hit ratio since startup')
+    for name, stats in sorted(caches.items()):
+        lookups = stats.get('hits', 0) + stats.get('misses', 0)
+        out.sample('scraper_cache_hit_ratio', round(stats.get('hits', 0) / lookups, 4) if lookups else 0,
+                   cache=name)
+
+    # Process
+    memory = process_memory_bytes()
+    if memory is not None:
+        out.metric('process_resident_memory_bytes', 'gauge', 'Resident memory size in bytes')
+        out.sample('process_resident_memory_bytes', memory)
+
+    return out.render()
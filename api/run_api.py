@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 """
 Startup script for Twitch Clips Scraper API
+
+    python run_api.py                 # Flask dev server, jobs run in-process
+    python run_api.py --production    # Gunicorn web workers + separate job executors
 """
 
 import os
+import subprocess
 import sys
 
 # Add parent directory to Python path
@@ -12,8 +16,48 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Change to the API directory
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
-# Import and run the Flask app
-from app import app
+# Production mode settings
+WEB_WORKERS = int(os.getenv("API_WEB_WORKERS", "4"))
+JOB_WORKERS = int(os.getenv("API_JOB_WORKERS", "1"))
+BIND = os.getenv("API_BIND", "0.0.0.0:5000")
+DEFAULT_JOB_STORE = os.path.join('api_output', 'jobs.db')
+
+
+def run_production():
+    """Serve HTTP from Gunicorn worker processes and run scrapes in separate job executors,
+    all sharing one SQLite job store"""
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print("❌ Production mode needs gunicorn: pip install gunicorn")
+        sys.exit(1)
+
+    env = dict(os.environ)
+    env['API_JOB_STORE'] = os.path.abspath(env.get('API_JOB_STORE') or DEFAULT_JOB_STORE)
+    env['API_JOB_EXECUTION'] = 'worker'
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.dirname(os.getcwd()), env.get('PYTHONPATH')]))
+
+    print(f"🚀 Starting Twitch Clips Scraper API: {WEB_WORKERS} web workers, {JOB_WORKERS} job executors")
+    print(f"🗃️ Job store: {env['API_JOB_STORE']}")
+
+    executors = [subprocess.Popen([sys.executable, 'worker.py'], env=env) for _ in range(JOB_WORKERS)]
+    try:
+        web = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-w', str(WEB_WORKERS), '-b', BIND,
+                                '--timeout', '120', 'app:app'], env=env)
+        web.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for executor in executors:
+            executor.terminate()
+        for executor in executors:
+            executor.wait()
+
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    if '--production' in sys.argv:
+        run_production()
+    else:
+        # Import and run the Flask app
+        from app import app
+        app.run(debug=True, host='0.0.0.0', port=5000)
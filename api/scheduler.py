@@ -0,0 +1,231 @@
+"""
+Recurring scrapes with pre-warmed results
+The API re-runs the scrapes users ask for most (the gaming, variety and
+esports presets and the 24h top clips) on an interval. A scrape request whose
+config matches a schedule is answered at once with a completed job copied
+from the latest fresh run, instead of starting a cold scrape.
+Schedules start staggered and only one scheduled job runs at a time, so they
+never burst the rate budget. With a shared job store only one server process
+(whichever holds the scheduler lock file) runs the schedules.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process schedules, duplicates are skipped via the store
+    fcntl = None
+
+from highlight_scraper.channel_config import get_preset
+from shared.clip_registry import canonical_work_key
+from shared.metrics import register_cache_stats
+from api.job_store import ScrapingJob
+
+SCHEDULER_ENABLED = os.getenv("API_SCHEDULER", "1") != "0"
+
+# Seconds between runs of each schedule
+SCHEDULE_INTERVAL = float(os.getenv("API_SCHEDULE_INTERVAL", "1800"))
+
+# Runs older than this are too stale to serve
+MAX_RESULT_AGE = float(os.getenv("API_SCHEDULE_MAX_AGE", str(SCHEDULE_INTERVAL * 1.5)))
+
+# JSON file with a list of schedules replacing DEFAULT_SCHEDULES
+SCHEDULES_FILE = os.getenv("API_SCHEDULES")
+
+# Gap between the first runs of consecutive schedules after startup
+STAGGER_SECONDS = 120
+
+# Seconds after the scheduler starts (on the first request) before the first schedule runs,
+# so it doesn't compete with that request's own scrape
+STARTUP_DELAY = float(os.getenv("API_SCHEDULE_STARTUP_DELAY", str(STAGGER_SECONDS)))
+
+# How often the scheduler checks for due schedules
+TICK_SECONDS = 10
+
+# Finished runs kept per schedule; older ones are deleted from the job store
+KEEP_RUNS = 2
+
+
+def preset_schedule(preset_name):
+    preset = get_preset(preset_name)
+    return {
+        'name': f'preset_{preset_name}',
+        'job_type': 'channel_highlights',
+        'config': {
+            'channels': preset['channels'],
+            'days_back': preset['days_back'],
+            'clips_per_channel': preset['clips_per_channel']
+        }
+    }
+
+
+DEFAULT_SCHEDULES = [
+    {'name': 'top_clips_24h', 'job_type': 'top_clips', 'config': {'days_back': 1, 'limit': 150}},
+    preset_schedule('gaming'),
+    preset_schedule('variety'),
+    preset_schedule('esports'),
+]
+
+
+def load_schedules(path=SCHEDULES_FILE):
+    if not path:
+        return DEFAULT_SCHEDULES
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def config_signature(job_type, config):
+    """
+    What decides a job's result: two configs with the same signature return
+    the same clips. None for requests that must not be served from a
+    scheduled run (incremental or profiled runs, or "prewarmed": false).
+    """
+    if config.get('incremental') or config.get('profile') or config.get('prewarmed') is False:
+        return None
+    if job_type == 'top_clips':
+        fields = [config.get('days_back', 1), config.get('limit', 150), bool(config.get('english_only', True)),
+                  config.get('game_filter'), config.get('strategy', 'adaptive'), config.get('sort', 'views'),
+                  config.get('scoring') or {}, bool(config.get('cluster'))]
+    elif job_type == 'channel_highlights':
+        channels = sorted({canonical_work_key('channel', channel)[1] for channel in config.get('channels', [])})
+        fields = [channels, config.get('days_back', 7), config.get('clips_per_channel', 10), config.get('scoring') or {},
+                  bool(config.get('cluster'))]
+    else:
+        return None
+    return json.dumps([job_type] + fields, sort_keys=True)
+
+
+class Scheduler:
+    def __init__(self, store, submit, schedules=None, interval=SCHEDULE_INTERVAL, max_age=MAX_RESULT_AGE,
+                 startup_delay=STARTUP_DELAY):
+        self.store = store
+        self.submit = submit
+        self.schedules = schedules if schedules is not None else load_schedules()
+        self.interval = interval
+        self.max_age = max_age
+        self.startup_delay = startup_delay
+        self._signatures = {schedule['name']: config_signature(schedule['job_type'], schedule['config'])
+                            for schedule in self.schedules}
+        self._started_at = time.time()
+        self._stagger = min(STAGGER_SECONDS, interval / max(1, len(self.schedules)))
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._leader_file = None
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        """Start the scheduling thread (once per process)"""
+        with self._start_lock:
+            if self._thread is None:
+                self._started_at = time.time()
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                if self._is_leader():
+                    self.tick()
+            except Exception as e:
+                print(f"⚠️ Scheduler tick failed: {e}")
+            time.sleep(TICK_SECONDS)
+
+    def _is_leader(self):
+        """Only one process per shared job store schedules; the lock passes on if it dies"""
+        if self._leader_file is not None or not self.store.shared or fcntl is None:
+            return True
+        lock_file = open(f"{self.store.path}.scheduler.lock", 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._leader_file = lock_file
+        print(f"⏰ Scheduler running {len(self.schedules)} schedules every {self.interval / 60:.0f} min")
+        return True
+
+    def _runs(self, jobs):
+        """Scheduled jobs by schedule name, newest first"""
+        runs = {}
+        for job in reversed(jobs):
+            name = job.config.get('schedule')
+            if name in self._signatures:
+                runs.setdefault(name, []).append(job)
+        return runs
+
+    def due_at(self, index, runs):
+        latest = runs[0] if runs else None
+        if latest is None:
+            return self._started_at + self.startup_delay + index * self._stagger
+        return latest.created_at.timestamp() + self.interval
+
+    def tick(self, now=None):
+        """Submit the most overdue schedule, unless a scheduled job is still pending or running"""
+        now = now or time.time()
+        jobs = self.store.list(with_results=False)
+        runs = self._runs(jobs)
+        if any(job.status in ('pending', 'running') for jobs in runs.values() for job in jobs):
+            return None
+
+        due = [(self.due_at(i, runs.get(s['name'], [])), i, s) for i, s in enumerate(self.schedules)]
+        due_at, _, schedule = min(due, key=lambda item: (item[0], item[1]))
+        if due_at > now:
+            return None
+
+        job = self.submit(ScrapingJob(schedule['job_type'], dict(schedule['config'], schedule=schedule['name'])))
+        print(f"⏰ Scheduled {schedule['name']} (job {job.id})")
+        old_ids = {old.id for old in runs.get(schedule['name'], [])[KEEP_RUNS - 1:]}
+        for old in jobs:
+            # Requests answered from an old run only point at its result, so they go with it
+            if old.id in old_ids or old.config.get('prewarmed_from') in old_ids:
+                self.store.delete(old.id)
+        return job
+
+    def fresh_run(self, job_type, config):
+        """Latest completed scheduled job matching this request, if it is fresh enough to serve"""
+        signature = config_signature(job_type, config)
+        names = [name for name, schedule_signature in self._signatures.items() if schedule_signature == signature]
+        if signature is None or not names:
+            return None
+
+        runs = self._runs(self.store.list(with_results=False))
+        candidates = [job for name in names for job in runs.get(name, []) if job.status == 'completed']
+        latest = max(candidates, key=lambda job: job.completed_at, default=None)
+        if latest is None or (datetime.now() - latest.completed_at).total_seconds() > self.max_age:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.store.get(latest.id)
+
+    def status(self):
+        runs = self._runs(self.store.list(with_results=False))
+        schedules = []
+        for i, schedule in enumerate(self.schedules):
+            schedule_runs = runs.get(schedule['name'], [])
+            latest = next((job for job in schedule_runs if job.status == 'completed'), None)
+            schedules.append({
+                'name': schedule['name'],
+                'job_type': schedule['job_type'],
+                'config': schedule['config'],
+                'next_run_at': datetime.fromtimestamp(self.due_at(i, schedule_runs)).isoformat(),
+                'latest_job_id': latest.id if latest else None,
+                'latest_completed_at': latest.completed_at.isoformat() if latest else None
+            })
+        return {'interval_seconds': self.interval, 'max_age_seconds': self.max_age, 'schedules': schedules}
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def create_scheduler(store, submit):
+    """Scheduler for this server, or None when API_SCHEDULER=0"""
+    if not SCHEDULER_ENABLED:
+        return None
+    scheduler = Scheduler(store, submit)
+    register_cache_stats('prewarmed', scheduler.stats)
+    return scheduler
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Job executor for the API server
+Leases jobs from a job queue and runs them, so scrapes never compete with
+the web workers serving HTTP. On the API host the queue is the shared SQLite
+job store (API_JOB_STORE); on other machines set API_QUEUE_URL and
+API_WORKER_TOKEN to take jobs from the API server over HTTP. Leases are
+renewed by heartbeats while a job runs; if this process dies, its jobs are
+retried by another executor once their leases expire.
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.job_store import LEASE_SECONDS
+from api.job_queue import get_job_queue
+
+# Jobs run at the same time by one executor
+WORKER_THREADS = int(os.getenv("API_WORKER_THREADS", "2"))
+
+# Seconds between looks at the queue when there is nothing to do
+POLL_INTERVAL = float(os.getenv("API_WORKER_POLL_INTERVAL", "1.0"))
+
+# Several heartbeats per lease, so one slow or lost heartbeat doesn't cost the job
+HEARTBEAT_INTERVAL = LEASE_SECONDS / 4
+
+
+def _send_heartbeats(queue, name, running, lock, stop):
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        with lock:
+            jobs = list(running.values())
+        for job in jobs:
+            if not queue.heartbeat(job.id, name):
+                # Cancelled, deleted or handed to another executor: stop at the next Twitch call
+                job.cancel_requested = True
+
+
+def run_worker(queue=None, threads=WORKER_THREADS, poll_interval=POLL_INTERVAL, name=None):
+    from api.app import execute_job
+
+    queue = queue or get_job_queue()
+    if not queue.shared:
+        print("❌ The job executor needs a shared queue; set API_JOB_STORE (or API_QUEUE_URL and API_WORKER_TOKEN)")
+        sys.exit(1)
+
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    print(f"🛠️ Job executor {name} running up to {threads} jobs")
+
+    running = {}  # future -> job
+    lock = threading.Lock()
+    stop = threading.Event()
+    heartbeats = threading.Thread(target=_send_heartbeats, args=(queue, name, running, lock, stop), daemon=True)
+    heartbeats.start()
+
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            while True:
+                with lock:
+                    for future in [future for future in running if future.done()]:
+                        del running[future]
+                    busy = len(running)
+                try:
+                    job = queue.claim(name) if busy < threads else None
+                except Exception as e:
+                    print(f"⚠️ Could not take a job: {e}")
+                    job = None
+                if job is None:
+                    time.sleep(poll_interval)
+                    continue
+                retry = f", attempt {job.attempts}" if job.attempts > 1 else ""
+                print(f"▶️ Job {job.id} ({job.job_type}{retry})")
+                with lock:
+                    running[pool.submit(execute_job, job)] = job
+    finally:
+        stop.set()
+
+
+if __name__ == '__main__':
+    try:
+        run_worker()
+    except KeyboardInterrupt:
+        print("\n🛑 Job executor stopped")
@@ -0,0 +1,98 @@
+"""
+Memory benchmark: raw Helix clip dicts vs compact Clip objects
+Builds a synthetic 100k-clip job both ways and reports retained bytes per clip
+
+Usage:
+    python -m benchmarks.clip_memory
+    python -m benchmarks.clip_memory --clips 250000 --json clip_memory.json
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+sys.path.append('..')
+from shared.clip_model import Clip
+
+GAMES = [('509658', 'Just Chatting'), ('21779', 'League of Legends'), ('32982', 'Grand Theft Auto V'),
+         ('33214', 'Fortnite'), ('516575', 'Valorant'), ('27471', 'Minecraft')]
+
+
+def make_helix_clip(i):
+    """A clip dict shaped like a /helix/clips item after our enrichment step.
+    Every string is built fresh, the way json parsing produces them."""
+    game_id, game_name = GAMES[i % len(GAMES)]
+    broadcaster = i % 2000
+    return {
+        'id': f"AwkwardHelplessSalamander{i}-{i * 7919 % 100000}",
+        'url': f"https://clips.twitch.tv/AwkwardHelplessSalamander{i}",
+        'embed_url': f"https://clips.twitch.tv/embed?clip=AwkwardHelplessSalamander{i}",
+        'broadcaster_id': str(100000 + broadcaster),
+        'broadcaster_name': f"streamer_{broadcaster}",
+        'creator_id': str(500000 + i % 50000),
+        'creator_name': f"viewer_{i % 50000}",
+        'video_id': str(2000000000 + i // 40),
+        'game_id': ''.join(game_id),
+        'language': ''.join('en'),
+        'title': f"clip number {i} - insane clutch play",
+        'view_count': (i * 2654435761) % 250000,
+        'created_at': f"2025-01-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:00Z",
+        'thumbnail_url': f"https://clips-media-assets2.twitch.tv/{i}-preview-480x272.jpg",
+        'duration': 10.0 + i % 50,
+        'vod_offset': i % 10000,
+        'is_featured': False,
+        'game_name': ''.join(game_name),
+        'channel_name': f"streamer_{broadcaster}"
+    }
+
+
+def measure(build, count):
+    """Retained bytes after building `count` items with `build`"""
+    gc.collect()
+    tracemalloc.start()
+    items = [build(i) for i in range(count)]
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return retained, peak
+
+
+def run(count):
+    dict_bytes, dict_peak = measure(make_helix_clip, count)
+    clip_bytes, clip_peak = measure(lambda i: Clip.from_helix(make_helix_clip(i)), count)
+    return {
+        'clips': count,
+        'dict_bytes_per_clip': round(dict_bytes / count, 1),
+        'clip_bytes_per_clip': round(clip_bytes / count, 1),
+        'dict_total_mb': round(dict_bytes / 1024 / 1024, 2),
+        'clip_total_mb': round(clip_bytes / 1024 / 1024, 2),
+        'dict_peak_mb': round(dict_peak / 1024 / 1024, 2),
+        'clip_peak_mb': round(clip_peak / 1024 / 1024, 2),
+        'savings_ratio': round(1 - clip_bytes / dict_bytes, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per clip: Helix dicts vs Clip objects")
+    parser.add_argument('--clips', type=int, default=100000, help="Clips in the synthetic job")
+    parser.add_argument('--json', dest='json_path', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    print(f"🧪 Measuring memory for a {args.clips:,}-clip job...")
+    results = run(args.clips)
+
+    print(f"📦 Helix dicts: {results['dict_bytes_per_clip']:,.0f} bytes/clip ({results['dict_total_mb']} MB)")
+    print(f"📦 Clip objects: {results['clip_bytes_per_clip']:,.0f} bytes/clip ({results['clip_total_mb']} MB)")
+    print(f"✅ Saved {results['savings_ratio']:.1%} of clip memory")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"📁 Results written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""
+Local stand-in for the Twitch OAuth and Helix APIs
+Serves deterministic games, users and clips (with pagination and rate-limit
+headers) so the scrapers can be exercised and timed without credentials.
+
+Point the scrapers at it with:
+    TWITCH_AUTH_URL=http://127.0.0.1:<port>/oauth2
+    TWITCH_HELIX_URL=http://127.0.0.1:<port>/helix
+
+Usage:
+    python -m benchmarks.fake_helix --port 8787 --latency-ms 40 --error-rate 0.02
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+HELIX_TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def _stable_int(*parts):
+    """Deterministic integer from arbitrary values (hash() is randomized per process)"""
+    digest = hashlib.md5('|'.join(str(p) for p in parts).encode()).hexdigest()
+    return int(digest[:12], 16)
+
+
+def _encode_cursor(offset):
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        return 0
+
+
+class FakeHelixData:
+    """Deterministic catalogue of games, users and clips"""
+
+    def __init__(self, clips_per_game=3000, clips_per_channel=400, seed=1, now=None):
+        self.clips_per_game = clips_per_game
+        self.clips_per_channel = clips_per_channel
+        self.seed = seed
+        self.now = now or datetime.utcnow()
+        self._games = {}        # id -> game
+        self._game_names = {}   # casefolded name -> id
+        self._users = {}        # id -> user
+        self._logins = {}       # login -> id
+        self._clips = {}        # ("game"|"channel", id) -> clips sorted by views
+        self._clip_index = {}   # clip id -> clip
+        self._lock = threading.Lock()
+
+    # Games and users are created on first lookup, so any name "exists"
+    def game_by_name(self, name):
+        with self._lock:
+            key = name.casefold()
+            if key not in self._game_names:
+                game_id = str(_stable_int(self.seed, 'game', key) % 900000 + 1000)
+                self._game_names[key] = game_id
+                self._games[game_id] = {
+                    'id': game_id,
+                    'name': name,
+                    'box_art_url': f"https://static-cdn.jtvnw.net/ttv-boxart/{game_id}-{{width}}x{{height}}.jpg",
+                    'igdb_id': ''
+                }
+            return self._games[self._game_names[key]]
+
+    def game_by_id(self, game_id):
+        with self._lock:
+            return self._games.get(game_id) or {
+                'id': game_id, 'name': f"Game {game_id}", 'box_art_url': '', 'igdb_id': ''
+            }
+
+    def top_games(self):
+        names = ['Just Chatting', 'Grand Theft Auto V', 'League of Legends', 'Counter-Strike', 'Valorant',
+                 'Fortnite', 'Minecraft', 'World of Warcraft', 'Apex Legends', 'Marvel Rivals',
+                 'Dead by Daylight', 'Slots', 'Overwatch 2', 'Call of Duty: Warzone', 'Rust',
+                 'Escape from Tarkov', 'Teamfight Tactics', 'Path of Exile 2', 'Music', 'Art',
+                 'Deadlock', 'Hearthstone', 'Dota 2', 'ELDEN RING', 'Baldur\'s Gate 3']
+        return [self.game_by_name(name) for name in names]
+
+    def user_by_login(self, login):
+        with self._lock:
+            key = login.lower()
+            if key not in self._logins:
+                user_id = str(_stable_int(self.seed, 'user', key) % 90000000 + 10000000)
+                self._logins[key] = user_id
+                self._users[user_id] = self._make_user(user_id, key)
+            return self._users[self._logins[key]]
+
+    def user_by_id(self, user_id):
+        with self._lock:
+            if user_id not in self._users:
+                self._users[user_id] = self._make_user(user_id, f"streamer_{user_id}")
+            return self._users[user_id]
+
+    def _make_user(self, user_id, login):
+        return {
+            'id': user_id,
+            'login': login,
+            'display_name': login.capitalize(),
+            'type': '',
+            'broadcaster_type': 'partner' if int(user_id) % 3 == 0 else 'affiliate',
+            'description': 'English variety streamer from the USA' if int(user_id) % 4 else 'Streamer',
+            'profile_image_url': f"https://static-cdn.jtvnw.net/jtv_user_pictures/{user_id}.png",
+            'offline_image_url': '',
+            'view_count': 0,
+            'created_at': '2015-01-01T00:00:00Z'
+        }
+
+    def _clip_pool(self, scope, scope_id):
+        """All clips for a game or channel over the last 30 days, highest views first"""
+        with self._lock:
+            key = (scope, scope_id)
+            if key in self._clips:
+                return self._clips[key]
+
+            rng = random.Random(_stable_int(self.seed, scope, scope_id))
+            count = self.clips_per_game if scope == 'game' else self.clips_per_channel
+            titles = ['insane clutch play', 'the funniest moment', 'when chat goes crazy', 'epic fail',
+                      'best reaction ever', 'what just happened', 'que paso aqui', 'this is the play']
+            clips = []
+            for i in range(count):
+                if scope == 'game':
+                    broadcaster_id = str(20000000 + rng.randrange(400))
+                    game_id = scope_id
+                else:
+                    broadcaster_id = scope_id
+                    game_id = str(1000 + rng.randrange(30))
+                age = timedelta(seconds=rng.randrange(30 * 24 * 3600))
+                video_id = str(_stable_int(broadcaster_id, age.days) % 10**9)
+                clip_id = f"{scope[0]}{scope_id}Clip{i}"
+                clip = {
+                    'id': clip_id,
+                    'url': f"https://clips.twitch.tv/{clip_id}",
+                    'embed_url': f"https://clips.twitch.tv/embed?clip={clip_id}",
+                    'broadcaster_id': broadcaster_id,
+                    'broadcaster_name': f"Streamer_{broadcaster_id}",
+                    'creator_id': str(30000000 + rng.randrange(100000)),
+                    'creator_name': f"viewer{rng.randrange(100000)}",
+                    'video_id': video_id,
+                    'game_id': game_id,
+                    'language': 'en' if rng.random() < 0.8 else 'es',
+                    'title': f"{rng.choice(titles)} #{i}",
+                    'view_count': int(rng.paretovariate(1.2) * 50),
+                    'created_at': (self.now - age).strftime(HELIX_TIME_FORMAT),
+                    'thumbnail_url': f"https://clips-media-assets2.twitch.tv/{clip_id}-preview-480x272.jpg",
+                    'duration': round(rng.uniform(5, 60), 1),
+                    'vod_offset': rng.randrange(20000),
+                    'is_featured': False
+                }
+                clips.append(clip)
+                self._clip_index[clip_id] = clip
+
+            clips.sort(key=lambda c: c['view_count'], reverse=True)
+            self._clips[key] = clips
+            return clips
+
+    def clips(self, scope, scope_id, started_at=None, ended_at=None):
+        pool = self._clip_pool(scope, scope_id)
+        if not started_at and not ended_at:
+            return pool
+        started_at = started_at or '0000'
+        ended_at = ended_at or '9999'
+        return [c for c in pool if started_at <= c['created_at'] <= ended_at]
+
+    def clips_by_id(self, clip_ids):
+        with self._lock:
+            return [self._clip_index[clip_id] for clip_id in clip_ids if clip_id in self._clip_index]
+
+
+class FakeHelixServer:
+    """Threaded HTTP server wrapping FakeHelixData with latency, rate limits and 429 injection"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 rate_limit=800, rate_window=60, data=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.data = data or FakeHelixData()
+        self.tokens_issued = 0
+        self.revoked_tokens = set()
+        self.request_counts = {}
+        self.bytes_sent = 0
+        self._bucket = rate_limit
+        self._bucket_reset = time.time() + rate_window
+        self._lock = threading.Lock()
+        self._rng = random.Random(7)
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    @property
+    def base_url(self):
+        return f"http://{self._httpd.server_address[0]}:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': dict(self.request_counts),
+                'total_requests': sum(self.request_counts.values()),
+                'bytes_sent': self.bytes_sent,
+                'tokens_issued': self.tokens_issued
+            }
+
+    def revoke_all_tokens(self):
+        """Make every token issued so far fail with 401, as if it had expired"""
+        with self._lock:
+            self.revoked_tokens.update(f"faketoken{i}" for i in range(1, self.tokens_issued + 1))
+
+    def reset_stats(self):
+        with self._lock:
+            self.request_counts = {}
+            self.bytes_sent = 0
+
+    def _take_rate_token(self):
+        """Return (allowed, remaining, reset_epoch) for Helix's points bucket"""
+        with self._lock:
+            now = time.time()
+            if now >= self._bucket_reset:
+                self._bucket = self.rate_limit
+                self._bucket_reset = now + self.rate_window
+            if self._bucket <= 0:
+                return False, 0, int(self._bucket_reset)
+            self._bucket -= 1
+            return True, self._bucket, int(self._bucket_reset)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, str(value))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+            def _send_empty(self, status, headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, str(value))
+                self.end_headers()
+
+            def _count(self, endpoint):
+                with server._lock:
+                    server.request_counts[endpoint] = server.request_counts.get(endpoint, 0) + 1
+
+            def _delay(self):
+                if server.latency_ms or server.jitter_ms:
+                    jitter = server._rng.uniform(0, server.jitter_ms) if server.jitter_ms else 0
+                    time.sleep((server.latency_ms + jitter) / 1000.0)
+
+            def do_POST(self):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                self._count(parsed.path)
+                self._delay()
+
+                if parsed.path == '/oauth2/token':
+                    query = parse_qs(parsed.query)
+                    if not query.get('client_id') or not query.get('client_secret'):
+                        return self._send_json(400, {'status': 400, 'message': 'missing client id'})
+                    with server._lock:
+                        server.tokens_issued += 1
+                        token = f"faketoken{server.tokens_issued}"
+                    return self._send_json(200, {'access_token': token, 'expires_in': 5000000,
+                                                 'token_type': 'bearer'})
+                if parsed.path == '/oauth2/revoke':
+                    token = parse_qs(parsed.query).get('token', [''])[0]
+                    with server._lock:
+                        server.revoked_tokens.add(token)
+                    return self._send_json(200, {})
+                return self._send_json(404, {'error': 'Not Found'})
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                endpoint = parsed.path
+
+                if endpoint == '/_stats':
+                    return self._send_json(200, server.stats())
+
+                self._count(endpoint)
+                self._delay()
+
+                if endpoint == '/oauth2/validate':
+                    if self.headers.get('Authorization', '').startswith('OAuth '):
+                        return self._send_json(200, {'client_id': 'fake', 'expires_in': 5000000})
+                    return self._send_json(401, {'status': 401, 'message': 'invalid access token'})
+
+                if not endpoint.startswith('/helix/'):
+                    return self._send_json(404, {'error': 'Not Found'})
+
+                authorization = self.headers.get('Authorization', '')
+                if not authorization.startswith('Bearer '):
+                    return self._send_json(401, {'error': 'Unauthorized', 'status': 401,
+                                                 'message': 'OAuth token is missing'})
+                if authorization[len('Bearer '):] in server.revoked_tokens:
+                    return self._send_json(401, {'error': 'Unauthorized', 'status': 401,
+                                                 'message': 'Invalid OAuth token'})
+
+                allowed, remaining, reset = server._take_rate_token()
+                rate_headers = {'Ratelimit-Limit': server.rate_limit, 'Ratelimit-Remaining': remaining,
+                                'Ratelimit-Reset': reset}
+                if not allowed or (server.error_rate and server._rng.random() < server.error_rate):
+                    return self._send_json(429, {'error': 'Too Many Requests', 'status': 429,
+                                                 'message': 'Too Many Requests'}, rate_headers)
+
+                handler = {
+                    '/helix/games': self._games,
+                    '/helix/games/top': self._top_games,
+                    '/helix/users': self._users,
+                    '/helix/clips': self._clips
+                }.get(endpoint)
+                if not handler:
+                    return self._send_json(404, {'error': 'Not Found'}, rate_headers)
+                status, payload = handler(query)
+                if status == 200 and endpoint in ('/helix/games', '/helix/users'):
+                    # Metadata gets an ETag so clients can revalidate with If-None-Match
+                    etag = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest() + '"'
+                    rate_headers['ETag'] = etag
+                    if self.headers.get('If-None-Match') == etag:
+                        return self._send_empty(304, rate_headers)
+                return self._send_json(status, payload, rate_headers)
+
+            def _games(self, query):
+                games = [server.data.game_by_name(name) for name in query.get('name', [])]
+                games += [server.data.game_by_id(game_id) for game_id in query.get('id', [])]
+                return 200, {'data': games}
+
+            def _top_games(self, query):
+                return 200, self._paginate(server.data.top_games(), query, default_first=20)
+
+            def _users(self, query):
+                users = [server.data.user_by_login(login) for login in query.get('login', [])]
+                users += [server.data.user_by_id(user_id) for user_id in query.get('id', [])]
+                return 200, {'data': users}
+
+            def _clips(self, query):
+                started_at = query.get('started_at', [None])[0]
+                ended_at = query.get('ended_at', [None])[0]
+                if 'id' in query:
+                    return 200, {'data': server.data.clips_by_id(query['id']), 'pagination': {}}
+                if 'game_id' in query:
+                    clips = server.data.clips('game', query['game_id'][0], started_at, ended_at)
+                elif 'broadcaster_id' in query:
+                    clips = server.data.clips('channel', query['broadcaster_id'][0], started_at, ended_at)
+                else:
+                    return 400, {'error': 'Bad Request', 'status': 400,
+                                 'message': 'Missing required parameter "broadcaster_id", "game_id" or "id"'}
+                return 200, self._paginate(clips, query, default_first=20)
+
+            def _paginate(self, items, query, default_first):
+                try:
+                    first = int(query.get('first', [default_first])[0])
+                except ValueError:
+                    first = default_first
+                first = max(1, min(first, 100))
+                offset = _decode_cursor(query['after'][0]) if 'after' in query else 0
+                page = items[offset:offset + first]
+                pagination = {}
+                if offset + first < len(items):
+                    pagination['cursor'] = _encode_cursor(offset + first)
+                return {'data': page, 'pagination': pagination}
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Twitch Helix/OAuth server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Fixed delay added to every response")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="Random extra delay up to this many ms")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of Helix calls answered with 429")
+    parser.add_argument('--rate-limit', type=int, default=800, help="Helix requests allowed per window")
+    args = parser.parse_args()
+
+    server = FakeHelixServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate,
+                             args.rate_limit)
+    print(f"🧪 Fake Helix running at {server.base_url}")
+    print(f"   TWITCH_AUTH_URL={server.base_url}/oauth2")
+    print(f"   TWITCH_HELIX_URL={server.base_url}/helix")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping fake Helix")
+
+
+if __name__ == "__main__":
+    main()
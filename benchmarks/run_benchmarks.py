@@ -0,0 +1,184 @@
+"""
+End-to-end benchmark suite against the local fake Helix server
+Times the top clips scraper, the channel highlights scraper, both Excel
+generators and a full Flask job lifecycle, and writes the results as JSON
+so runs can be compared for regressions.
+
+Usage:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --latency-ms 50 --error-rate 0.01 --output results.json
+    python -m benchmarks.run_benchmarks --only top_clips channel_highlights
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append('..')
+from benchmarks.fake_helix import FakeHelixServer
+
+BENCHMARKS = ['top_clips', 'channel_highlights', 'clips_excel', 'highlights_excel', 'api_job_lifecycle']
+
+DEFAULT_OUTPUT_DIR = os.path.join('benchmarks', 'results')
+
+
+def configure_environment(server, state_dir):
+    """Point the scrapers at the fake server; must run before they are imported"""
+    os.environ['TWITCH_CLIENT_ID'] = 'benchmark-client-id'
+    os.environ['TWITCH_CLIENT_SECRET'] = 'benchmark-client-secret'
+    os.environ['TWITCH_AUTH_URL'] = f"{server.base_url}/oauth2"
+    os.environ['TWITCH_HELIX_URL'] = f"{server.base_url}/helix"
+    os.environ['TWITCH_WATERMARK_FILE'] = os.path.join(state_dir, 'watermarks.json')
+    os.environ['TWITCH_SEGMENT_CACHE_DIR'] = os.path.join(state_dir, 'segments')
+    os.environ['TWITCH_SNAPSHOT_DB'] = os.path.join(state_dir, 'snapshots.db')
+    os.environ['TWITCH_RESPONSE_CACHE_DIR'] = os.path.join(state_dir, 'responses')
+    os.environ['API_SCHEDULER'] = '0'  # Scheduled scrapes would run alongside the measured jobs
+
+
+def timed(server, func):
+    """Run func and return (result, measurements)"""
+    server.reset_stats()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    stats = server.stats()
+    return result, {
+        'seconds': round(elapsed, 4),
+        'api_requests': stats['total_requests'],
+        'requests_by_endpoint': stats['requests'],
+        'bytes_received': stats['bytes_sent']
+    }
+
+
+def run_suite(server, selected, work_dir):
+    # Imported here so they pick up the fake server's URLs
+    from shared.auth import get_twitch_token
+    from clip_scraper.clips_getter import get_top_clips
+    from clip_scraper.excel_generator import create_clips_excel
+    from highlight_scraper.highlights_getter import get_top_highlights_by_channel
+    from highlight_scraper.excel_generator import create_highlights_excel
+    from highlight_scraper.channel_config import get_preset
+    from api.app import app
+
+    results = {}
+    token = get_twitch_token()
+    preset = get_preset('gaming')
+    clips = None
+    highlights = None
+
+    if 'top_clips' in selected or 'clips_excel' in selected:
+        clips, results['top_clips'] = timed(server, lambda: get_top_clips(token, days_back=1, limit=150, strategy='mixed'))
+        results['top_clips']['clips'] = len(clips)
+
+    if 'channel_highlights' in selected or 'highlights_excel' in selected:
+        highlights, results['channel_highlights'] = timed(server, lambda: get_top_highlights_by_channel(
+            token, preset['channels'], days_back=preset['days_back'],
+            clips_per_channel=preset['clips_per_channel']
+        ))
+        results['channel_highlights']['clips'] = sum(len(c) for c in highlights.values())
+
+    if 'clips_excel' in selected:
+        path = os.path.join(work_dir, 'bench_clips.xlsx')
+        _, results['clips_excel'] = timed(server, lambda: create_clips_excel(clips, filename=path))
+        results['clips_excel']['rows'] = len(clips)
+
+    if 'highlights_excel' in selected:
+        path = os.path.join(work_dir, 'bench_highlights.xlsx')
+        _, results['highlights_excel'] = timed(server, lambda: create_highlights_excel(
+            highlights, preset['channels'], filename=path, separate_sheets=True
+        ))
+        single_path = os.path.join(work_dir, 'bench_highlights_single.xlsx')
+        _, results['highlights_excel_single_sheet'] = timed(server, lambda: create_highlights_excel(
+            highlights, preset['channels'], filename=single_path, separate_sheets=False
+        ))
+
+    if 'api_job_lifecycle' in selected:
+        _, results['api_job_lifecycle'] = timed(server, lambda: _api_job_lifecycle(app))
+
+    for name in [n for n in ('top_clips', 'channel_highlights') if n not in selected]:
+        results.pop(name, None)  # Only ran as input for an exporter benchmark
+
+    return results
+
+
+def _api_job_lifecycle(app, timeout=600):
+    """Submit a top-clips job, poll it to completion, read the clips and delete it"""
+    client = app.test_client()
+    response = client.post('/api/scrape/top-clips', json={'days_back': 1, 'limit': 150})
+    job_id = response.get_json()['job_id']
+
+    deadline = time.time() + timeout
+    status = None
+    while time.time() < deadline:
+        status = client.get(f'/api/jobs/{job_id}').get_json()['status']
+        if status in ('completed', 'failed'):
+            break
+        time.sleep(0.05)
+
+    clips = client.get(f'/api/jobs/{job_id}/clips').get_json()
+    client.delete(f'/api/jobs/{job_id}')
+    if status != 'completed':
+        raise RuntimeError(f"API job ended with status {status}")
+    return clips
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scraper benchmarks against a fake Helix server")
+    parser.add_argument('--latency-ms', type=float, default=20, help="Fake server latency per request")
+    parser.add_argument('--jitter-ms', type=float, default=10, help="Random extra latency per request")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of Helix calls that return 429")
+    parser.add_argument('--rate-limit', type=int, default=800, help="Fake Helix requests per minute")
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help="Run only these benchmarks")
+    parser.add_argument('--output', help="JSON results path (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    selected = args.only or BENCHMARKS
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    output = os.path.abspath(output)
+
+    server = FakeHelixServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                             error_rate=args.error_rate, rate_limit=args.rate_limit).start()
+    print(f"🧪 Fake Helix running at {server.base_url}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(server, os.path.join(work_dir, 'state'))
+        original_dir = os.getcwd()
+        os.chdir(work_dir)  # Exporters and caches write relative to the working directory
+        try:
+            results = run_suite(server, selected, work_dir)
+        finally:
+            os.chdir(original_dir)
+            server.stop()
+
+    report = {
+        'run_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'latency_ms': args.latency_ms,
+            'jitter_ms': args.jitter_ms,
+            'error_rate': args.error_rate,
+            'rate_limit': args.rate_limit
+        },
+        'results': results
+    }
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print("\n" + "=" * 60)
+    print("📊 BENCHMARK RESULTS")
+    print("=" * 60)
+    for name, measurement in results.items():
+        print(f"   {name:32s} {measurement['seconds']:>9.3f}s  {measurement['api_requests']:>5} API calls")
+    print(f"\n📁 Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,17 +5,29 @@ import time
 import re
 import sys
 sys.path.append('..')
-from shared.auth import get_twitch_headers, make_twitch_request
+from shared.auth import get_twitch_headers, make_twitch_request, rate_limit_sleep, HELIX_URL
+from shared.watermarks import get_watermark_store, merge_incremental
+from shared.segment_cache import get_segment_cache
+from shared.sharding import fetch_sharded
+from shared.topk import TopKAccumulator
+from shared.clip_registry import ClipRegistry
+from shared.clip_model import to_clips
+from shared.snapshots import get_snapshot_store, record_snapshots
+from shared.scoring import rank_clips, uses_scoring
+from shared.clustering import keep_best_per_moment
+from shared.tracing import traced, span
+from clip_scraper.game_planner import discover_top_games, plan_games, get_game_stats_store
 
 # Cache for game info to avoid repeated API calls
 GAME_CACHE = {}
 
+@traced()
 def get_game_info_by_name(token, game_name):
     """Get game ID and info by game name with caching"""
     if game_name in GAME_CACHE:
         return GAME_CACHE[game_name]
     
-    url = 'https://api.twitch.tv/helix/games'
+    url = f'{HELIX_URL}/games'
     params = {'name': game_name}
     
     try:
@@ -36,12 +48,13 @@ def get_game_info_by_name(token, game_name):
         print(f"⚠️ Error looking up game '{game_name}': {e}")
         return None
 
+@traced()
 def get_games_by_ids(token, game_ids):
     """Get game names for multiple game IDs at once"""
     if not game_ids:
         return {}
     
-    url = 'https://api.twitch.tv/helix/games'
+    url = f'{HELIX_URL}/games'
     game_info = {}
     
     # Process in chunks of 100
@@ -60,16 +73,17 @@ def get_games_by_ids(token, game_ids):
         except Exception as e:
             print(f"⚠️ Exception fetching game info: {e}")
         
-        time.sleep(0.1)  # Small delay between requests
+        rate_limit_sleep(0.1)  # Small delay between requests
     
     return game_info
 
+@traced()
 def get_broadcaster_info(token, user_ids):
     """Get broadcaster language and info for multiple users"""
     if not user_ids:
         return {}
     
-    url = 'https://api.twitch.tv/helix/users'
+    url = f'{HELIX_URL}/users'
     broadcaster_info = {}
     
     # Process in chunks of 100 (API limit)
@@ -90,10 +104,11 @@ def get_broadcaster_info(token, user_ids):
         except Exception as e:
             print(f"⚠️ Exception fetching broadcaster info: {e}")
         
-        time.sleep(0.1)  # Small delay between requests
+        rate_limit_sleep(0.1)  # Small delay between requests
     
     return broadcaster_info
 
+@traced()
 def is_likely_english_content(clip, broadcaster_info=None):
     """
     Determine if clip is likely English content based on:
@@ -164,8 +179,19 @@ def is_likely_english_content(clip, broadcaster_info=None):
     # Default: if we can't determine, include it (better to have false positives)
     return True
 
-def get_clips_by_game(token, game_name, days_back=1, limit=50, english_only=True):
-    """Get clips from a specific game with optional English filtering"""
+@traced()
+def get_clips_by_game(token, game_name, days_back=1, limit=50, english_only=True, incremental=False,
+                      segment_cache=False, shards=1):
+    """
+    Get clips from a specific game with optional English filtering
+    
+    With incremental=True only the time since the last run for this game
+    is fetched, and the result is merged with the previous run's clips.
+    With segment_cache=True the window is assembled from cached time segments
+    (shards then sets how many missing segments are fetched in parallel).
+    With shards > 1 the window is split into sub-windows fetched in parallel,
+    which gets past the 100-clips-per-request ceiling for busy categories.
+    """
     print(f"🎮 Fetching clips for: {game_name}")
     
     # Get game ID first
@@ -180,22 +206,48 @@ def get_clips_by_game(token, game_name, days_back=1, limit=50, english_only=True
     end_time = datetime.utcnow()
     start_time = end_time - timedelta(days=days_back)
     
-    started_at = start_time.strftime('%Y-%m-%dT%H:%M:%SZ')
+    # Incremental mode resumes from this game's watermark
+    fetch_start = start_time
+    previous_clips = []
+    if incremental:
+        watermark_store = get_watermark_store()
+        watermark_key = f"game:{game_id}:{'en' if english_only else 'all'}"
+        fetch_start, previous_clips = watermark_store.resume_window(watermark_key, start_time, limit)
+        if previous_clips or fetch_start > start_time:
+            print(f"⏩ {game_name}: Resuming from {fetch_start.strftime('%Y-%m-%d %H:%M')} UTC ({len(previous_clips)} clips carried over)")
+    
+    started_at = fetch_start.strftime('%Y-%m-%dT%H:%M:%SZ')
     ended_at = end_time.strftime('%Y-%m-%dT%H:%M:%SZ')
 
-    url = 'https://api.twitch.tv/helix/clips'
+    # Get more clips if filtering; segments and shards can return more than one page
+    fetch_limit = limit * 2 if english_only else limit
+
+    url = f'{HELIX_URL}/clips'
     params = {
         'game_id': game_id,
         'started_at': started_at,
         'ended_at': ended_at,
-        'first': limit * 2 if english_only else limit  # Get more clips if filtering
+        'first': min(100, fetch_limit)  # API max is 100 per request
     }
 
+    fetched_at = {}  # clip id -> when a cached segment's counts were fetched
     try:
-        data = make_twitch_request(url, params)
-        clips = data.get('data', [])
+        if segment_cache:
+            clips = get_segment_cache().fetch_window(
+                f"game:{game_id}", {'game_id': game_id}, fetch_start, end_time, fetch_limit, shards=shards,
+                fetched_at=fetched_at
+            )
+        elif shards > 1:
+            clips = fetch_sharded({'game_id': game_id}, fetch_start, end_time, shards, fetch_limit)
+        else:
+            data = make_twitch_request(url, params)
+            clips = data.get('data', [])
+        
+        # Compact Clip objects (slots instead of per-clip dicts)
+        clips = to_clips(clips)
         
         # Get broadcaster info for all clips to get proper channel names
+        broadcaster_info = {}
         if clips:
             user_ids = list(set(clip.get('broadcaster_id') for clip in clips if clip.get('broadcaster_id')))
             broadcaster_info = get_broadcaster_info(token, user_ids)
@@ -216,15 +268,23 @@ def get_clips_by_game(token, game_name, days_back=1, limit=50, english_only=True
         if english_only and clips:
             # Use the broadcaster info we already fetched for language detection
             english_clips = []
-            for clip in clips:
-                if is_likely_english_content(clip, broadcaster_info):
-                    english_clips.append(clip)
+            with span('language_filter', clips=len(clips)):
+                for clip in clips:
+                    if is_likely_english_content(clip, broadcaster_info):
+                        english_clips.append(clip)
             
             clips = english_clips[:limit]  # Limit after filtering
             
             print(f"✅ {game_name}: Found {len(clips)} English clips")
         else:
             print(f"✅ {game_name}: Found {len(clips)} clips")
+        
+        # View counts over time, for sort='trending'
+        record_snapshots(clips, english=english_only, fetched_at=fetched_at)
+        
+        if incremental:
+            clips = merge_incremental(previous_clips, clips, limit)
+            watermark_store.update(watermark_key, end_time, clips, start_time, limit)
             
         return clips
         
@@ -232,7 +292,9 @@ def get_clips_by_game(token, game_name, days_back=1, limit=50, english_only=True
         print(f"⚠️ Exception fetching clips for {game_name}: {e}")
         return []
 
-def get_top_clips(token, days_back=1, limit=150, strategy='mixed', english_only=True, game_filter=None):
+@traced()
+def get_top_clips(token, days_back=1, limit=150, strategy='adaptive', english_only=True, game_filter=None, incremental=False,
+                  segment_cache=False, shards=1, registry=None, sort='views', scoring=None, cluster=False):
     """
     Get top clips from multiple popular games
     
@@ -241,8 +303,27 @@ def get_top_clips(token, days_back=1, limit=150, strategy='mixed', english_only=
     - Filters for English-speaking content
     - Enhanced language detection
     - Adds broadcaster/channel name information
+    - Skips repeated categories and duplicate clips (pass a ClipRegistry to read the counts)
+    
+    strategy='adaptive' adds this hour's top categories from Helix to the list
+    below and splits the clip budget by how each game did on previous runs;
+    strategy='mixed' gives every listed game the same share.
+    
+    sort='trending' skips scraping and ranks the clips recorded by earlier
+    runs by how fast they are gaining views (see shared/snapshots.py).
+    A scoring config (see shared/scoring.py) ranks the collected clips by
+    composite score instead of raw views.
+    cluster=True collapses clips of the same stream moment into their best
+    clip, with cluster_size counting the clips merged (see shared/clustering.py).
     """
     
+    if sort == 'trending':
+        if cluster:
+            return keep_best_per_moment(get_trending_clips(days_back, limit * 2, english_only, game_filter), limit)
+        return get_trending_clips(days_back, limit, english_only, game_filter)
+    
+    registry = registry or ClipRegistry()
+    
     # Comprehensive list of popular Twitch categories
     popular_games = [
         # Always popular
@@ -280,33 +361,72 @@ def get_top_clips(token, days_back=1, limit=150, strategy='mixed', english_only=
         print(f"🌍 Language Filter: {'English Only' if english_only else 'All Languages'}")
         print(f"⏰ Looking for clips from the last {days_back} day(s)")
         
-        clips = get_clips_by_game(token, game_filter, days_back, limit, english_only)
+        clips = get_clips_by_game(token, game_filter, days_back, limit, english_only,
+                                  incremental=incremental, segment_cache=segment_cache, shards=shards)
+        clips = registry.filter_new(clips)
         if clips:
-            # Sort by view count
-            sorted_clips = sorted(clips, key=lambda x: x.get('view_count', 0), reverse=True)
-            return sorted_clips[:limit]
+            # Keep the top clips by view count (or score)
+            if cluster:
+                return keep_best_per_moment(rank_clips(clips, scoring=scoring), limit)
+            return rank_clips(clips, limit, scoring)
         else:
             return []
     
-    print(f"🎯 Using Multiple Games Strategy")
+    if strategy == 'adaptive':
+        # Categories trending right now come first, the curated list fills in
+        game_stats = get_game_stats_store()
+        discovered = discover_top_games()
+        for game in discovered:
+            GAME_CACHE.setdefault(game['name'], {'id': game['id'], 'name': game['name'], 'box_art_url': ''})
+        candidates = registry.dedupe_work('game', [game['name'] for game in discovered] + popular_games)
+        game_plan = plan_games(candidates, game_stats, limit, english_only)
+        popular_games = [entry['name'] for entry in game_plan]
+    else:
+        # Repeated categories would cost a full fetch and only produce duplicate rows
+        popular_games = registry.dedupe_work('game', popular_games)
+        clips_per_game = max(8, limit // len(popular_games))  # Dynamic clips per game
+        game_plan = [{'name': name, 'clips': clips_per_game, 'pages': 1} for name in popular_games]
+    
+    print(f"🎯 Using {'Adaptive' if strategy == 'adaptive' else 'Multiple'} Games Strategy")
     print(f"🌍 Language Filter: {'English Only' if english_only else 'All Languages'}")
     print(f"📊 Targeting {len(popular_games)} game categories")
     print(f"⏰ Looking for clips from the last {days_back} day(s)")
     
-    all_clips = []
+    # Clips stream into a bounded heap instead of one big list sorted at the end;
+    # scores depend on the whole candidate set, so scored runs keep every clip
+    top_clips = TopKAccumulator(limit if not (uses_scoring(scoring) or cluster) else sys.maxsize)
     successful_games = 0
-    clips_per_game = max(8, limit // len(popular_games))  # Dynamic clips per game
+    fetched_views = {}  # game -> (clips requested, view counts returned), for the adaptive stats
     
-    print(f"🔢 Aiming for ~{clips_per_game} clips per game")
+    if strategy == 'adaptive':
+        print(f"🔢 Allocating {sum(entry['clips'] for entry in game_plan)} clips across games by past yield "
+              f"({len(discovered)} discovered live)")
+    else:
+        print(f"🔢 Aiming for ~{clips_per_game} clips per game")
     print("-" * 50)
     
-    for i, game_name in enumerate(popular_games, 1):
-        print(f"[{i}/{len(popular_games)}] ", end="")
+    for i, entry in enumerate(game_plan, 1):
+        game_name = entry['name']
+        print(f"[{i}/{len(game_plan)}] ", end="")
         
         try:
-            clips = get_clips_by_game(token, game_name, days_back, clips_per_game, english_only)
+            # Different names can resolve to the same category
+            game_info = get_game_info_by_name(token, game_name)
+            if game_info and not registry.claim('game_id', game_info['id']):
+                print(f"♻️ Skipping '{game_name}' - already scraped as {game_info['name']}")
+                continue
+            
+            # Clustering merges duplicates away, so ask for more clips while the page has room
+            game_limit = max(entry['clips'], min(100, entry['clips'] * 2)) if cluster else entry['clips']
+            clips = get_clips_by_game(token, game_name, days_back, game_limit, english_only,
+                                      incremental=incremental, segment_cache=segment_cache,
+                                      shards=max(shards, entry['pages']))
+            fetched_views[game_info['name'] if game_info else game_name] = (
+                entry['clips'], [clip.get('view_count', 0) for clip in clips]
+            )
+            clips = registry.filter_new(clips)
             if clips:
-                all_clips.extend(clips)
+                top_clips.extend(clips)
                 successful_games += 1
                 
                 # Show preview of best clip from this game
@@ -318,29 +438,37 @@ def get_top_clips(token, days_back=1, limit=150, strategy='mixed', english_only=
                 print(f"   🏆 Best: '{title}...' by {channel} ({views:,} views)")
             
             # Small delay to be respectful to the API
-            time.sleep(0.5)
+            rate_limit_sleep(0.5)
             
         except Exception as e:
             print(f"⚠️ Failed to process {game_name}: {e}")
     
     print("-" * 50)
-    print(f"✅ Successfully gathered clips from {successful_games}/{len(popular_games)} games")
-    print(f"📈 Total clips collected: {len(all_clips)}")
+    print(f"✅ Successfully gathered clips from {successful_games}/{len(game_plan)} games")
+    print(f"📈 Total clips collected: {top_clips.seen}")
+    registry.print_summary()
     
-    if not all_clips:
+    if not top_clips:
         error_msg = "No clips found from any games."
         if english_only:
             error_msg += " Try setting english_only=False or check if there are English streamers active today."
         raise Exception(error_msg)
     
-    # Sort all clips by view count to get the true "top" clips
-    sorted_clips = sorted(all_clips, key=lambda x: x.get('view_count', 0), reverse=True)
-    
-    # Limit to requested number
-    final_clips = sorted_clips[:limit]
+    # The accumulator already holds the true "top" clips, highest views first
+    with span('sort:top_k', clips=len(top_clips)):
+        final_clips = top_clips.results()
+    if uses_scoring(scoring):
+        with span('sort:score', clips=len(final_clips)):
+            final_clips = rank_clips(final_clips, None if cluster else limit, scoring)
+    if cluster:
+        with span('cluster', clips=len(final_clips)):
+            final_clips = keep_best_per_moment(final_clips, limit)
     
     print(f"🎖️ Returning top {len(final_clips)} clips overall")
     
+    if strategy == 'adaptive':
+        game_stats.record_run(fetched_views, final_clips, limit)
+    
     if final_clips:
         top_clip = final_clips[0]
         print(f"🥇 #1 Clip: '{top_clip.get('title', 'No Title')[:50]}...'")
@@ -349,4 +477,19 @@ def get_top_clips(token, days_back=1, limit=150, strategy='mixed', english_only=
         print(f"   👤 Creator: {top_clip.get('creator_name', 'Unknown')}")
         print(f"   📺 Channel: {top_clip.get('broadcaster_name', 'Unknown')}")
     
-    return final_clips
\ No newline at end of file
+    return final_clips
+
+def get_trending_clips(days_back=1, limit=150, english_only=True, game_filter=None):
+    """Fastest-rising clips from the stored view-count snapshots, without calling Helix"""
+    print(f"📈 Ranking recorded clips from the last {days_back} day(s) by views per hour")
+    with span('sort:trending'):
+        clips = get_snapshot_store().trending(days_back, limit, english_only, game_filter)
+    
+    if not clips:
+        raise Exception("No view-count snapshots for this period yet. Run a normal scrape first; "
+                        "trending needs at least one, and works best with a few runs some time apart.")
+    
+    top_clip = clips[0]
+    print(f"🚀 #1 Trending: '{top_clip.get('title', 'No Title')[:50]}...'")
+    print(f"   📈 {top_clip.get('views_per_hour', 0):,.0f} views/hour ({top_clip.get('view_count', 0):,} views)")
+    return clips
@@ -2,7 +2,11 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill
 from datetime import datetime
 import os
+import sys
+sys.path.append('..')
+from shared.tracing import traced
 
+@traced()
 def create_clips_excel(clips_data, filename=None):
     """Create an Excel file from the clips data."""
 
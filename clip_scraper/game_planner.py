@@ -0,0 +1,168 @@
+"""
+Game discovery and adaptive clip allocation for get_top_clips
+Pulls the categories that are live right now from /helix/games/top, merges
+them with the curated list, and splits the run's clip budget across games by
+how many clips each game actually placed in the top list on previous runs.
+Games that never make the cut get a small exploratory share, games that
+filled their whole allocation with top-list clips get more (and more pages).
+"""
+
+import json
+import math
+import os
+import threading
+from datetime import datetime
+
+from shared.auth import make_twitch_request, HELIX_URL
+from shared.clip_registry import canonical_work_key
+
+# Per-game history from previous runs
+GAME_STATS_FILE = os.getenv("TWITCH_GAME_STATS_FILE", os.path.join(".scraper_state", "game_stats.json"))
+
+# How many of the current top categories to consider
+DISCOVERY_COUNT = 30
+
+# Games fetched per run; one clips call each, the same as the fixed list
+MAX_GAMES = 20
+
+# Never-seen games tried every run so new trends can earn a share
+EXPLORE_GAMES = 3
+
+MIN_CLIPS_PER_GAME = 5
+MAX_CLIPS_PER_GAME = 300
+
+# Ask for a bit more than the expected contribution; the top-k cut drops the rest
+ALLOCATION_HEADROOM = 1.5
+
+# Weight of the newest run in a game's moving average
+HISTORY_WEIGHT = 0.5
+
+# Clips per /helix/clips page
+PAGE_SIZE = 100
+
+
+def discover_top_games(count=DISCOVERY_COUNT):
+    """Current top categories by viewers as [{'id', 'name'}], empty if Helix can't be reached"""
+    try:
+        data = make_twitch_request(f'{HELIX_URL}/games/top', {'first': min(count, 100)})
+    except Exception as e:
+        print(f"⚠️ Could not discover top games, using the curated list: {e}")
+        return []
+    return [{'id': game['id'], 'name': game['name']} for game in data.get('data', [])]
+
+
+class GameStatsStore:
+    """Per-game moving averages of how many clips made the final top list"""
+
+    def __init__(self, path=GAME_STATS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {'games': {}}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            state.setdefault('games', {})
+            return state
+        except (OSError, ValueError):
+            print(f"⚠️ Ignoring unreadable game stats file: {self.path}")
+            return {'games': {}}
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, game_name):
+        return self._state['games'].get(canonical_work_key('game', game_name)[1])
+
+    def record_run(self, fetched, final_clips, limit):
+        """
+        Update every fetched game's expected contribution.
+        fetched: {game_name: (clips_requested, [view counts of clips returned])}
+        """
+        cutoff = final_clips[-1].get('view_count', 0) if len(final_clips) >= limit else 0
+        with self._lock:
+            games = self._state['games']
+            for game_name, (requested, views) in fetched.items():
+                views = sorted(views, reverse=True)
+                above = sum(1 for v in views if v >= cutoff)
+                # Every clip we got was good enough and we got all we asked for:
+                # the game was capped by its allocation, so its true share is larger
+                saturated = views and above == len(views) and len(views) >= requested
+                observed = above * 2 if saturated else above
+
+                key = canonical_work_key('game', game_name)[1]
+                entry = games.get(key)
+                if entry is None:
+                    entry = games[key] = {'name': game_name, 'runs': 0, 'expected': float(observed)}
+                else:
+                    entry['expected'] = (1 - HISTORY_WEIGHT) * entry['expected'] + HISTORY_WEIGHT * observed
+                entry['runs'] += 1
+                entry['last_top_views'] = views[0] if views else 0
+                entry['last_run'] = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+
+            self._state['cutoff'] = cutoff
+            self._state['limit'] = limit
+            try:
+                self._save()
+            except OSError as e:
+                print(f"⚠️ Could not save game stats: {e}")
+
+
+def plan_games(candidates, stats, limit, english_only=True, max_games=MAX_GAMES):
+    """
+    Pick which games to fetch and how many clips (and pages) to ask each for.
+    candidates: game names in priority order (discovered first, then curated).
+    Returns [{'name', 'clips', 'pages', 'expected', 'known'}] best first.
+    """
+    known, unknown = [], []
+    for rank, name in enumerate(candidates):
+        entry = stats.get(name)
+        if entry:
+            known.append((entry['expected'], rank, name))
+        else:
+            unknown.append((rank, name))
+
+    # Best known performers, plus a few unseen games to keep exploring
+    known.sort(key=lambda item: (-item[0], item[1]))
+    explore = unknown[:max(EXPLORE_GAMES, max_games - len(known))]
+    chosen = known[:max_games - min(len(explore), max_games)]
+    # Never-seen games are priced like an average known game, discovered ranks first
+    default_expected = (sum(e for e, _, _ in chosen) / len(chosen)) if chosen else limit / max_games
+    chosen += [(default_expected * (1.5 if rank < EXPLORE_GAMES else 1.0), rank, name)
+               for rank, name in explore[:max_games - len(chosen)]]
+
+    total_expected = sum(max(expected, 0.0) for expected, _, _ in chosen) or 1.0
+    plan = []
+    for expected, _, name in sorted(chosen, key=lambda item: (-item[0], item[1])):
+        share = max(expected, 0.0) / total_expected
+        clips = int(min(MAX_CLIPS_PER_GAME, max(MIN_CLIPS_PER_GAME,
+                                                math.ceil(limit * share * ALLOCATION_HEADROOM))))
+        raw = clips * 2 if english_only else clips  # get_clips_by_game over-fetches before filtering
+        plan.append({
+            'name': name,
+            'clips': clips,
+            'pages': max(1, math.ceil(raw / PAGE_SIZE)),
+            'expected': round(expected, 2),
+            'known': stats.get(name) is not None
+        })
+    return plan
+
+
+# Global instance for easy access
+_game_stats_store = None
+
+def get_game_stats_store():
+    """Get shared GameStatsStore instance"""
+    global _game_stats_store
+    if _game_stats_store is None:
+        _game_stats_store = GameStatsStore()
+    return _game_stats_store
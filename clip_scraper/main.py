@@ -1,10 +1,25 @@
+import os
 import sys
+from contextlib import nullcontext
 sys.path.append('..')
 from shared.auth import get_twitch_token
+from shared.metrics import REQUEST_METRICS
+from shared.profiling import profile_run
 from clip_scraper.clips_getter import get_top_clips
 from clip_scraper.excel_generator import create_clips_excel
 
-def main():
+PROFILE_DIR = os.path.join('clips_output', 'profiles')
+
+def main(incremental=False, profile=False, sort='views', cluster=False):
+    profiling = profile_run('top_clips', PROFILE_DIR) if profile else nullcontext()
+    with profiling as report:
+        exit_code = run_scraper(incremental=incremental, sort=sort, cluster=cluster)
+    if report:
+        report.print_summary()
+    if exit_code:
+        sys.exit(exit_code)  # Only after the profile summary, so failed runs still get one
+
+def run_scraper(incremental=False, sort='views', cluster=False):
     try:
         print("🚀 Twitch Top Clips Scraper - Multi-Game Strategy")
         print("=" * 60)
@@ -14,10 +29,13 @@ def main():
         print("✅ Authentication successful!")
         print()
         
-        print("📥 Starting multi-game clip collection...")
-        print("🎯 This will search across 20+ popular game categories")
-        print("📊 Targeting top 150 clips overall")
-        print("⏳ This may take 2-3 minutes due to API rate limits...")
+        if sort == 'trending':
+            print("📈 Ranking clips from earlier runs by views per hour (no new scraping)...")
+        else:
+            print("📥 Starting multi-game clip collection...")
+            print("🎯 This will search across today's top game categories")
+            print("📊 Targeting top 150 clips overall")
+            print("⏳ This may take 2-3 minutes due to API rate limits...")
         print()
         
         # Strategy 3: Multiple games approach with English filtering
@@ -25,8 +43,11 @@ def main():
             token=token, 
             days_back=1,         # Last 24 hours
             limit=150,           # Top 150 clips overall
-            strategy='mixed',    # Multi-game strategy
-            english_only=True    # NEW: Filter for English content only
+            strategy='adaptive', # Live top games, clip budget split by past yield
+            english_only=True,   # NEW: Filter for English content only
+            incremental=incremental,  # Only fetch what changed since the last run
+            sort=sort,           # 'trending': rank recorded clips by views per hour instead
+            cluster=cluster      # One clip per stream moment
         )
         
         print()
@@ -88,6 +109,9 @@ def main():
             print(f"   {i}. {title}")
             print(f"      👤 {creator} | 🎮 {game} | 👀 {views:,} views")
         
+        # Where this run spent its Twitch API time
+        REQUEST_METRICS.print_summary()
+        
         print("\n" + "=" * 60)
         print("🎊 SUCCESS! Your top Twitch clips spreadsheet is ready!")
         print("📂 Check the 'clips_output' folder for your Excel file")
@@ -95,14 +119,22 @@ def main():
 
     except KeyboardInterrupt:
         print("\n⚠️ Process interrupted by user")
-        sys.exit(0)
+        return 0
     except Exception as e:
         print(f"\n❌ An error occurred: {e}")
         print("\n💡 Troubleshooting tips:")
         print("   • Check your .env file has valid Twitch credentials")
         print("   • Ensure you have internet connection")
         print("   • Try running again (API might be temporarily busy)")
-        sys.exit(1)
+        return 1
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sort = 'views'
+    for arg in sys.argv[1:]:
+        if arg.startswith("--sort="):
+            sort = arg.split("=", 1)[1]
+    if sort not in ('views', 'trending'):
+        print("Usage: python main.py [--incremental] [--profile] [--sort=views|trending] [--cluster]")
+        sys.exit(1)
+    main(incremental="--incremental" in sys.argv, profile="--profile" in sys.argv, sort=sort,
+         cluster="--cluster" in sys.argv)
@@ -7,7 +7,7 @@ interface Job {
   id: number;
   job_type: 'top_clips' | 'channel_highlights';
   config: any;
-  status: 'pending' | 'running' | 'completed' | 'failed';
+  status: 'pending' | 'running' | 'completed' | 'failed' | 'cancelled';
   progress: number;
   result?: any;
   error?: string;
@@ -57,6 +57,8 @@ const JobHistory: React.FC = () => {
         return <CheckCircle className="h-4 w-4 text-quaternary" />;
       case 'failed':
         return <XCircle className="h-4 w-4 text-red-500" />;
+      case 'cancelled':
+        return <XCircle className="h-4 w-4 text-primary" />;
       case 'running':
         return <Loader className="h-4 w-4 text-quaternary animate-spin" />;
       default:
@@ -3,7 +3,11 @@ from openpyxl.styles import Font, PatternFill, Alignment
 from openpyxl.utils import get_column_letter
 from datetime import datetime
 import os
+import sys
+sys.path.append('..')
+from shared.tracing import traced
 
+@traced()
 def create_highlights_excel(highlights_data, channels_list, filename=None, separate_sheets=True):
     """Create Excel file with channel highlights"""
     
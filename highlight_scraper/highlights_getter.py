@@ -3,11 +3,22 @@ import os
 from datetime import datetime, timedelta
 import sys
 sys.path.append('..')
-from shared.auth import get_twitch_headers, make_twitch_request
+from shared.auth import get_twitch_headers, make_twitch_request, HELIX_URL
+from shared.watermarks import get_watermark_store, merge_incremental
+from shared.segment_cache import get_segment_cache
+from shared.sharding import fetch_sharded
+from shared.topk import TopKAccumulator
+from shared.clip_registry import ClipRegistry
+from shared.clip_model import to_clips
+from shared.tracing import traced
+from shared.process_pool import map_in_processes
+from shared.scoring import rank_clips, uses_scoring
+from shared.clustering import keep_best_per_moment
 
+@traced()
 def get_user_id(token, username):
     """Get Twitch user ID from username"""
-    url = 'https://api.twitch.tv/helix/users'
+    url = f'{HELIX_URL}/users'
     params = {
         'login': username
     }
@@ -22,8 +33,26 @@ def get_user_id(token, username):
     except Exception as e:
         raise Exception(f"Error getting user ID: {e}")
 
-def get_channel_clips(token, channel_names, days_back=2, limit=150):
-    """Fetch clips from specific channels"""
+@traced()
+def get_channel_clips(token, channel_names, days_back=2, limit=150, incremental=False, segment_cache=False,
+                      shards=1, registry=None, scoring=None, cluster=False):
+    """
+    Fetch clips from specific channels
+    
+    With incremental=True each channel only fetches the time since its
+    last run, merged with the clips that run returned.
+    With segment_cache=True each window is assembled from cached time segments
+    (shards then sets how many missing segments are fetched in parallel).
+    With shards > 1 each window is split into sub-windows fetched in parallel.
+    Repeated channels and duplicate clips are skipped via `registry`.
+    With a scoring config (see shared/scoring.py) each channel fetches a
+    full page and the best `limit` clips by score are returned.
+    With cluster=True clips of the same stream moment count once (see
+    shared/clustering.py).
+    """
+    
+    registry = registry or ClipRegistry()
+    channel_names = registry.dedupe_work('channel', channel_names)
     
     # Calculate date range
     end_time = datetime.utcnow()
@@ -33,7 +62,14 @@ def get_channel_clips(token, channel_names, days_back=2, limit=150):
     started_at = start_time.strftime('%Y-%m-%dT%H:%M:%SZ')
     ended_at = end_time.strftime('%Y-%m-%dT%H:%M:%SZ')
     
-    all_clips = []
+    # A score can rank any clip of the page first, and clustering merges clips away,
+    # so those runs fetch whole pages
+    rerank = uses_scoring(scoring) or cluster
+    fetch_limit = 100 if rerank else limit
+    
+    # Each channel streams into one bounded heap (limit per call, deduped by clip id)
+    top_clips = TopKAccumulator(limit if not rerank else sys.maxsize)
+    watermark_store = get_watermark_store() if incremental else None
     
     # Process each channel
     for channel_name in channel_names:
@@ -43,35 +79,85 @@ def get_channel_clips(token, channel_names, days_back=2, limit=150):
             # Get user ID for the channel
             broadcaster_id = get_user_id(token, channel_name)
             
-            url = 'https://api.twitch.tv/helix/clips'
+            # Incremental mode resumes from this channel's watermark
+            fetch_start = start_time
+            channel_started_at = started_at
+            previous_clips = []
+            if incremental:
+                watermark_key = f"channel:{broadcaster_id}"
+                fetch_start, previous_clips = watermark_store.resume_window(watermark_key, start_time, min(fetch_limit, 100))
+                channel_started_at = fetch_start.strftime('%Y-%m-%dT%H:%M:%SZ')
+                if previous_clips or fetch_start > start_time:
+                    print(f"⏩ {channel_name}: Resuming from {channel_started_at} ({len(previous_clips)} clips carried over)")
+            
+            url = f'{HELIX_URL}/clips'
             params = {
                 'broadcaster_id': broadcaster_id,
-                'started_at': started_at,
+                'started_at': channel_started_at,
                 'ended_at': ended_at,
-                'first': min(limit, 100)  # API max is 100 per request
+                'first': min(fetch_limit, 100)  # API max is 100 per request
             }
             
-            data = make_twitch_request(url, params)
-            clips = data.get('data', [])
+            if segment_cache:
+                clips = get_segment_cache().fetch_window(
+                    f"channel:{broadcaster_id}", {'broadcaster_id': broadcaster_id},
+                    fetch_start, end_time, fetch_limit, shards=shards
+                )
+            elif shards > 1:
+                clips = fetch_sharded({'broadcaster_id': broadcaster_id}, fetch_start, end_time, shards, fetch_limit)
+            else:
+                data = make_twitch_request(url, params)
+                clips = data.get('data', [])
+            
+            # Compact Clip objects (slots instead of per-clip dicts)
+            clips = to_clips(clips)
             
             # Add channel name to each clip for easier identification
             for clip in clips:
                 clip['channel_name'] = channel_name
             
-            all_clips.extend(clips)
+            if incremental:
+                clips = merge_incremental(previous_clips, clips, min(fetch_limit, 100))
+                watermark_store.update(watermark_key, end_time, clips, start_time, min(fetch_limit, 100))
+            
+            clips = registry.filter_new(clips)
+            top_clips.extend(clips)
             print(f"✅ Found {len(clips)} clips from {channel_name}")
                 
         except Exception as e:
             print(f"❌ Error processing {channel_name}: {e}")
             continue
     
-    # Sort all clips by view count
-    sorted_clips = sorted(all_clips, key=lambda x: x.get('view_count', 0), reverse=True)
-    
-    return sorted_clips
+    if cluster:
+        return keep_best_per_moment(rank_clips(top_clips.results(), scoring=scoring), limit)
+    if uses_scoring(scoring):
+        return rank_clips(top_clips.results(), limit, scoring)
+    return top_clips.results()
 
-def get_top_highlights_by_channel(token, channel_names, days_back=7, clips_per_channel=10):
-    """Get top highlights from each channel separately"""
+@traced()
+def get_top_highlights_by_channel(token, channel_names, days_back=7, clips_per_channel=10, incremental=False,
+                                  segment_cache=False, shards=1, registry=None, processes=1, scoring=None,
+                                  cluster=False):
+    """
+    Get top highlights from each channel separately
+    
+    Each channel's clips are ranked by view count, or by a scoring config
+    (see shared/scoring.py); cluster=True keeps one clip per stream moment.
+    
+    With processes > 1 the channels are split into chunks scraped by a pool
+    of worker processes, each with an equal share of the rate budget.
+    """
+    
+    # Channels listed twice (e.g. overlapping presets) are only fetched once
+    registry = registry or ClipRegistry()
+    channel_names = registry.dedupe_work('channel', channel_names)
+    
+    if processes > 1:
+        if incremental:
+            # Workers would overwrite each other's watermark file
+            raise ValueError("incremental runs can't be combined with processes > 1")
+        return _get_highlights_in_processes(channel_names, days_back, clips_per_channel, segment_cache,
+                                            shards, registry, processes, scoring, cluster)
     
     highlights_by_channel = {}
     
@@ -80,7 +166,10 @@ def get_top_highlights_by_channel(token, channel_names, days_back=7, clips_per_c
         
         try:
             # Get clips for this specific channel
-            channel_clips = get_channel_clips(token, [channel_name], days_back, clips_per_channel)
+            channel_clips = get_channel_clips(token, [channel_name], days_back, clips_per_channel,
+                                              incremental=incremental, segment_cache=segment_cache,
+                                              shards=shards, scoring=scoring, cluster=cluster)
+            channel_clips = registry.filter_new(channel_clips)
             
             if channel_clips:
                 highlights_by_channel[channel_name] = channel_clips
@@ -93,4 +182,30 @@ def get_top_highlights_by_channel(token, channel_names, days_back=7, clips_per_c
             print(f"❌ Error getting highlights from {channel_name}: {e}")
             highlights_by_channel[channel_name] = []
     
-    return highlights_by_channel
\ No newline at end of file
+    registry.print_summary()
+    return highlights_by_channel
+
+def _highlights_for_chunk(channel_names, days_back, clips_per_channel, segment_cache, shards, scoring, cluster):
+    """Worker-process side of _get_highlights_in_processes"""
+    return get_top_highlights_by_channel(None, channel_names, days_back, clips_per_channel,
+                                         segment_cache=segment_cache, shards=shards, scoring=scoring,
+                                         cluster=cluster)
+
+def _get_highlights_in_processes(channel_names, days_back, clips_per_channel, segment_cache, shards, registry,
+                                 processes, scoring=None, cluster=False):
+    """Scrape channel chunks on a process pool, merging each chunk as it arrives"""
+    results = {}
+    done = 0
+    for chunk, chunk_highlights in map_in_processes(
+        _highlights_for_chunk, channel_names, processes,
+        days_back=days_back, clips_per_channel=clips_per_channel, segment_cache=segment_cache, shards=shards,
+        scoring=scoring, cluster=cluster
+    ):
+        for channel_name, clips in chunk_highlights.items():
+            results[channel_name] = registry.filter_new(clips)
+        done += len(chunk)
+        print(f"📦 {done}/{len(channel_names)} channels merged")
+    
+    registry.print_summary()
+    # Same order as the input, like the single-process path
+    return {channel_name: results.get(channel_name, []) for channel_name in channel_names}
@@ -1,11 +1,26 @@
+import os
 import sys
+from contextlib import nullcontext
 sys.path.append('..')
 from shared.auth import get_twitch_token
+from shared.metrics import REQUEST_METRICS
+from shared.profiling import profile_run
 from .highlights_getter import get_top_highlights_by_channel, get_channel_clips
 from .excel_generator import create_highlights_excel
 from .channel_config import get_preset, list_presets, DEFAULT_CONFIG
 
-def main(preset_name=None):
+PROFILE_DIR = os.path.join('highlights_output', 'profiles')
+
+def main(preset_name=None, incremental=False, profile=False, processes=1, cluster=False):
+    profiling = profile_run(f"highlights_{preset_name or 'default'}", PROFILE_DIR) if profile else nullcontext()
+    with profiling as report:
+        exit_code = run_highlights(preset_name, incremental=incremental, processes=processes, cluster=cluster)
+    if report:
+        report.print_summary()
+    if exit_code:
+        sys.exit(exit_code)  # Only after the profile summary, so failed runs still get one
+
+def run_highlights(preset_name=None, incremental=False, processes=1, cluster=False):
     try:
         print("🎯 Starting Channel Highlights Scraper...")
         
@@ -37,7 +52,10 @@ def main(preset_name=None):
             token, 
             CHANNELS_TO_SCRAPE, 
             days_back=DAYS_BACK,
-            clips_per_channel=CLIPS_PER_CHANNEL
+            clips_per_channel=CLIPS_PER_CHANNEL,
+            incremental=incremental,
+            processes=processes,
+            cluster=cluster
         )
         
         # Count total clips found
@@ -74,9 +92,12 @@ def main(preset_name=None):
         print(f"📁 Output file: {excel_file}")
         print(f"📂 Output folder: highlights_output/")
         
+        # Where this run spent its Twitch API time
+        REQUEST_METRICS.print_summary()
+        
     except Exception as e:
         print(f"❌ An error occurred: {e}")
-        sys.exit(1)
+        return 1
 
 def interactive_mode():
     """Interactive mode to let user choose channels"""
@@ -117,14 +138,25 @@ def interactive_mode():
     main()
 
 if __name__ == "__main__":
+    # Optional flags can be combined with any mode
+    incremental = "--incremental" in sys.argv
+    profile = "--profile" in sys.argv
+    cluster = "--cluster" in sys.argv
+    processes = 1
+    for arg in sys.argv[1:]:
+        if arg.startswith("--processes="):
+            processes = int(arg.split("=", 1)[1])
+    args = [arg for arg in sys.argv[1:]
+            if arg not in ("--incremental", "--profile", "--cluster") and not arg.startswith("--processes=")]
+    
     # Check command line arguments
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--interactive":
+    if len(args) > 0:
+        if args[0] == "--interactive":
             interactive_mode()
-        elif sys.argv[1] == "--presets":
+        elif args[0] == "--presets":
             list_presets()
-        elif sys.argv[1] in ["gaming", "variety", "esports", "weekly_report"]:
-            main(sys.argv[1])
+        elif args[0] in ["gaming", "variety", "esports", "weekly_report"]:
+            main(args[0], incremental=incremental, profile=profile, processes=processes, cluster=cluster)
         else:
             print("Usage:")
             print("  python highlights_main.py                    # Default config")
@@ -134,5 +166,9 @@ if __name__ == "__main__":
             print("  python highlights_main.py variety           # Variety preset")
             print("  python highlights_main.py esports           # Esports preset")
             print("  python highlights_main.py weekly_report     # Weekly report preset")
+            print("  python highlights_main.py gaming --incremental  # Only fetch since last run")
+            print("  python highlights_main.py gaming --profile      # CPU/memory profile of the run")
+            print("  python highlights_main.py gaming --processes=4  # Scrape channels on 4 processes")
+            print("  python highlights_main.py gaming --cluster      # One clip per stream moment")
     else:
-        main()
\ No newline at end of file
+        main(incremental=incremental, profile=profile, processes=processes, cluster=cluster)
\ No newline at end of file
@@ -4,34 +4,76 @@ Used by both clips scraper and highlights scraper
 """
 
 import requests
+import functools
+import json
 import os
+import threading
 import time
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+from shared.metrics import (
+    endpoint_name, record_request, record_retry, record_token_refresh, record_rate_limit_wait,
+    record_coalesced, register_cache_stats
+)
+from shared.tracing import span
+from shared.retry import RETRY_POLICY, CIRCUIT_BREAKER, is_breaker_failure
+from shared.singleflight import SingleFlight, request_key
+from shared.response_cache import get_response_cache
+from shared.rate_limit import acquire_request_slot
+from shared.cancellation import JobCancelled, raise_if_cancelled
+
 # Load environment variables
 load_dotenv()
 
+# Twitch endpoints (overridable, e.g. to point at benchmarks/fake_helix.py)
+TWITCH_AUTH_URL = os.getenv("TWITCH_AUTH_URL", "https://id.twitch.tv/oauth2").rstrip('/')
+HELIX_URL = os.getenv("TWITCH_HELIX_URL", "https://api.twitch.tv/helix").rstrip('/')
+
+# Optional on-disk token cache so a new process can reuse a still-valid token
+# (unset = disabled). The file is written owner-only and ignored otherwise.
+TOKEN_CACHE_FILE = os.getenv("TWITCH_TOKEN_CACHE")
+
 class TwitchAuth:
-    def __init__(self):
+    def __init__(self, token_cache_file=TOKEN_CACHE_FILE):
         self.client_id = os.getenv("TWITCH_CLIENT_ID")
         self.client_secret = os.getenv("TWITCH_CLIENT_SECRET")
         self.access_token = None
         self.token_expires_at = None
+        self.token_cache_file = token_cache_file
+        self._refresh_lock = threading.Lock()  # Only one thread talks to OAuth at a time
         
         # Validate credentials on initialization
         if not self.client_id or not self.client_secret:
             raise ValueError("Missing Twitch credentials in .env file")
+        
+        self._load_cached_token()
     
-    def get_token(self, force_refresh=False):
-        """Get valid access token, refreshing if necessary"""
+    def get_token(self, force_refresh=False, stale_token=None):
+        """Get valid access token, refreshing if necessary.
+        With force_refresh, pass the token that was rejected as stale_token: if
+        another thread has already replaced it, that newer token is returned."""
         
         # Check if we have a valid token
         if not force_refresh and self._is_token_valid():
             return self.access_token
         
-        # Get new token
-        return self._request_new_token()
+        with self._refresh_lock:
+            # Someone else may have refreshed while we waited for the lock
+            if self._is_token_valid():
+                if not force_refresh:
+                    return self.access_token
+                if stale_token is not None and self.access_token != stale_token:
+                    return self.access_token
+            
+            # Get new token
+            return self._request_new_token()
+    
+    def adopt_token(self, access_token, expires_at):
+        """Use a token obtained elsewhere (e.g. by a parent process) until it expires"""
+        with self._refresh_lock:
+            self.access_token = access_token
+            self.token_expires_at = expires_at
     
     def _is_token_valid(self):
         """Check if current token is still valid"""
@@ -45,7 +87,7 @@ class TwitchAuth:
     def _request_new_token(self):
         """Request new access token from Twitch"""
         
-        url = "https://id.twitch.tv/oauth2/token"
+        url = f"{TWITCH_AUTH_URL}/token"
         params = {
             "client_id": self.client_id,
             "client_secret": self.client_secret,
@@ -53,7 +95,10 @@ class TwitchAuth:
         }
         
         try:
-            response = requests.post(url, params=params, timeout=10)
+            start = time.perf_counter()
+            with span('oauth:token'):
+                response = requests.post(url, params=params, timeout=10)
+            record_request('oauth2/token', response.status_code, time.perf_counter() - start, len(response.content))
             
             if response.status_code == 200:
                 token_data = response.json()
@@ -62,6 +107,7 @@ class TwitchAuth:
                 # Calculate expiration time
                 expires_in = token_data.get("expires_in", 3600)  # Default 1 hour
                 self.token_expires_at = datetime.now() + timedelta(seconds=expires_in)
+                self._save_cached_token()
                 
                 return self.access_token
             
@@ -71,6 +117,62 @@ class TwitchAuth:
         except requests.exceptions.RequestException as e:
             raise Exception(f"Network error when requesting token: {e}")
     
+    def _load_cached_token(self):
+        """Adopt the token cached by a previous run if it is ours and still valid"""
+        if not self.token_cache_file:
+            return
+        
+        try:
+            if os.name == 'posix' and os.stat(self.token_cache_file).st_mode & 0o077:
+                print(f"⚠️ Ignoring token cache {self.token_cache_file}: readable by other users")
+                return
+            with open(self.token_cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        
+        if not isinstance(cached, dict) or cached.get('client_id') != self.client_id:
+            return
+        try:
+            self.access_token = cached['access_token']
+            self.token_expires_at = datetime.fromtimestamp(float(cached['expires_at']))
+        except (KeyError, TypeError, ValueError):
+            self.access_token = None
+            self.token_expires_at = None
+            return
+        
+        if not self._is_token_valid():
+            self.access_token = None
+            self.token_expires_at = None
+    
+    def _save_cached_token(self):
+        """Write the current token to the cache file (owner read/write only)"""
+        if not self.token_cache_file:
+            return
+        
+        directory = os.path.dirname(self.token_cache_file)
+        tmp_path = f"{self.token_cache_file}.{os.getpid()}.tmp"
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'client_id': self.client_id,
+                    'access_token': self.access_token,
+                    'expires_at': self.token_expires_at.timestamp()
+                }, f)
+            os.replace(tmp_path, self.token_cache_file)
+        except OSError as e:
+            print(f"⚠️ Could not write token cache: {e}")
+    
+    def _clear_cached_token(self):
+        if self.token_cache_file:
+            try:
+                os.remove(self.token_cache_file)
+            except OSError:
+                pass
+    
     def _handle_token_error(self, response):
         """Handle token request errors with detailed messages"""
         
@@ -96,7 +198,7 @@ class TwitchAuth:
         if not token_to_validate:
             return False
         
-        url = "https://id.twitch.tv/oauth2/validate"
+        url = f"{TWITCH_AUTH_URL}/validate"
         headers = {
             "Authorization": f"OAuth {token_to_validate}"
         }
@@ -120,7 +222,7 @@ class TwitchAuth:
         if not self.access_token:
             return
         
-        url = "https://id.twitch.tv/oauth2/revoke"
+        url = f"{TWITCH_AUTH_URL}/revoke"
         params = {
             "client_id": self.client_id,
             "token": self.access_token
@@ -134,16 +236,20 @@ class TwitchAuth:
         # Clear token data
         self.access_token = None
         self.token_expires_at = None
+        self._clear_cached_token()
 
 
 # Global instance for easy access
 _twitch_auth = None
+_twitch_auth_lock = threading.Lock()
 
 def get_twitch_auth():
     """Get shared TwitchAuth instance"""
     global _twitch_auth
     if _twitch_auth is None:
-        _twitch_auth = TwitchAuth()
+        with _twitch_auth_lock:
+            if _twitch_auth is None:
+                _twitch_auth = TwitchAuth()
     return _twitch_auth
 
 def get_twitch_token():
@@ -190,46 +296,170 @@ def debug_auth_status():
         print(f"❌ Authentication error: {e}")
 
 def rate_limit_handler(func):
-    """Decorator to handle rate limiting"""
+    """Decorator: retry a whole idempotent function on 429/5xx/timeouts using RETRY_POLICY.
+    make_twitch_request already retries each call, so this is only for code
+    that talks to Twitch some other way."""
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        max_retries = 3
-        retry_delay = 1
-        
-        for attempt in range(max_retries):
+        attempt = 0
+        started = time.monotonic()
+        while True:
+            attempt += 1
             try:
                 return func(*args, **kwargs)
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 429:  # Rate limited
-                    if attempt < max_retries - 1:
-                        print(f"⏳ Rate limited, waiting {retry_delay} seconds...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                        continue
-                raise
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    print(f"🔄 Request failed, retrying... ({attempt + 1}/{max_retries})")
-                    time.sleep(1)
-                    continue
-                raise
-        
+            except requests.exceptions.RequestException as e:
+                response = getattr(e, 'response', None)
+                status = response.status_code if response is not None else None
+                error = None if response is not None else e
+                if not RETRY_POLICY.should_retry('GET', attempt, status, error):
+                    raise
+                delay = (RETRY_POLICY.rate_limit_wait(response, attempt) if status == 429
+                         else RETRY_POLICY.backoff(attempt))
+                if time.monotonic() - started + delay > RETRY_POLICY.deadline:
+                    raise
+                print(f"🔄 {func.__name__} failed ({status or type(e).__name__}), "
+                      f"retrying in {delay:.1f}s ({attempt}/{RETRY_POLICY.max_attempts})")
+                record_retry(func.__name__)
+                _retry_sleep(delay, rate_limited=status == 429)
     return wrapper
 
 # Utility functions for common API patterns
-def make_twitch_request(url, params=None, timeout=10):
-    """Make authenticated request to Twitch API"""
-    headers = get_twitch_headers()
+HELIX_TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'  # started_at/ended_at/created_at format
+
+def rate_limit_sleep(seconds):
+    """Sleep to stay under Twitch rate limits, counting the time as rate-limit wait"""
+    record_rate_limit_wait(seconds)
+    with span('sleep', seconds=seconds):
+        time.sleep(seconds)
+
+def _retry_sleep(seconds, rate_limited=False):
+    """Wait between attempts; 429 waits count as rate-limit wait"""
+    if rate_limited:
+        rate_limit_sleep(seconds)
+    else:
+        with span('backoff', seconds=round(seconds, 3)):
+            time.sleep(seconds)
+
+def _timed_get(url, endpoint, headers, params, timeout):
+    """GET with per-endpoint latency/bytes instrumentation"""
+    start = time.perf_counter()
+    try:
+        with span(f'helix:{endpoint}'):
+            response = requests.get(url, headers=headers, params=params, timeout=timeout)
+    except requests.exceptions.RequestException:
+        record_request(endpoint, None, time.perf_counter() - start, 0)
+        raise
+    record_request(endpoint, response.status_code, time.perf_counter() - start, len(response.content))
+    return response
+
+# Identical GETs in flight at the same time share one network call
+_in_flight = SingleFlight()
+register_cache_stats('singleflight', _in_flight.stats)
+
+register_cache_stats('response', lambda: get_response_cache().stats())
+
+def make_twitch_request(url, params=None, timeout=None, coalesce=True, cache=True):
+    """Make authenticated request to Twitch API.
+    Timeouts, connection errors, 429 and 5xx are retried per RETRY_POLICY;
+    timeout overrides the per-attempt read timeout. Metadata endpoints are
+    answered from the response cache unless cache=False. Unless
+    coalesce=False, callers making the same request concurrently share one
+    call. Cached and shared responses must not be modified."""
+    endpoint = endpoint_name(url)
+    key = request_key(url, params)
+    response_cache = get_response_cache()
+    cached = None
     
-    response = requests.get(url, headers=headers, params=params, timeout=timeout)
+    if cache and response_cache.cacheable(endpoint):
+        cached = response_cache.get(key)
+        if cached is not None and cached.fresh:
+            return cached.data
+        
+        def fetch():
+            conditional = cached.conditional_headers() if cached is not None else None
+            response = _request_with_retries(url, params, timeout, conditional)
+            if response.status_code == 304 and cached is not None:
+                response_cache.refresh(endpoint, key, cached, response.headers)
+                return cached.data
+            data = response.json()
+            response_cache.put(endpoint, key, data, response.text, response.headers)
+            return data
+    else:
+        def fetch():
+            return _request_with_retries(url, params, timeout).json()
     
-    if response.status_code == 401:
-        # Token might be expired, try refreshing
-        auth = get_twitch_auth()
-        headers = auth.get_headers()  # This will refresh token if needed
-        response = requests.get(url, headers=headers, params=params, timeout=timeout)
+    if not coalesce:
+        return fetch()
     
-    response.raise_for_status()
-    return response.json()
+    try:
+        data, shared = _in_flight.do(key, fetch)
+    except JobCancelled:
+        # The call we joined belonged to a job that was cancelled; unless
+        # this one was too, make the request ourselves
+        raise_if_cancelled()
+        data, shared = fetch(), False
+    if shared:
+        record_coalesced(endpoint)
+    return data
+
+def _request_with_retries(url, params, timeout, extra_headers=None):
+    """GET with retries, 401 refresh and the circuit breaker; returns the final response"""
+    endpoint = endpoint_name(url)
+    headers = dict(get_twitch_headers(), **(extra_headers or {}))
+    attempt_timeout = RETRY_POLICY.timeout(timeout)
+    started = time.monotonic()
+    refreshed = False
+    attempt = 0
+    
+    while True:
+        attempt += 1
+        raise_if_cancelled()
+        CIRCUIT_BREAKER.before_request()
+        waited = acquire_request_slot()
+        if waited:
+            record_rate_limit_wait(waited)
+        try:
+            response = _timed_get(url, endpoint, headers, params, attempt_timeout)
+        except requests.exceptions.RequestException as e:
+            if is_breaker_failure(error=e):
+                CIRCUIT_BREAKER.record_failure()
+            if not RETRY_POLICY.should_retry('GET', attempt, error=e):
+                raise
+            error, status, delay = e, None, RETRY_POLICY.backoff(attempt)
+        else:
+            if is_breaker_failure(response.status_code):
+                CIRCUIT_BREAKER.record_failure()
+            else:
+                CIRCUIT_BREAKER.record_success()
+            
+            if response.status_code == 401 and not refreshed:
+                # Token was rejected (expired or revoked), force a refresh. Concurrent
+                # callers that hit the same 401 share a single new token.
+                refreshed = True
+                record_token_refresh()
+                record_retry(endpoint)
+                auth = get_twitch_auth()
+                rejected = headers['Authorization'].split(' ', 1)[1]
+                token = auth.get_token(force_refresh=True, stale_token=rejected)
+                headers = dict(headers, Authorization=f'Bearer {token}')
+                attempt -= 1  # A refresh doesn't use up a retry
+                continue
+            
+            error, status = None, response.status_code
+            if not RETRY_POLICY.should_retry('GET', attempt, status_code=status):
+                response.raise_for_status()
+                return response
+            delay = (RETRY_POLICY.rate_limit_wait(response, attempt) if status == 429
+                     else RETRY_POLICY.backoff(attempt))
+        
+        if time.monotonic() - started + delay > RETRY_POLICY.deadline:
+            # Out of time: surface the last failure instead of stalling the run
+            if error is not None:
+                raise error
+            response.raise_for_status()
+        
+        record_retry(endpoint)
+        _retry_sleep(delay, rate_limited=status == 429)
 
 # Configuration validation
 def validate_environment():
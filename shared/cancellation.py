@@ -0,0 +1,35 @@
+"""
+Cooperative cancellation for long scraping runs
+A job runner installs a check with cancellable(); make_twitch_request calls
+raise_if_cancelled() before every attempt, so a cancelled job stops at its
+next Helix call, including calls made from shard threads.
+"""
+
+import contextvars
+from contextlib import contextmanager
+
+_cancel_check = contextvars.ContextVar('scraper_cancel_check', default=None)
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a run whose job was cancelled.
+    A BaseException (like KeyboardInterrupt) so the scrapers' per-game and
+    per-channel `except Exception` handlers don't swallow it and carry on.
+    """
+
+
+@contextmanager
+def cancellable(check):
+    """Run the block with check() consulted before every Twitch API call"""
+    token = _cancel_check.set(check)
+    try:
+        yield
+    finally:
+        _cancel_check.reset(token)
+
+
+def raise_if_cancelled():
+    check = _cancel_check.get()
+    if check is not None and check():
+        raise JobCancelled()
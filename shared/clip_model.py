@@ -0,0 +1,99 @@
+"""
+Compact clip model
+Holds every Helix clip field in __slots__ instead of a per-clip dict, with
+repeated strings (games, broadcasters) interned.
+Clips still answer clip.get('view_count', 0) / clip['game_name'] like the raw
+Helix dicts did, and are turned back into dicts at the API/JSON edge.
+"""
+
+import sys
+
+# Every field of a Helix clip (consumers such as the frontend read fields the
+# scrapers never touch, e.g. embed_url), plus the ones the scrapers add
+# (game_name, channel_name, the trending rates from shared/snapshots.py, the
+# score from shared/scoring.py and cluster_size from shared/clustering.py)
+CLIP_FIELDS = (
+    'id', 'url', 'embed_url', 'title', 'view_count', 'duration', 'created_at', 'thumbnail_url',
+    'broadcaster_id', 'broadcaster_name', 'creator_id', 'creator_name',
+    'game_id', 'game_name', 'channel_name', 'language', 'video_id', 'vod_offset', 'is_featured',
+    'views_per_hour', 'view_acceleration', 'score', 'cluster_size'
+)
+
+# Values repeated across many clips share one string object
+INTERNED_FIELDS = frozenset((
+    'broadcaster_id', 'broadcaster_name', 'creator_id', 'creator_name',
+    'game_id', 'game_name', 'channel_name', 'language', 'video_id'
+))
+
+_FIELD_SET = frozenset(CLIP_FIELDS)
+
+
+class Clip:
+    __slots__ = CLIP_FIELDS
+
+    def __init__(self, **fields):
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_helix(cls, data):
+        """Build a Clip from a Helix clip dict, dropping fields outside CLIP_FIELDS"""
+        if isinstance(data, cls):
+            return data
+        clip = cls.__new__(cls)
+        for key in CLIP_FIELDS:
+            value = data.get(key)
+            if value is not None:
+                clip[key] = value
+        return clip
+
+    def get(self, key, default=None):
+        """dict-style lookup so existing clip.get(...) call sites keep working"""
+        if key not in _FIELD_SET:
+            return default
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in _FIELD_SET:
+            raise KeyError(f"Clip has no field '{key}'")
+        if key in INTERNED_FIELDS and isinstance(value, str):
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def to_dict(self):
+        """Plain dict for JSON responses and on-disk caches"""
+        result = {}
+        for key in CLIP_FIELDS:
+            value = getattr(self, key, None)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def __repr__(self):
+        return f"Clip(id={self.get('id')!r}, views={self.get('view_count', 0)}, title={self.get('title', '')[:30]!r})"
+
+
+def to_clips(clip_dicts):
+    """Convert a list of Helix clip dicts to Clips"""
+    return [Clip.from_helix(data) for data in clip_dicts]
+
+
+def json_ready(value):
+    """Recursively turn Clips inside results (lists, dicts) back into plain dicts"""
+    if isinstance(value, Clip):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {key: json_ready(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_ready(item) for item in value]
+    return value
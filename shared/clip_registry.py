@@ -0,0 +1,65 @@
+"""
+Canonical clip registry for one scraping run
+Dedupes work items (games, channels) before they are fetched and clips after,
+and keeps count of how many redundant requests and rows were dropped
+"""
+
+import threading
+
+
+def canonical_work_key(kind, value):
+    """Normalize a game name/id or channel login so spelling variants collide"""
+    return (kind, ' '.join(str(value).split()).casefold())
+
+
+class ClipRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._work_keys = set()
+        self._clip_ids = set()
+        self.redundant_requests = 0  # work items skipped because they were already claimed
+        self.duplicate_rows = 0      # clips dropped because their id was already seen
+
+    def claim(self, kind, value):
+        """Claim a work item; returns False if it has already been claimed this run"""
+        key = canonical_work_key(kind, value)
+        with self._lock:
+            if key in self._work_keys:
+                self.redundant_requests += 1
+                return False
+            self._work_keys.add(key)
+            return True
+
+    def dedupe_work(self, kind, values):
+        """Claim a whole list of work items, returning the ones left to do (order kept)"""
+        return [value for value in values if self.claim(kind, value)]
+
+    def admit(self, clip):
+        """Register a clip; returns False if a clip with the same id was already admitted"""
+        clip_id = clip.get('id')
+        if clip_id is None:
+            return True
+        with self._lock:
+            if clip_id in self._clip_ids:
+                self.duplicate_rows += 1
+                return False
+            self._clip_ids.add(clip_id)
+            return True
+
+    def filter_new(self, clips):
+        """Keep only clips not seen before in this run"""
+        return [clip for clip in clips if self.admit(clip)]
+
+    def report(self):
+        """Counts for job results and summaries"""
+        return {
+            'work_items': len(self._work_keys),
+            'unique_clips': len(self._clip_ids),
+            'redundant_requests_skipped': self.redundant_requests,
+            'duplicate_rows_dropped': self.duplicate_rows
+        }
+
+    def print_summary(self):
+        if self.redundant_requests or self.duplicate_rows:
+            print(f"♻️ Dedup: skipped {self.redundant_requests} redundant requests, "
+                  f"dropped {self.duplicate_rows} duplicate clips")
@@ -0,0 +1,109 @@
+"""
+Near-duplicate clip clustering
+A popular moment gets clipped by dozens of viewers, so a top list can be a
+handful of moments repeated. Clips are grouped by broadcaster and stream
+(the VOD when Helix gives one) and sorted by where they start in it; one
+sweep then merges clips whose time ranges overlap, or nearly touch with
+similar titles, into one cluster. Sorting dominates, so it is O(n log n).
+Each cluster keeps its best clip (the first one in the input order, which
+is the ranking order) with cluster_size set to the number of clips merged.
+"""
+
+import re
+from datetime import datetime
+
+# Clips starting this close after a cluster ends still join it if their titles are similar
+NEAR_GAP_SECONDS = 30
+
+# Longest stretch of stream one cluster may cover, so back-to-back clipping
+# of a long stream doesn't chain into a single cluster
+MAX_CLUSTER_SPAN_SECONDS = 120
+
+# Word overlap (Jaccard) at which two titles count as similar
+TITLE_SIMILARITY = 0.5
+
+_WORD = re.compile(r'[^\W_]+')
+
+
+def title_words(title):
+    return frozenset(_WORD.findall((title or '').lower()))
+
+
+def similar_titles(a, b):
+    if not a or not b:
+        return False
+    return len(a & b) / len(a | b) >= TITLE_SIMILARITY
+
+
+def _moment(clip):
+    """
+    (stream key, start second, end second) of the part of the stream a clip shows.
+    With a VOD the position is the offset into it; without one, clip creation
+    time stands in, as clips are made right after the moment they show.
+    """
+    duration = float(clip.get('duration', 0) or 0)
+    video_id = clip.get('video_id')
+    offset = clip.get('vod_offset')
+    if video_id and offset is not None:
+        return (clip.get('broadcaster_id'), video_id), float(offset), float(offset) + duration
+    try:
+        created = datetime.fromisoformat(clip.get('created_at', '').rstrip('Z'))
+    except ValueError:
+        return None
+    end = (created - datetime(1970, 1, 1)).total_seconds()
+    return (clip.get('broadcaster_id'), None), end - duration, end
+
+
+def cluster_clips(clips, near_gap=NEAR_GAP_SECONDS, max_span=MAX_CLUSTER_SPAN_SECONDS):
+    """
+    Collapse near-duplicates: the best clip of every cluster, in input order,
+    each with cluster_size. Clips with no usable position are kept as they are.
+    """
+    clips = list(clips)
+    best = {}  # rank of each cluster's best clip -> cluster size
+    entries = []
+    for rank, clip in enumerate(clips):
+        moment = _moment(clip)
+        if moment is None:
+            best[rank] = 1
+            continue
+        stream, start, end = moment
+        entries.append((str(stream), start, end, rank))
+    entries.sort()
+
+    previous_stream = None
+    for stream, start, end, rank in entries:
+        joins = False
+        if stream == previous_stream and start - cluster_start <= max_span:
+            if start <= cluster_end:
+                joins = True
+            elif start <= cluster_end + near_gap:
+                joins = similar_titles(title_words(clips[rank].get('title')), cluster_words)
+        if joins:
+            cluster_end = max(cluster_end, end)
+            size += 1
+            if rank < cluster_best:
+                del best[cluster_best]
+                cluster_best = rank
+                cluster_words = title_words(clips[rank].get('title'))
+            best[cluster_best] = size
+        else:
+            previous_stream, cluster_start, cluster_end = stream, start, end
+            cluster_best, size = rank, 1
+            cluster_words = title_words(clips[rank].get('title'))
+            best[rank] = 1
+
+    kept = []
+    for rank in sorted(best):
+        clip = clips[rank]
+        clip['cluster_size'] = best[rank]
+        kept.append(clip)
+    return kept
+
+
+def keep_best_per_moment(clips, limit=None):
+    """cluster_clips, then the first `limit` moments"""
+    kept = cluster_clips(clips)
+    if len(kept) < len(clips):
+        print(f"🔗 {len(clips)} clips are {len(kept)} distinct moments")
+    return kept if limit is None else kept[:limit]
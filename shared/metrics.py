@@ -0,0 +1,253 @@
+"""
+Request instrumentation for the Twitch client
+Counts calls, latency, bytes, retries, 401 token refreshes, rate-limit
+waits and coalesced duplicate calls per endpoint. Totals are kept for the whole process, and any block of
+work (a CLI run, an API job) can collect its own copy with
+collect_request_metrics(). External metrics backends plug in via MetricsHook.
+"""
+
+import contextvars
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+
+def endpoint_name(url):
+    """Short endpoint label: 'clips', 'games/top', 'oauth2/token'"""
+    path = urlparse(url).path
+    if '/helix/' in path:
+        return path.split('/helix/', 1)[1].strip('/')
+    return path.strip('/')
+
+
+class EndpointStats:
+    __slots__ = ('calls', 'errors', 'bytes_received', 'latency_total', 'latency_max', 'buckets', 'status_codes')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.bytes_received = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.status_codes = {}
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'bytes_received': self.bytes_received,
+            'latency_avg': self.latency_total / self.calls if self.calls else 0.0,
+            'latency_max': self.latency_max,
+            'latency_total': self.latency_total,
+            'latency_histogram': {
+                ('+Inf' if bound == float('inf') else str(bound)): count
+                for bound, count in zip(LATENCY_BUCKETS, self.buckets)
+            },
+            'status_codes': dict(self.status_codes)
+        }
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+            self.retries = 0
+            self.token_refreshes = 0
+            self.rate_limit_wait = 0.0
+            self.coalesced = 0
+
+    def record_request(self, endpoint, status_code, seconds, bytes_received):
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.calls += 1
+            if status_code is None or status_code >= 400:
+                stats.errors += 1
+            stats.bytes_received += bytes_received
+            stats.latency_total += seconds
+            if seconds > stats.latency_max:
+                stats.latency_max = seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+                    break
+            stats.status_codes[status_code] = stats.status_codes.get(status_code, 0) + 1
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_token_refresh(self):
+        with self._lock:
+            self.token_refreshes += 1
+
+    def record_rate_limit_wait(self, seconds):
+        with self._lock:
+            self.rate_limit_wait += seconds
+
+    def record_coalesced(self):
+        with self._lock:
+            self.coalesced += 1
+
+    def merge_snapshot(self, snapshot):
+        """Add the counts of a snapshot taken elsewhere (e.g. in a worker process)"""
+        with self._lock:
+            for name, data in snapshot['endpoints'].items():
+                stats = self.endpoints.get(name)
+                if stats is None:
+                    stats = self.endpoints[name] = EndpointStats()
+                stats.calls += data['calls']
+                stats.errors += data['errors']
+                stats.bytes_received += data['bytes_received']
+                stats.latency_total += data['latency_total']
+                stats.latency_max = max(stats.latency_max, data['latency_max'])
+                for i, count in enumerate(data['latency_histogram'].values()):
+                    stats.buckets[i] += count
+                for status, count in data['status_codes'].items():
+                    stats.status_codes[status] = stats.status_codes.get(status, 0) + count
+            self.retries += snapshot['retries']
+            self.token_refreshes += snapshot['token_refreshes']
+            self.rate_limit_wait += snapshot['rate_limit_wait_seconds']
+            self.coalesced += snapshot.get('coalesced_calls', 0)
+
+    def snapshot(self):
+        """Plain-dict copy, safe to put in job results or JSON"""
+        with self._lock:
+            endpoints = {name: stats.to_dict() for name, stats in self.endpoints.items()}
+            return {
+                'total_calls': sum(e['calls'] for e in endpoints.values()),
+                'total_errors': sum(e['errors'] for e in endpoints.values()),
+                'bytes_received': sum(e['bytes_received'] for e in endpoints.values()),
+                'retries': self.retries,
+                'token_refreshes': self.token_refreshes,
+                'rate_limit_wait_seconds': round(self.rate_limit_wait, 3),
+                'coalesced_calls': self.coalesced,
+                'endpoints': endpoints
+            }
+
+    def print_summary(self, title="TWITCH API USAGE"):
+        snapshot = self.snapshot()
+        print(f"\n📡 {title}")
+        print("-" * 60)
+        for name, stats in sorted(snapshot['endpoints'].items(), key=lambda x: x[1]['latency_total'], reverse=True):
+            print(f"   {name:14s} {stats['calls']:>5} calls  avg {stats['latency_avg'] * 1000:>7.1f} ms  "
+                  f"max {stats['latency_max'] * 1000:>7.1f} ms  {stats['bytes_received'] / 1024:>8.1f} KB"
+                  f"{'  ⚠️ ' + str(stats['errors']) + ' errors' if stats['errors'] else ''}")
+        print(f"   Total: {snapshot['total_calls']} calls, {snapshot['bytes_received'] / 1024:.1f} KB, "
+              f"{snapshot['retries']} retries, {snapshot['token_refreshes']} token refreshes, "
+              f"{snapshot['rate_limit_wait_seconds']:.1f}s rate-limit wait")
+        if snapshot['coalesced_calls']:
+            print(f"   Saved {snapshot['coalesced_calls']} calls by sharing identical in-flight requests")
+
+
+class MetricsHook:
+    """Base class for plugging in a metrics backend; override what you need"""
+
+    def on_request(self, endpoint, status_code, seconds, bytes_received):
+        pass
+
+    def on_retry(self, endpoint):
+        pass
+
+    def on_token_refresh(self):
+        pass
+
+    def on_rate_limit_wait(self, seconds):
+        pass
+
+    def on_coalesced(self, endpoint):
+        pass
+
+
+# Process-wide totals
+REQUEST_METRICS = RequestMetrics()
+
+_hooks = []
+_cache_stats_providers = {}
+_active_collectors = contextvars.ContextVar('twitch_request_collectors', default=())
+
+
+def add_metrics_hook(hook):
+    """Register a MetricsHook; hooks are called synchronously, so keep them cheap"""
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def remove_metrics_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def register_cache_stats(name, provider):
+    """Expose a cache's stats; provider() returns a dict with at least 'hits' and 'misses'"""
+    _cache_stats_providers[name] = provider
+
+
+def cache_stats():
+    """Current stats of every registered cache"""
+    return {name: provider() for name, provider in _cache_stats_providers.items()}
+
+
+@contextmanager
+def collect_request_metrics():
+    """Collect metrics for the requests made inside this block (and threads started with its context)"""
+    metrics = RequestMetrics()
+    token = _active_collectors.set(_active_collectors.get() + (metrics,))
+    try:
+        yield metrics
+    finally:
+        _active_collectors.reset(token)
+
+
+def _targets():
+    return (REQUEST_METRICS,) + _active_collectors.get()
+
+
+def record_request(endpoint, status_code, seconds, bytes_received):
+    for metrics in _targets():
+        metrics.record_request(endpoint, status_code, seconds, bytes_received)
+    for hook in _hooks:
+        hook.on_request(endpoint, status_code, seconds, bytes_received)
+
+
+def record_retry(endpoint):
+    for metrics in _targets():
+        metrics.record_retry()
+    for hook in _hooks:
+        hook.on_retry(endpoint)
+
+
+def record_token_refresh():
+    for metrics in _targets():
+        metrics.record_token_refresh()
+    for hook in _hooks:
+        hook.on_token_refresh()
+
+
+def record_rate_limit_wait(seconds):
+    for metrics in _targets():
+        metrics.record_rate_limit_wait(seconds)
+    for hook in _hooks:
+        hook.on_rate_limit_wait(seconds)
+
+
+def record_coalesced(endpoint):
+    for metrics in _targets():
+        metrics.record_coalesced()
+    for hook in _hooks:
+        hook.on_coalesced(endpoint)
+
+
+def record_snapshot(snapshot):
+    """Fold a worker process's metrics into this process's totals and collectors"""
+    for metrics in _targets():
+        metrics.merge_snapshot(snapshot)
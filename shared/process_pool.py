@@ -0,0 +1,67 @@
+"""
+Multi-process execution for very large channel or game lists
+Splits the work into chunks, runs them on a process pool so JSON parsing and
+filtering use every core, and yields each chunk's result as soon as its
+worker finishes. Every worker gets an equal share of the Helix rate budget
+and reuses the parent's OAuth token; its request metrics are folded back
+into the parent's totals.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from shared.auth import get_twitch_auth
+from shared.metrics import collect_request_metrics, record_snapshot
+from shared.rate_limit import HELIX_RATE_LIMIT, set_rate_budget, shared_budget_enabled
+
+# One worker per core by default; more only adds rate-limit waiting
+MAX_PROCESSES = os.cpu_count() or 1
+
+# Items per task: small enough to stream and balance, big enough to amortize pickling
+DEFAULT_CHUNK_SIZE = 25
+
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _init_worker(access_token, expires_at, rate_per_minute):
+    auth = get_twitch_auth()
+    if access_token:
+        auth.adopt_token(access_token, expires_at)
+    set_rate_budget(rate_per_minute)
+
+
+def _run_chunk(func, chunk, kwargs):
+    with collect_request_metrics() as metrics:
+        result = func(chunk, **kwargs)
+    return result, metrics.snapshot()
+
+
+def map_in_processes(func, items, processes=None, chunk_size=DEFAULT_CHUNK_SIZE, rate_budget=HELIX_RATE_LIMIT,
+                     **kwargs):
+    """
+    Run func(chunk, **kwargs) over chunks of items on a process pool.
+    Yields (chunk, result) in completion order. func must be a module-level
+    function and its arguments and result picklable.
+    """
+    chunks = chunked(list(items), chunk_size)
+    if not chunks:
+        return
+    processes = max(1, min(processes or MAX_PROCESSES, len(chunks)))
+
+    # Fetch the token once here instead of once per worker
+    auth = get_twitch_auth()
+    token = auth.get_token()
+    # A host-wide shared budget already divides itself between the workers
+    share = rate_budget / processes if rate_budget and not shared_budget_enabled() else None
+    print(f"🧵 {len(chunks)} chunks on {processes} processes"
+          f"{f', {share:.0f} requests/min each' if share else ''}")
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(token, auth.token_expires_at, share)) as pool:
+        futures = {pool.submit(_run_chunk, func, chunk, kwargs): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            result, snapshot = future.result()
+            record_snapshot(snapshot)
+            yield futures[future], result
@@ -0,0 +1,159 @@
+"""
+Built-in profiling for scraping runs
+profile_run() captures a cProfile CPU profile and a tracemalloc peak-memory
+report for a block of work, writes them next to the run's outputs and keeps
+a top-N hot-function summary for printing or returning from the API.
+
+cProfile only sees the thread that started it, so time spent in shard
+worker threads shows up as waiting inside fetch_sharded.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# Hot functions kept in the summary
+PROFILE_TOP_N = int(os.getenv("TWITCH_PROFILE_TOP_N", "20"))
+
+# Allocation sites listed in the memory report
+MEMORY_TOP_N = 15
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# cProfile and tracemalloc are process-wide, so only one run is profiled at a time
+_profile_lock = threading.Lock()
+
+
+class ProfileReport:
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now()
+        self.seconds = 0.0
+        self.peak_memory_bytes = 0
+        self.hot_functions = []
+        self.top_allocations = []
+        self.artifacts = {}
+        self.skipped = None  # Reason profiling didn't run
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'started_at': self.started_at.isoformat(),
+            'seconds': round(self.seconds, 3),
+            'peak_memory_bytes': self.peak_memory_bytes,
+            'hot_functions': self.hot_functions,
+            'top_allocations': self.top_allocations,
+            'artifacts': self.artifacts,
+            'skipped': self.skipped
+        }
+
+    def print_summary(self, top_n=10):
+        print(f"\n🔬 PROFILE: {self.name}")
+        print("-" * 60)
+        if self.skipped:
+            print(f"   Skipped: {self.skipped}")
+            return
+        print(f"   Wall time: {self.seconds:.2f}s  Peak traced memory: {self.peak_memory_bytes / 1024 / 1024:.1f} MB")
+        print(f"   {'cumulative':>10} {'own':>9} {'calls':>8}  function")
+        for entry in self.hot_functions[:top_n]:
+            print(f"   {entry['cumulative_seconds']:>9.3f}s {entry['own_seconds']:>8.3f}s {entry['calls']:>8}  "
+                  f"{entry['function']}")
+        for kind, path in self.artifacts.items():
+            print(f"   📁 {kind}: {path}")
+
+
+def _function_label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name  # Built-in
+    if filename.startswith(_PROJECT_ROOT + os.sep):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    elif 'site-packages' + os.sep in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    return f"{filename}:{line}({name})"
+
+
+def _hot_functions(stats, top_n):
+    """Top functions by cumulative time from a pstats.Stats"""
+    rows = []
+    for func, (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': _function_label(func),
+            'calls': calls,
+            'own_seconds': round(own, 4),
+            'cumulative_seconds': round(cumulative, 4)
+        })
+    rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+    return rows[:top_n]
+
+
+def _write_artifacts(report, profiler, snapshot, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.join(output_dir, f"{report.name}_{report.started_at.strftime('%Y%m%d_%H%M%S')}")
+
+    # Binary profile for snakeviz / pstats / gprof2dot
+    profiler.dump_stats(f"{stem}.prof")
+    report.artifacts['cpu_profile'] = f"{stem}.prof"
+
+    text = io.StringIO()
+    stats = pstats.Stats(profiler, stream=text)
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP_N * 2)
+    with open(f"{stem}_cpu.txt", 'w', encoding='utf-8') as f:
+        f.write(text.getvalue())
+    report.artifacts['cpu_summary'] = f"{stem}_cpu.txt"
+
+    with open(f"{stem}_memory.txt", 'w', encoding='utf-8') as f:
+        f.write(f"Peak traced memory: {report.peak_memory_bytes:,} bytes\n\n")
+        f.write(f"Top {MEMORY_TOP_N} allocation sites still held at the end of the run:\n")
+        for stat in snapshot.statistics('lineno')[:MEMORY_TOP_N]:
+            f.write(f"{stat}\n")
+    report.artifacts['memory_report'] = f"{stem}_memory.txt"
+
+
+@contextmanager
+def profile_run(name, output_dir):
+    """Profile CPU and memory of the block; yields a ProfileReport filled in on exit"""
+    report = ProfileReport(name)
+    if not _profile_lock.acquire(blocking=False):
+        report.skipped = 'another run is already being profiled'
+        yield report
+        return
+
+    profiler = cProfile.Profile()
+    started_tracemalloc = not tracemalloc.is_tracing()
+    try:
+        if started_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield report
+        finally:
+            profiler.disable()
+            report.seconds = time.perf_counter() - start
+            report.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+            ))
+            if started_tracemalloc:
+                tracemalloc.stop()
+
+            report.hot_functions = _hot_functions(pstats.Stats(profiler), PROFILE_TOP_N)
+            report.top_allocations = [
+                {'location': str(stat.traceback[0]), 'bytes': stat.size, 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:MEMORY_TOP_N]
+            ]
+            try:
+                _write_artifacts(report, profiler, snapshot, output_dir)
+            except OSError as e:
+                print(f"⚠️ Could not write profile artifacts: {e}")
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,205 @@
+"""
+Client-side rate budget for Twitch API calls
+Helix gives each Client-ID a bucket of points per minute. When a budget is
+set, make_twitch_request takes one token per attempt from a local token
+bucket and waits when it runs dry, instead of finding out via 429s.
+Worker processes each get an equal share of the budget (see process_pool).
+With TWITCH_RATE_SHARED_FILE set, every process on the host (API workers,
+cron CLI runs, pool workers) draws from one file-locked bucket instead and
+the file records how much each process has used.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, shared budgets fall back to per-process
+    fcntl = None
+
+from shared.tracing import span
+
+# Helix default for app access tokens: 800 points per minute
+HELIX_RATE_LIMIT = int(os.getenv("TWITCH_RATE_LIMIT", "800"))
+
+# Requests per minute this process may use; unset = no client-side limiting
+RATE_BUDGET = os.getenv("TWITCH_RATE_BUDGET")
+
+# Seconds of budget that can be spent in one burst
+BURST_SECONDS = 10
+
+# State file shared by every process using the same Client-ID; unset = per-process buckets
+RATE_SHARED_FILE = os.getenv("TWITCH_RATE_SHARED_FILE")
+
+# Processes idle for this long are dropped from the shared consumption report
+STALE_PROCESS_SECONDS = 3600
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, burst_seconds=BURST_SECONDS):
+        self.rate_per_minute = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0.0
+
+    def _reserve(self, tokens):
+        """Take tokens now (possibly going negative); returns seconds to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            self.acquired += tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += wait
+            return wait
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` requests may be sent; returns the seconds waited"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate_per_minute': self.rate_per_minute,
+                'acquired': self.acquired,
+                'waited_seconds': round(self.waited, 3)
+            }
+
+
+class SharedTokenBucket:
+    """
+    Token bucket whose state lives in a file guarded by flock, so every
+    process pointing at the same file shares one budget. Each process's
+    requests and wait time are recorded under its pid.
+    """
+
+    def __init__(self, path, rate_per_minute, burst_seconds=BURST_SECONDS):
+        self.path = path
+        self.rate_per_minute = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self._lock = threading.Lock()  # flock is per open file, so threads still need this
+        self.name = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'python'
+
+    def _read_state(self, f):
+        f.seek(0)
+        try:
+            state = json.loads(f.read() or '{}')
+        except ValueError:
+            state = {}  # Torn write from a killed process: start over with a full bucket
+        state.setdefault('tokens', self.capacity)
+        state.setdefault('updated', time.time())
+        state.setdefault('processes', {})
+        return state
+
+    def _update(self, tokens=0):
+        """Apply tokens to the shared state under the file lock; returns (state, seconds to wait)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(self.path, 'a+', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                state = self._read_state(f)
+                # Wall clock, since monotonic clocks aren't comparable across processes
+                now = time.time()
+                elapsed = max(0.0, now - state['updated'])
+                state['tokens'] = min(self.capacity, state['tokens'] + elapsed * self.rate) - tokens
+                state['updated'] = now
+                state['rate_per_minute'] = self.rate_per_minute
+                wait = -state['tokens'] / self.rate if state['tokens'] < 0 else 0.0
+
+                processes = state['processes']
+                if tokens:
+                    entry = processes.setdefault(str(os.getpid()), {'name': self.name, 'acquired': 0,
+                                                                    'waited_seconds': 0.0})
+                    entry['acquired'] += tokens
+                    entry['waited_seconds'] = round(entry['waited_seconds'] + wait, 3)
+                    entry['last_seen'] = now
+                for pid in [pid for pid, entry in processes.items()
+                            if now - entry.get('last_seen', now) > STALE_PROCESS_SECONDS]:
+                    del processes[pid]
+
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return state, wait
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` requests may be sent; returns the seconds waited"""
+        _, wait = self._update(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        try:
+            state, _ = self._update()
+        except OSError:
+            return {'rate_per_minute': self.rate_per_minute, 'shared_file': self.path, 'processes': {}}
+        own = state['processes'].get(str(os.getpid()), {})
+        return {
+            'rate_per_minute': self.rate_per_minute,
+            'acquired': own.get('acquired', 0),
+            'waited_seconds': own.get('waited_seconds', 0.0),
+            'shared_file': self.path,
+            'available': round(max(state['tokens'], 0.0), 2),
+            'processes': state['processes']
+        }
+
+
+def _make_limiter(requests_per_minute):
+    if RATE_SHARED_FILE:
+        if fcntl is not None:
+            return SharedTokenBucket(RATE_SHARED_FILE, requests_per_minute or HELIX_RATE_LIMIT)
+        print("⚠️ TWITCH_RATE_SHARED_FILE needs fcntl; using a per-process rate budget")
+    return TokenBucket(requests_per_minute) if requests_per_minute else None
+
+
+_limiter = _make_limiter(float(RATE_BUDGET) if RATE_BUDGET else None)
+
+
+def shared_budget_enabled():
+    return isinstance(_limiter, SharedTokenBucket)
+
+
+def set_rate_budget(requests_per_minute):
+    """Limit this process to requests_per_minute (None turns client-side limiting off).
+    A shared budget stays in place: it already covers every process on the host."""
+    global _limiter
+    if shared_budget_enabled():
+        return
+    _limiter = _make_limiter(requests_per_minute)
+
+
+def get_rate_limiter():
+    return _limiter
+
+
+def rate_budget_stats():
+    """Client-side budget usage (all processes' for a shared budget), or None when unlimited"""
+    limiter = _limiter
+    return limiter.stats() if limiter is not None else None
+
+
+def acquire_request_slot():
+    """Wait for room in the rate budget; returns seconds waited (0 when no budget is set)"""
+    limiter = _limiter
+    if limiter is None:
+        return 0.0
+    with span('rate_budget'):
+        return limiter.acquire()
@@ -0,0 +1,266 @@
+"""
+HTTP response cache for Helix GETs
+Metadata endpoints (/games, /users, /games/top) barely change within hours,
+so their parsed responses are kept in a size-bounded in-memory LRU backed by
+a size-bounded on-disk LRU. Expired entries that came with an ETag or
+Last-Modified are revalidated with a conditional request instead of being
+downloaded again. Clip endpoints are not cached here (see segment_cache).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds a response stays fresh, per endpoint; endpoints not listed are never cached
+RESPONSE_TTL_RULES = {
+    'games': 6 * 3600,      # Names and box art
+    'users': 3600,          # Display names, descriptions, broadcaster type
+    'games/top': 10 * 60,   # Popularity shifts through the day
+}
+
+RESPONSE_CACHE_ENABLED = os.getenv("TWITCH_RESPONSE_CACHE", "1") != "0"
+RESPONSE_CACHE_DIR = os.getenv("TWITCH_RESPONSE_CACHE_DIR", os.path.join(".scraper_state", "responses"))
+RESPONSE_CACHE_MEMORY_BYTES = int(os.getenv("TWITCH_RESPONSE_CACHE_MEMORY_MB", "16")) * 1024 * 1024
+RESPONSE_CACHE_DISK_BYTES = int(os.getenv("TWITCH_RESPONSE_CACHE_DISK_MB", "64")) * 1024 * 1024
+
+
+class CachedResponse:
+    __slots__ = ('data', 'body_size', 'expires_at', 'etag', 'last_modified')
+
+    def __init__(self, data, body_size, expires_at, etag=None, last_modified=None):
+        self.data = data
+        self.body_size = body_size
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def fresh(self):
+        return time.time() < self.expires_at
+
+    def conditional_headers(self):
+        """Validators for revalidating this entry, empty if the server gave none"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    def __init__(self, directory=RESPONSE_CACHE_DIR, ttl_rules=None,
+                 max_memory_bytes=RESPONSE_CACHE_MEMORY_BYTES, max_disk_bytes=RESPONSE_CACHE_DISK_BYTES,
+                 enabled=RESPONSE_CACHE_ENABLED):
+        self.directory = directory
+        self.ttl_rules = RESPONSE_TTL_RULES if ttl_rules is None else ttl_rules
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> CachedResponse, least recently used first
+        self._memory_bytes = 0
+        self._disk_index = None       # file name -> size, built on first disk access
+        self._disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+    def cacheable(self, endpoint):
+        return self.enabled and self.ttl_rules.get(endpoint, 0) > 0
+
+    @staticmethod
+    def _file_name(key):
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest() + '.json'
+
+    def get(self, key):
+        """Cached response for key (fresh or stale), or None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            else:
+                entry = self._load_from_disk(key)
+                if entry is not None:
+                    self._remember(key, entry)
+                    if entry.fresh:
+                        self.disk_hits += 1
+
+            if entry is not None and entry.fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def put(self, endpoint, key, data, body, headers):
+        """Store a 200 response unless the server asked us not to"""
+        if 'no-store' in headers.get('Cache-Control', ''):
+            return
+        entry = CachedResponse(
+            data, len(body), time.time() + self.ttl_rules[endpoint],
+            etag=headers.get('ETag'), last_modified=headers.get('Last-Modified')
+        )
+        with self._lock:
+            self._remember(key, entry)
+            self._save_to_disk(key, entry, body)
+
+    def refresh(self, endpoint, key, entry, headers):
+        """A 304 confirmed a stale entry: make it fresh again without re-downloading"""
+        with self._lock:
+            self.revalidated += 1
+            entry.expires_at = time.time() + self.ttl_rules[endpoint]
+            entry.etag = headers.get('ETag') or entry.etag
+            entry.last_modified = headers.get('Last-Modified') or entry.last_modified
+            self._remember(key, entry)
+            self._touch_on_disk(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            for name in list(self._disk_entries()):
+                self._remove_from_disk(name)
+
+    # Memory tier
+
+    def _remember(self, key, entry):
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.body_size
+        if entry.body_size > self.max_memory_bytes:
+            return
+        self._memory[key] = entry
+        self._memory_bytes += entry.body_size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.body_size
+            self.evictions += 1
+
+    # Disk tier (LRU by file modification time)
+
+    def _disk_entries(self):
+        if self._disk_index is None:
+            self._disk_index = {}
+            try:
+                for name in os.listdir(self.directory):
+                    if name.endswith('.json'):
+                        size = os.path.getsize(os.path.join(self.directory, name))
+                        self._disk_index[name] = size
+                        self._disk_bytes += size
+            except OSError:
+                pass
+        return self._disk_index
+
+    def _load_from_disk(self, key):
+        name = self._file_name(key)
+        if self.max_disk_bytes <= 0 or name not in self._disk_entries():
+            return None
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError):
+            self._remove_from_disk(name)
+            return None
+        body = stored['body']
+        return CachedResponse(json.loads(body), len(body), stored['expires_at'],
+                              stored.get('etag'), stored.get('last_modified'))
+
+    def _save_to_disk(self, key, entry, body):
+        if self.max_disk_bytes <= 0 or len(body) > self.max_disk_bytes:
+            return
+        name = self._file_name(key)
+        path = os.path.join(self.directory, name)
+        record = json.dumps({
+            'expires_at': entry.expires_at,
+            'etag': entry.etag,
+            'last_modified': entry.last_modified,
+            'body': body
+        })
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(record)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not save response cache: {e}")
+            return
+
+        index = self._disk_entries()
+        self._disk_bytes += len(record) - index.get(name, 0)
+        index[name] = len(record)
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict_from_disk(keep=name)
+
+    def _touch_on_disk(self, key, entry):
+        """Rewrite a revalidated entry's expiry on disk"""
+        name = self._file_name(key)
+        path = os.path.join(self.directory, name)
+        if name not in self._disk_entries():
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            stored.update({'expires_at': entry.expires_at, 'etag': entry.etag,
+                           'last_modified': entry.last_modified})
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(stored, f)
+        except (OSError, ValueError):
+            self._remove_from_disk(name)
+
+    def _evict_from_disk(self, keep):
+        by_age = []
+        for name in self._disk_entries():
+            try:
+                by_age.append((os.path.getmtime(os.path.join(self.directory, name)), name))
+            except OSError:
+                by_age.append((0, name))
+        for _, name in sorted(by_age):
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            if name != keep:
+                self._remove_from_disk(name)
+                self.evictions += 1
+
+    def _remove_from_disk(self, name):
+        self._disk_bytes -= self._disk_entries().pop(name, 0)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'disk_hits': self.disk_hits,
+                'revalidated': self.revalidated,
+                'evictions': self.evictions,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_bytes': self._disk_bytes
+            }
+
+
+# Global instance for easy access
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Get shared ResponseCache instance"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,163 @@
+"""
+Retry policy and circuit breaker for Twitch API calls
+make_twitch_request retries idempotent GETs on timeouts, connection errors,
+429 and 5xx with jittered exponential backoff, waits out Ratelimit-Reset /
+Retry-After on 429, and stops trying once a per-request deadline is spent.
+A shared circuit breaker fails fast while Twitch keeps erroring, so a
+degraded API costs seconds instead of a timeout per game or channel.
+"""
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while the circuit breaker is open"""
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=10.0, max_rate_limit_wait=60.0,
+                 connect_timeout=3.05, read_timeout=10.0, deadline=90.0, seed=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay                  # Cap for backoff between attempts
+        self.max_rate_limit_wait = max_rate_limit_wait  # Cap for waiting out a 429
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline                    # Total seconds one call may take, retries included
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_attempts=int(os.getenv("TWITCH_MAX_ATTEMPTS", "4")),
+            base_delay=float(os.getenv("TWITCH_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.getenv("TWITCH_RETRY_MAX_DELAY", "10")),
+            connect_timeout=float(os.getenv("TWITCH_CONNECT_TIMEOUT", "3.05")),
+            read_timeout=float(os.getenv("TWITCH_READ_TIMEOUT", "10")),
+            deadline=float(os.getenv("TWITCH_REQUEST_DEADLINE", "90"))
+        )
+
+    def timeout(self, read_timeout=None):
+        """(connect, read) timeout for one attempt"""
+        return (self.connect_timeout, read_timeout or self.read_timeout)
+
+    def should_retry(self, method, attempt, status_code=None, error=None):
+        """Whether attempt number `attempt` (1-based) may be followed by another"""
+        if method.upper() not in IDEMPOTENT_METHODS or attempt >= self.max_attempts:
+            return False
+        if error is not None:
+            return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)) \
+                and not isinstance(error, CircuitOpenError)
+        return status_code in RETRY_STATUSES
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff before attempt + 1"""
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def rate_limit_wait(self, response, attempt):
+        """Seconds to wait after a 429, from Retry-After or Ratelimit-Reset when present"""
+        wait = _retry_after_seconds(response.headers.get('Retry-After'))
+        if wait is None and response.headers.get('Ratelimit-Remaining', '0') == '0':
+            # Only an empty bucket means waiting for the reset; otherwise it was a blip
+            reset = response.headers.get('Ratelimit-Reset')
+            try:
+                wait = float(reset) - time.time() if reset else None
+            except ValueError:
+                wait = None
+        if wait is None:
+            return self.backoff(attempt)
+        # Small jitter so clients that hit the same reset don't retry in lockstep
+        return min(self.max_rate_limit_wait, max(0.0, wait) + self._rng.uniform(0, self.base_delay))
+
+
+def _retry_after_seconds(value):
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures, then lets a single
+    trial request through every `reset_timeout` seconds until one succeeds"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = 'closed'   # closed, open, half_open
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            failure_threshold=int(os.getenv("TWITCH_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("TWITCH_BREAKER_RESET", "30"))
+        )
+
+    def before_request(self):
+        """Raise CircuitOpenError instead of sending while the circuit is open"""
+        with self._lock:
+            if self.state == 'closed':
+                return
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # This caller is the trial request (a stuck trial is replaced after another timeout)
+                self.state = 'half_open'
+                self.opened_at = time.monotonic()
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError(f"Twitch API circuit open after repeated failures, retry in {retry_in:.0f}s")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = 'closed'
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'times_opened': self.times_opened,
+                'rejected_calls': self.rejected
+            }
+
+
+def is_breaker_failure(status_code=None, error=None):
+    """Failures that say Twitch itself is unhealthy (not 4xx, not rate limiting)"""
+    if error is not None:
+        return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)) \
+            and not isinstance(error, CircuitOpenError)
+    return status_code is not None and status_code >= 500
+
+
+RETRY_POLICY = RetryPolicy.from_env()
+CIRCUIT_BREAKER = CircuitBreaker.from_env()
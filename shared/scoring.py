@@ -0,0 +1,316 @@
+"""
+Clip scoring and ranking
+Scores a whole candidate set at once over columns (views, age, duration,
+broadcaster and game group ids) instead of one Python key call per clip.
+A scoring config is a dict of components, each turning columns into a
+multiplier for the view count:
+
+    {"age_half_life_hours": 12,            # score halves every 12 hours of clip age
+     "duration_weight": 0.5,               # (duration / 60s, capped at 1) ** 0.5
+     "normalize": ["broadcaster", "game"]} # views scaled by overall mean / group mean
+
+An empty or missing config ranks by raw views. Columns are numpy arrays
+(milliseconds for 100k clips). If numpy is missing, the same columns are
+plain lists: a slower, degraded mode (about 0.2s for 100k clips, fine
+for the few thousand clips a scrape collects).
+More components can be added with register_component().
+"""
+
+import heapq
+import math
+import operator
+from operator import attrgetter
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # Listed in requirements.txt; without it scoring falls back to plain lists
+    np = None
+
+from shared.clip_model import Clip
+
+# Clips at or above this many seconds get the full duration factor
+DURATION_CAP_SECONDS = 60.0
+
+NORMALIZE_GROUPS = ('broadcaster', 'game')
+
+
+class ClipColumns:
+    """Columns of a candidate set, built on first use so unused components cost nothing"""
+
+    def __init__(self, clips, ops, now=None):
+        self.clips = clips
+        self.ops = ops
+        self.now = now or datetime.utcnow()
+        self._columns = {}
+        self._all_clips = all(type(clip) is Clip for clip in clips)
+
+    def _column(self, name, build):
+        if name not in self._columns:
+            self._columns[name] = build()
+        return self._columns[name]
+
+    def _values(self, field, default):
+        """One field of every clip; Clip slots are read directly, which is much faster than .get()"""
+        if self._all_clips:
+            try:
+                return list(map(attrgetter(field), self.clips))
+            except AttributeError:  # Some clip never had the field set
+                return [getattr(clip, field, default) for clip in self.clips]
+        return [clip.get(field, default) for clip in self.clips]
+
+    @property
+    def views(self):
+        return self._column('views', lambda: self.ops.array(self._values('view_count', 0)))
+
+    @property
+    def age_hours(self):
+        return self._column('age_hours', lambda: self.ops.age_hours(self._values('created_at', ''), self.now))
+
+    @property
+    def duration(self):
+        return self._column('duration', lambda: self.ops.array(self._values('duration', 0)))
+
+    def groups(self, field):
+        """(group index per clip, number of groups) for a field like broadcaster_id"""
+        def build():
+            index = {}
+            groups = [index.setdefault(value, len(index)) for value in self._values(field, None)]
+            return self.ops.int_array(groups), len(index)
+        return self._column(f'groups:{field}', build)
+
+
+class ListOps:
+    """Column operations on plain lists (the fallback when numpy is missing; written for CPython speed)"""
+
+    @staticmethod
+    def array(values):
+        return list(map(float, values))
+
+    @staticmethod
+    def int_array(values):
+        return list(values)
+
+    @staticmethod
+    def ones(n):
+        return [1.0] * n
+
+    @staticmethod
+    def age_hours(created_at, now):
+        parse = datetime.fromisoformat
+        try:
+            # Helix times are 'YYYY-MM-DDTHH:MM:SSZ'; the first 19 characters parse without the Z
+            return [(now - parse(value[:19])).total_seconds() / 3600 for value in created_at]
+        except (TypeError, ValueError):
+            pass
+        ages = []
+        for value in created_at:
+            try:
+                ages.append((now - parse(value.rstrip('Z'))).total_seconds() / 3600)
+            except (TypeError, ValueError):
+                ages.append(0.0)
+        return ages
+
+    @staticmethod
+    def multiply(a, b):
+        return list(map(operator.mul, a, b))
+
+    @staticmethod
+    def half_life(ages, half_life):
+        factor = 0.5 ** (1.0 / half_life)  # 0.5 ** (age / half_life) == factor ** age
+        return [factor ** age if age > 0.0 else 1.0 for age in ages]
+
+    @staticmethod
+    def capped_power(values, cap, exponent):
+        return [((value if value < cap else cap) / cap) ** exponent if value > 0.0 else 0.0 for value in values]
+
+    @staticmethod
+    def group_mean_ratio(values, groups, n_groups):
+        totals = [0.0] * n_groups
+        counts = [0] * n_groups
+        for value, group in zip(values, groups):
+            totals[group] += value
+            counts[group] += 1
+        overall = sum(totals) / max(len(values), 1)
+        means = [total / count if total > 0 else overall for total, count in zip(totals, counts)]
+        return [overall / means[group] if means[group] else 1.0 for group in groups]
+
+    @staticmethod
+    def top(scores, k):
+        """Indices of the k highest scores, best first; ties keep the earlier clip"""
+        return heapq.nlargest(k, range(len(scores)), key=scores.__getitem__)
+
+    @staticmethod
+    def to_list(scores):
+        return scores
+
+
+class NumpyOps:
+    """Column operations on numpy arrays"""
+
+    @staticmethod
+    def array(values):
+        return np.asarray(values, dtype=np.float64)
+
+    @staticmethod
+    def int_array(values):
+        return np.asarray(values, dtype=np.int64)
+
+    @staticmethod
+    def ones(n):
+        return np.ones(n)
+
+    @staticmethod
+    def age_hours(created_at, now):
+        try:
+            created = np.array([value.rstrip('Z') for value in created_at], dtype='datetime64[s]')
+        except ValueError:  # Some timestamp numpy can't parse: go clip by clip
+            return np.asarray(ListOps.age_hours(created_at, now))
+        ages = (np.datetime64(now, 's') - created).astype(np.float64) / 3600
+        return np.where(np.isnat(created), 0.0, ages)
+
+    @staticmethod
+    def multiply(a, b):
+        return a * b
+
+    @staticmethod
+    def half_life(ages, half_life):
+        return np.exp2(-np.maximum(ages, 0.0) / half_life)
+
+    @staticmethod
+    def capped_power(values, cap, exponent):
+        return (np.clip(values, 0.0, cap) / cap) ** exponent
+
+    @staticmethod
+    def group_mean_ratio(values, groups, n_groups):
+        totals = np.bincount(groups, weights=values, minlength=n_groups)
+        counts = np.bincount(groups, minlength=n_groups)
+        overall = values.mean() if len(values) else 0.0
+        means = np.where(totals > 0, totals / np.maximum(counts, 1), overall)
+        if overall == 0:
+            return np.ones(len(values))
+        return overall / means[groups]
+
+    @staticmethod
+    def top(scores, k):
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        # Stable sort on the candidates so ties keep the earlier clip
+        return candidates[np.lexsort((candidates, -scores[candidates]))].tolist()
+
+    @staticmethod
+    def to_list(scores):
+        return scores.tolist()
+
+
+def _age_decay(columns, half_life_hours):
+    return columns.ops.half_life(columns.age_hours, float(half_life_hours))
+
+
+def _duration(columns, weight):
+    return columns.ops.capped_power(columns.duration, DURATION_CAP_SECONDS, float(weight))
+
+
+def _normalize(columns, groups):
+    factor = columns.ops.ones(len(columns.clips))
+    for group in [groups] if isinstance(groups, str) else groups:
+        ids, n_groups = columns.groups('broadcaster_id' if group == 'broadcaster' else 'game_id')
+        factor = columns.ops.multiply(factor, columns.ops.group_mean_ratio(columns.views, ids, n_groups))
+    return factor
+
+
+# Config key -> (component(columns, value) returning a multiplier column, validator returning an error or None)
+COMPONENTS = {}
+
+
+def register_component(key, component, validate=None):
+    """Add a scoring component, configured by `key` in the scoring config"""
+    COMPONENTS[key] = (component, validate)
+
+
+def _positive_number(key):
+    def validate(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            return f'{key} must be a positive number'
+        return None
+    return validate
+
+
+def _validate_normalize(value):
+    groups = [value] if isinstance(value, str) else value
+    if not isinstance(groups, list) or not all(group in NORMALIZE_GROUPS for group in groups):
+        return f"normalize must be one of, or a list of, {', '.join(NORMALIZE_GROUPS)}"
+    return None
+
+
+register_component('age_half_life_hours', _age_decay, _positive_number('age_half_life_hours'))
+register_component('duration_weight', _duration, _positive_number('duration_weight'))
+register_component('normalize', _normalize, _validate_normalize)
+
+
+def validate_scoring(scoring):
+    """Error message for an invalid scoring config, None if it is valid"""
+    if scoring is None:
+        return None
+    if not isinstance(scoring, dict):
+        return 'scoring must be an object'
+    for key, value in scoring.items():
+        if key not in COMPONENTS:
+            return f"Unknown scoring option '{key}' (options: {', '.join(COMPONENTS)})"
+        validate = COMPONENTS[key][1]
+        error = validate(value) if validate else None
+        if error:
+            return error
+    return None
+
+
+def uses_scoring(scoring):
+    """False for configs that rank by raw views, so callers can keep their streaming top-K"""
+    return bool(scoring)
+
+
+_warned_without_numpy = False
+
+
+def _ops(scoring=None):
+    global _warned_without_numpy
+    if np is not None:
+        return NumpyOps
+    if uses_scoring(scoring) and not _warned_without_numpy:
+        _warned_without_numpy = True
+        print("⚠️ numpy is not installed: scoring runs on plain Python lists (slower; pip install numpy)")
+    return ListOps
+
+
+def score_clips(clips, scoring=None, now=None):
+    """Score for every clip, in order; raw views when scoring is empty"""
+    ops = _ops(scoring)
+    columns = ClipColumns(clips, ops, now)
+    scores = columns.views
+    for key, value in (scoring or {}).items():
+        scores = ops.multiply(scores, COMPONENTS[key][0](columns, value))
+    return scores
+
+
+def rank_clips(clips, limit=None, scoring=None, now=None):
+    """
+    The `limit` best clips by score, best first (all of them when limit is None).
+    With a scoring config each returned clip carries its score.
+    """
+    clips = list(clips)
+    if not clips:
+        return []
+    scores = score_clips(clips, scoring, now)
+    ops = _ops()
+    order = ops.top(scores, len(clips) if limit is None else limit)
+    if not uses_scoring(scoring):
+        return [clips[i] for i in order]
+    scores = ops.to_list(scores)
+    ranked = []
+    for i in order:
+        clip = clips[i]
+        clip['score'] = round(scores[i], 2) if math.isfinite(scores[i]) else 0.0
+        ranked.append(clip)
+    return ranked
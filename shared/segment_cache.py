@@ -0,0 +1,232 @@
+"""
+Time-segment cache for Helix clip queries
+Splits a started_at/ended_at window into aligned segments that are cached
+per game/channel, so overlapping days_back windows reuse each other's work
+"""
+
+import contextvars
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from shared.auth import make_twitch_request, HELIX_URL, HELIX_TIME_FORMAT
+from shared.topk import TopKAccumulator
+from shared.sharding import MAX_SHARD_WORKERS
+from shared.metrics import register_cache_stats
+
+# Where segments are persisted between runs (one file per game/channel)
+SEGMENT_CACHE_DIR = os.getenv("TWITCH_SEGMENT_CACHE_DIR", os.path.join(".scraper_state", "segments"))
+
+# Segment size in hours; segments are aligned to UTC midnight
+SEGMENT_HOURS = int(os.getenv("TWITCH_SEGMENT_HOURS", "6"))
+
+# Games/channels whose segments stay in memory; older ones are reloaded from disk when asked for again
+SEGMENT_CACHE_MAX_KEYS = int(os.getenv("TWITCH_SEGMENT_CACHE_MAX_KEYS", "256"))
+
+# Helix maximum, so a cached segment can serve any smaller limit later
+SEGMENT_CLIP_LIMIT = 100
+
+# (max age of segment end, TTL) - older segments change less, so keep them longer
+SEGMENT_TTL_RULES = [
+    (timedelta(0), timedelta(minutes=5)),       # still open
+    (timedelta(days=1), timedelta(minutes=30)),  # views still climbing fast
+    (timedelta(days=3), timedelta(hours=2)),
+    (None, timedelta(hours=12))
+]
+
+
+def segment_ttl(segment_end, now):
+    """Pick a TTL for a segment based on how long ago it ended"""
+    age = now - segment_end
+    for max_age, ttl in SEGMENT_TTL_RULES:
+        if max_age is None or age < max_age:
+            return ttl
+    return SEGMENT_TTL_RULES[-1][1]
+
+
+class SegmentCache:
+    def __init__(self, directory=SEGMENT_CACHE_DIR, segment_hours=SEGMENT_HOURS, max_keys=SEGMENT_CACHE_MAX_KEYS):
+        self.directory = directory
+        self.segment_size = timedelta(hours=segment_hours)
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> {segment_start_iso: {'fetched_at': iso, 'clips': [...]}}, LRU order
+        self.hits = 0
+        self.misses = 0
+
+    def _path_for(self, key):
+        safe_key = re.sub(r'[^A-Za-z0-9_.-]', '_', key)
+        return os.path.join(self.directory, f"{safe_key}.json")
+
+    def _segments_for_key(self, key):
+        """Load a key's segments from disk the first time it's used (call with _lock held)"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            segments = {}
+            path = self._path_for(key)
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        segments = json.load(f)
+                except (OSError, ValueError):
+                    print(f"⚠️ Ignoring unreadable segment cache: {path}")
+            self._entries[key] = segments
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        return self._entries[key]
+
+    def _save(self, key):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path_for(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries[key], f)
+        os.replace(tmp_path, path)
+
+    def align(self, moment):
+        """Round a datetime down to the start of its segment"""
+        midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        offset = (moment - midnight) // self.segment_size
+        return midnight + offset * self.segment_size
+
+    def segments_for(self, start_time, end_time):
+        """List the (segment_start, segment_end) pairs covering a window"""
+        segments = []
+        segment_start = self.align(start_time)
+        while segment_start < end_time:
+            segments.append((segment_start, segment_start + self.segment_size))
+            segment_start += self.segment_size
+        return segments
+
+    def get(self, key, segment_start, segment_end, now):
+        """Return cached clips for a segment, or None if missing or expired"""
+        cached = self._lookup(key, segment_start, segment_end, now)
+        return cached[0] if cached else None
+
+    def _lookup(self, key, segment_start, segment_end, now):
+        """(clips, fetched_at) for a cached segment, or None if missing or expired"""
+        with self._lock:
+            entry = self._segments_for_key(key).get(segment_start.strftime(HELIX_TIME_FORMAT))
+
+        fresh = False
+        if entry:
+            fetched_at = datetime.strptime(entry['fetched_at'], HELIX_TIME_FORMAT)
+            fresh = now - fetched_at < segment_ttl(segment_end, now)
+
+        # API jobs look segments up from several threads at once
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return (entry['clips'], fetched_at) if fresh else None
+
+    def put(self, key, segment_start, clips, fetched_at):
+        """Store clips for a segment and drop segments nobody can ask for anymore"""
+        with self._lock:
+            segments = self._segments_for_key(key)
+            segments[segment_start.strftime(HELIX_TIME_FORMAT)] = {
+                'fetched_at': fetched_at.strftime(HELIX_TIME_FORMAT),
+                'clips': clips
+            }
+
+            # The API never looks back more than 30 days
+            oldest = (fetched_at - timedelta(days=31)).strftime(HELIX_TIME_FORMAT)
+            for stale in [s for s in segments if s < oldest]:
+                del segments[stale]
+
+            try:
+                self._save(key)
+            except OSError as e:
+                print(f"⚠️ Could not save segment cache: {e}")
+
+    def fetch_window(self, key, params, start_time, end_time, first, shards=1, fetched_at=None):
+        """
+        Get the top `first` clips for a window, reusing cached segments and
+        only requesting the missing ones from Helix.
+        `params` identifies the scope, e.g. {'game_id': ...} or {'broadcaster_id': ...}
+        With shards > 1 up to that many missing segments are fetched in parallel.
+        A `fetched_at` dict is filled with clip id -> when Helix returned that
+        clip's view count (long ago for clips served from the cache).
+        """
+        now = datetime.utcnow()
+        url = f'{HELIX_URL}/clips'
+        segments = self.segments_for(start_time, end_time)
+        cached = {}
+        segment_times = {}
+        for segment_start, segment_end in segments:
+            hit = self._lookup(key, segment_start, segment_end, now)
+            cached[segment_start] = hit[0] if hit else None
+            segment_times[segment_start] = hit[1] if hit else now
+        missing = [(segment_start, segment_end) for segment_start, segment_end in segments
+                   if cached[segment_start] is None]
+
+        def fetch_segment(segment):
+            segment_start, segment_end = segment
+            segment_params = dict(params)
+            segment_params.update({
+                'started_at': segment_start.strftime(HELIX_TIME_FORMAT),
+                'ended_at': min(segment_end, now).strftime(HELIX_TIME_FORMAT),
+                'first': SEGMENT_CLIP_LIMIT
+            })
+            data = make_twitch_request(url, segment_params)
+            clips = data.get('data', [])
+            self.put(key, segment_start, clips, now)
+            return clips
+
+        workers = min(len(missing), max(1, shards), MAX_SHARD_WORKERS)
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # Each segment runs in a copy of the caller's context so per-run metrics still see it
+                futures = [pool.submit(contextvars.copy_context().run, fetch_segment, segment) for segment in missing]
+                for segment, future in zip(missing, futures):
+                    cached[segment[0]] = future.result()
+        else:
+            for segment in missing:
+                cached[segment[0]] = fetch_segment(segment)
+
+        # Edge segments stick out of the window, keep only clips inside it
+        window_clips = TopKAccumulator(first)
+        started_at = start_time.strftime(HELIX_TIME_FORMAT)
+        ended_at = end_time.strftime(HELIX_TIME_FORMAT)
+        for segment_start, _ in segments:
+            for clip in cached[segment_start]:
+                if started_at <= clip.get('created_at', '') <= ended_at:
+                    window_clips.add(clip)
+                    if fetched_at is not None:
+                        fetched_at[clip.get('id')] = segment_times[segment_start]
+
+        if segments:
+            print(f"🧩 {key}: {len(segments) - len(missing)}/{len(segments)} segments from cache")
+
+        return window_clips.results()
+
+    def stats(self):
+        """Hit/miss counters since startup"""
+        with self._lock:
+            hits, misses, keys = self.hits, self.misses, len(self._entries)
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'keys_in_memory': keys,
+            'hit_ratio': hits / lookups if lookups else 0.0
+        }
+
+
+# Global instance for easy access
+_segment_cache = None
+
+def get_segment_cache():
+    """Get shared SegmentCache instance"""
+    global _segment_cache
+    if _segment_cache is None:
+        _segment_cache = SegmentCache()
+    return _segment_cache
+
+register_cache_stats('segment', lambda: get_segment_cache().stats())
@@ -0,0 +1,79 @@
+"""
+Time-window sharding for Helix clip queries
+One /helix/clips call only returns the top slice of a window, so busy
+categories are split into sub-windows that are fetched concurrently
+and merged back together by view count
+"""
+
+import contextvars
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+
+from shared.auth import make_twitch_request, HELIX_URL, HELIX_TIME_FORMAT
+
+# Upper bounds so a typo can't fire hundreds of parallel requests
+MAX_SHARDS = 48
+MAX_SHARD_WORKERS = 8
+
+
+def split_window(start_time, end_time, shards):
+    """Split [start_time, end_time] into `shards` equal, back-to-back sub-windows"""
+    shards = max(1, min(shards, MAX_SHARDS))
+    step = (end_time - start_time) / shards
+    windows = []
+    for i in range(shards):
+        shard_start = start_time + step * i
+        shard_end = end_time if i == shards - 1 else start_time + step * (i + 1)
+        windows.append((shard_start, shard_end))
+    return windows
+
+
+def merge_by_views(clip_lists, limit=None):
+    """
+    k-way merge of clip lists that are each sorted by view_count (highest first).
+    Duplicate clip ids (e.g. a clip on a shard boundary) are kept once.
+    """
+    merged = []
+    seen_ids = set()
+    for clip in heapq.merge(*clip_lists, key=lambda x: x.get('view_count', 0), reverse=True):
+        clip_id = clip.get('id')
+        if clip_id in seen_ids:
+            continue
+        seen_ids.add(clip_id)
+        merged.append(clip)
+        if limit is not None and len(merged) >= limit:
+            break
+    return merged
+
+
+def fetch_sharded(params, start_time, end_time, shards, first):
+    """
+    Fetch the top `first` clips of a window by querying `shards` sub-windows in parallel.
+    `params` identifies the scope, e.g. {'game_id': ...} or {'broadcaster_id': ...}
+    """
+    url = f'{HELIX_URL}/clips'
+    windows = split_window(start_time, end_time, shards)
+
+    def fetch_shard(window):
+        shard_start, shard_end = window
+        shard_params = dict(params)
+        shard_params.update({
+            'started_at': shard_start.strftime(HELIX_TIME_FORMAT),
+            'ended_at': shard_end.strftime(HELIX_TIME_FORMAT),
+            'first': min(first, 100)  # API max is 100 per request
+        })
+        try:
+            data = make_twitch_request(url, shard_params)
+        except Exception as e:
+            # One bad shard shouldn't throw away the rest of the window
+            print(f"⚠️ Exception fetching shard {shard_params['started_at']}: {e}")
+            return []
+        # Sort a copy: coalesced and cached responses share the same data list
+        return sorted(data.get('data', []), key=lambda x: x.get('view_count', 0), reverse=True)
+
+    with ThreadPoolExecutor(max_workers=min(len(windows), MAX_SHARD_WORKERS)) as pool:
+        # Each shard runs in a copy of the caller's context so per-run metrics still see it
+        futures = [pool.submit(contextvars.copy_context().run, fetch_shard, window) for window in windows]
+        shard_results = [future.result() for future in futures]
+
+    return merge_by_views(shard_results, limit=first)
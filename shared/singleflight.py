@@ -0,0 +1,80 @@
+"""
+Single-flight coalescing of identical in-flight requests
+When several threads (e.g. two API jobs) ask for the same URL and params at
+the same moment, only the first one goes to the network; the others wait for
+it and get the same parsed response. Nothing is kept once the call finishes,
+so this never serves stale data - caching is a separate layer.
+"""
+
+import threading
+
+from shared.tracing import span
+
+
+def request_key(url, params=None):
+    """Key for a GET: URL plus params with keys sorted and values as strings.
+    Repeated values (id=1&id=2) keep their order, since it is part of the request."""
+    if not params:
+        return (url, ())
+    items = params.items() if isinstance(params, dict) else params
+    normalized = {}
+    for key, value in items:
+        values = value if isinstance(value, (list, tuple)) else [value]
+        normalized.setdefault(str(key), []).extend(str(v) for v in values)
+    return (url, tuple((key, tuple(values)) for key, values in sorted(normalized.items())))
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0   # Calls that went to the network
+        self.coalesced = 0  # Calls that reused another caller's in-flight result
+
+    def do(self, key, func):
+        """Run func() for key, or wait for the identical call already running.
+        Returns (result, shared); a shared result must be treated as read-only."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            with span('coalesced_wait'):
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.coalesced,
+                'misses': self.executed,
+                'in_flight': len(self._calls)
+            }
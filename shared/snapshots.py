@@ -0,0 +1,218 @@
+"""
+View-count snapshots and trending ranking
+Every top clips scrape records the view counts it saw in a small SQLite
+time series (one row per clip per scrape that saw it), so clips can later be
+ranked by how fast they are gaining views instead of by raw views, which
+always favors the oldest clips in a window.
+The trending ranking runs as one query: SQLite pivots each clip's latest
+snapshots, computes views per hour and its acceleration for the whole
+candidate set, and returns the top rows, with no new Helix calls.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from shared.clip_model import Clip, json_ready
+from shared.watermarks import parse_helix_time
+
+SNAPSHOTS_ENABLED = os.getenv("TWITCH_SNAPSHOTS", "1") != "0"
+
+# Where snapshots are kept between runs
+SNAPSHOT_DB = os.getenv("TWITCH_SNAPSHOT_DB", os.path.join(".scraper_state", "snapshots.db"))
+
+# Clips created longer ago than this are dropped, with their snapshots (days_back is at most 30)
+RETENTION_DAYS = 31
+
+# Trending score = views/hour projected this many hours ahead using the acceleration
+TRENDING_HORIZON_HOURS = 1.0
+
+# Shortest interval (seconds) a rate is measured over, so two close snapshots can't blow up the score
+MIN_INTERVAL_SECONDS = 60
+
+# A clip seen in only one scrape is rated by its lifetime average, over at least this many seconds
+MIN_LIFETIME_SECONDS = 3600
+
+TRENDING_QUERY = '''
+    WITH recent AS (
+        SELECT s.clip_id, s.taken_at, s.view_count,
+               ROW_NUMBER() OVER (PARTITION BY s.clip_id ORDER BY s.taken_at DESC) AS n
+        FROM snapshots s JOIN clips c ON c.id = s.clip_id
+        WHERE c.created_ts >= :cutoff {filters}
+    ),
+    latest AS (
+        SELECT clip_id,
+               MAX(CASE WHEN n = 1 THEN taken_at END) AS t1,
+               MAX(CASE WHEN n = 1 THEN view_count END) AS v1,
+               MAX(CASE WHEN n = 2 THEN taken_at END) AS t2,
+               MAX(CASE WHEN n = 2 THEN view_count END) AS v2,
+               MAX(CASE WHEN n = 3 THEN taken_at END) AS t3,
+               MAX(CASE WHEN n = 3 THEN view_count END) AS v3
+        FROM recent WHERE n <= 3 GROUP BY clip_id
+    ),
+    rates AS (
+        SELECT c.data, l.v1,
+               CASE WHEN l.t2 IS NULL
+                    THEN l.v1 * 3600.0 / MAX(l.t1 - c.created_ts, :min_lifetime)
+                    ELSE (l.v1 - l.v2) * 3600.0 / MAX(l.t1 - l.t2, :min_interval) END AS velocity,
+               CASE WHEN l.t3 IS NULL THEN 0.0
+                    ELSE ((l.v1 - l.v2) * 3600.0 / MAX(l.t1 - l.t2, :min_interval)
+                          - (l.v2 - l.v3) * 3600.0 / MAX(l.t2 - l.t3, :min_interval))
+                         * 3600.0 / MAX((l.t1 - l.t3) / 2.0, :min_interval) END AS acceleration
+        FROM latest l JOIN clips c ON c.id = l.clip_id
+    )
+    SELECT data, v1, velocity, acceleration, velocity + :horizon * acceleration AS score
+    FROM rates ORDER BY score DESC LIMIT :limit
+'''
+
+
+class SnapshotStore:
+    """View-count time series in SQLite; every call opens its own connection, so worker processes can share it"""
+
+    def __init__(self, path=SNAPSHOT_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    self._create(conn)
+                    self._ready = True
+        return conn
+
+    def _create(self, conn):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Latest metadata per clip; checked_at is when a scrape last saw it
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS clips (
+                    id TEXT PRIMARY KEY,
+                    created_ts INTEGER NOT NULL,
+                    game_name TEXT,
+                    english INTEGER,
+                    checked_at INTEGER NOT NULL,
+                    data TEXT NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS clips_created ON clips (created_ts)')
+            # The time series: three integers per row, clustered by clip
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    clip_id TEXT NOT NULL,
+                    taken_at INTEGER NOT NULL,
+                    view_count INTEGER NOT NULL,
+                    PRIMARY KEY (clip_id, taken_at)
+                ) WITHOUT ROWID
+            ''')
+            cutoff = int(time.time()) - RETENTION_DAYS * 86400
+            conn.execute('DELETE FROM snapshots WHERE clip_id IN (SELECT id FROM clips WHERE created_ts < ?)',
+                         (cutoff,))
+            conn.execute('DELETE FROM clips WHERE created_ts < ?', (cutoff,))
+
+    def record(self, clips, english=None, taken_at=None, fetched_at=None):
+        """
+        Store the view counts of scraped clips.
+        english=True marks clips that passed the English filter.
+        fetched_at maps clip id -> when Helix returned the count (a datetime,
+        e.g. the segment cache's fetch time); other clips use taken_at (now).
+        Every count is stored, unchanged ones too, so clips that stop gaining
+        views slow down. A count at or before a clip's latest snapshot time is
+        a replay from a cache and is skipped.
+        """
+        taken_at = int(taken_at or time.time())
+        fetched_at = fetched_at or {}
+        rows = []
+        for clip in clips:
+            created_at = parse_helix_time(clip.get('created_at'))
+            if not clip.get('id') or created_at is None:
+                continue
+            fetched = fetched_at.get(clip['id'])
+            clip_taken_at = int((fetched - datetime(1970, 1, 1)).total_seconds()) if fetched else taken_at
+            rows.append((clip['id'], int((created_at - datetime(1970, 1, 1)).total_seconds()),
+                         clip.get('game_name'), 1 if english else None, clip_taken_at,
+                         json.dumps(json_ready(clip)), clip.get('view_count', 0)))
+        if not rows:
+            return 0
+
+        with closing(self._connect()) as conn, conn:
+            conn.executemany('''
+                INSERT INTO clips (id, created_ts, game_name, english, checked_at, data)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    game_name = COALESCE(excluded.game_name, game_name),
+                    english = COALESCE(excluded.english, english),
+                    checked_at = MAX(checked_at, excluded.checked_at),
+                    data = excluded.data
+            ''', [row[:6] for row in rows])
+            before = conn.total_changes
+            conn.executemany('''
+                INSERT OR IGNORE INTO snapshots (clip_id, taken_at, view_count)
+                SELECT ?1, ?2, ?3
+                WHERE ?2 > COALESCE((SELECT MAX(taken_at) FROM snapshots WHERE clip_id = ?1), -1)
+            ''', [(row[0], row[4], row[6]) for row in rows])
+            return conn.total_changes - before
+
+    def trending(self, days_back=1, limit=150, english_only=True, game_filter=None, now=None):
+        """
+        Clips created in the last days_back days, fastest-rising first.
+        Each clip gets views_per_hour (over its last two snapshots, or its
+        lifetime if it was only seen once) and view_acceleration (change in
+        views per hour, per hour, over its last three snapshots).
+        """
+        now = now or datetime.utcnow()
+        filters = ''
+        params = {
+            'cutoff': int((now - timedelta(days=days_back) - datetime(1970, 1, 1)).total_seconds()),
+            'limit': limit,
+            'horizon': TRENDING_HORIZON_HOURS,
+            'min_interval': MIN_INTERVAL_SECONDS,
+            'min_lifetime': MIN_LIFETIME_SECONDS
+        }
+        if english_only:
+            filters += ' AND c.english = 1'
+        if game_filter:
+            filters += ' AND c.game_name = :game COLLATE NOCASE'
+            params['game'] = game_filter
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(TRENDING_QUERY.format(filters=filters), params).fetchall()
+
+        clips = []
+        for data, views, velocity, acceleration, _ in rows:
+            clip = Clip.from_helix(json.loads(data))
+            clip['view_count'] = views
+            clip['views_per_hour'] = round(velocity, 1)
+            clip['view_acceleration'] = round(acceleration, 1)
+            clips.append(clip)
+        return clips
+
+
+def record_snapshots(clips, english=None, fetched_at=None):
+    """Record a scrape's view counts; never lets a snapshot problem fail the scrape"""
+    if not SNAPSHOTS_ENABLED or not clips:
+        return
+    try:
+        get_snapshot_store().record(clips, english=english, fetched_at=fetched_at)
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not record view-count snapshots: {e}")
+
+
+# Global instance for easy access
+_snapshot_store = None
+
+def get_snapshot_store():
+    """Get shared SnapshotStore instance"""
+    global _snapshot_store
+    if _snapshot_store is None:
+        _snapshot_store = SnapshotStore()
+    return _snapshot_store
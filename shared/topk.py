@@ -0,0 +1,95 @@
+"""
+Bounded top-K accumulator for clips
+Keeps the K highest-scoring clips seen so far in a min-heap, so results can
+be merged as they stream in from each game or channel instead of collecting
+everything and sorting it at the end
+"""
+
+import heapq
+from itertools import count
+
+
+def view_count_key(clip):
+    """Default ranking: raw view count"""
+    return clip.get('view_count', 0)
+
+
+class TopKAccumulator:
+    def __init__(self, k, key=view_count_key):
+        self.k = k
+        self.key = key
+        self._heap = []       # min-heap of [score, -order, clip]; the root is the first to go
+        self._members = {}    # clip id -> heap entry, only for clips currently kept
+        self._size = 0        # live entries; replaced entries stay in the heap with clip None until popped
+        self._order = count()
+        self.seen = 0         # clips offered
+        self.duplicates = 0   # clips skipped because their id was already kept
+
+    def add(self, clip):
+        """Offer one clip; returns True if it is currently in the top K"""
+        self.seen += 1
+        if self.k <= 0:
+            return False
+
+        score = self.key(clip)
+        clip_id = clip.get('id')
+
+        existing = self._members.get(clip_id) if clip_id is not None else None
+        if existing is not None:
+            self.duplicates += 1
+            if score <= existing[0]:
+                return True
+            # Same clip with a fresher count: retire the old entry and push a new one
+            # (O(log K), where re-heapifying after an in-place update is O(K))
+            existing[2] = None
+            entry = [score, existing[1], clip]
+            heapq.heappush(self._heap, entry)
+            self._members[clip_id] = entry
+            if len(self._heap) > 2 * self._size + 16:
+                self._compact()
+            return True
+
+        # Ties keep the clip that arrived first, like a stable sort would
+        entry = [score, -next(self._order), clip]
+        self._drop_retired_root()
+        if self._size < self.k:
+            heapq.heappush(self._heap, entry)
+            self._size += 1
+        elif entry[:2] > self._heap[0][:2]:
+            evicted = heapq.heapreplace(self._heap, entry)
+            self._members.pop(evicted[2].get('id'), None)
+        else:
+            return False
+
+        if clip_id is not None:
+            self._members[clip_id] = entry
+        return True
+
+    def _drop_retired_root(self):
+        """Pop replaced entries off the root so it is the lowest kept clip"""
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+
+    def _compact(self):
+        """Drop all replaced entries once they make up most of the heap"""
+        self._heap = [entry for entry in self._heap if entry[2] is not None]
+        heapq.heapify(self._heap)
+
+    def extend(self, clips):
+        """Offer every clip from an iterable"""
+        for clip in clips:
+            self.add(clip)
+        return self
+
+    def results(self):
+        """The kept clips, highest score first"""
+        live = [entry for entry in self._heap if entry[2] is not None]
+        return [entry[2] for entry in sorted(live, key=lambda e: e[:2], reverse=True)]
+
+    def __len__(self):
+        return self._size
+
+
+def top_k(clips, k, key=view_count_key):
+    """One-shot helper: the K highest-scoring unique clips, highest first"""
+    return TopKAccumulator(k, key=key).extend(clips).results()
@@ -0,0 +1,192 @@
+"""
+Lightweight span tracing for scraping runs
+Records where a run spends its time (game lookups, clip pages, /users
+enrichment, language filtering, sleeps, sorting, exporting) as nested spans.
+Tracing is only active inside trace_run(); everywhere else span() and
+@traced cost a single context-variable lookup.
+"""
+
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Keep a runaway job from holding unbounded spans
+MAX_SPANS = 50000
+
+_current_tracer = contextvars.ContextVar('scraper_tracer', default=None)
+_current_span = contextvars.ContextVar('scraper_span', default=None)
+
+
+class Span:
+    __slots__ = ('id', 'parent_id', 'name', 'start', 'end', 'thread_id', 'attributes')
+
+    def __init__(self, span_id, parent_id, name, attributes):
+        self.id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.end = None
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+
+class Tracer:
+    def __init__(self, name='run'):
+        self.name = name
+        self.origin = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def _start_span(self, name, attributes):
+        parent = _current_span.get()
+        with self._lock:
+            if len(self.spans) >= MAX_SPANS:
+                self.dropped += 1
+                return None
+            span = Span(self._next_id, parent.id if parent else None, name, attributes)
+            self._next_id += 1
+            self.spans.append(span)
+        return span
+
+    def to_dict(self):
+        """Spans as plain dicts, times in milliseconds from the start of the run"""
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            'name': self.name,
+            'started_at': self.started_at,
+            'dropped_spans': self.dropped,
+            'spans': [
+                {
+                    'id': span.id,
+                    'parent_id': span.parent_id,
+                    'name': span.name,
+                    'start_ms': round((span.start - self.origin) * 1000, 3),
+                    'duration_ms': round(span.duration * 1000, 3),
+                    'thread_id': span.thread_id,
+                    'attributes': span.attributes
+                }
+                for span in spans
+            ]
+        }
+
+    def summary(self):
+        """Total time and count per span name, slowest first"""
+        totals = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            entry = totals.setdefault(span.name, {'count': 0, 'total_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] += span.duration * 1000
+        return sorted(
+            ({'name': name, 'count': e['count'], 'total_ms': round(e['total_ms'], 3)} for name, e in totals.items()),
+            key=lambda item: item['total_ms'], reverse=True
+        )
+
+    def to_chrome_trace(self):
+        """Chrome trace-event format (load in chrome://tracing or Perfetto)"""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+        events = [{
+            'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': self.name}
+        }]
+        for span in spans:
+            events.append({
+                'name': span.name,
+                'cat': span.name.split(':', 1)[0],
+                'ph': 'X',
+                'ts': round((span.start - self.origin) * 1e6, 1),
+                'dur': round(span.duration * 1e6, 1),
+                'pid': pid,
+                'tid': span.thread_id,
+                'args': span.attributes
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+class _NoopSpan:
+    """Shared do-nothing context manager used when tracing is off"""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ('tracer', 'name', 'attributes', 'span', 'token')
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.span = self.tracer._start_span(self.name, self.attributes)
+        self.token = _current_span.set(self.span) if self.span else None
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span:
+            self.span.end = time.perf_counter()
+            if exc_type is not None:
+                self.span.attributes['error'] = exc_type.__name__
+            _current_span.reset(self.token)
+        return False
+
+
+def span(name, **attributes):
+    """Time a block as a span of the active trace (no-op when not tracing)"""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        return _NOOP_SPAN
+    return _ActiveSpan(tracer, name, attributes)
+
+
+def traced(name=None):
+    """Decorator: record each call of the function as a span"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _current_tracer.get()
+            if tracer is None:
+                return func(*args, **kwargs)
+            with _ActiveSpan(tracer, span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def tracing_enabled():
+    return _current_tracer.get() is not None
+
+
+@contextmanager
+def trace_run(name='run'):
+    """Trace everything inside this block (and threads started with its context)"""
+    tracer = Tracer(name)
+    tracer_token = _current_tracer.set(tracer)
+    span_token = _current_span.set(None)
+    try:
+        yield tracer
+    finally:
+        _current_span.reset(span_token)
+        _current_tracer.reset(tracer_token)
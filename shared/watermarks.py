@@ -0,0 +1,180 @@
+"""
+Watermark store for incremental scraping
+Remembers when each game/channel was last scraped and which clips it returned,
+so the next run only has to ask Helix for the time since then
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from shared.auth import make_twitch_request, HELIX_URL, HELIX_TIME_FORMAT
+from shared.topk import top_k
+from shared.clip_model import Clip, json_ready
+
+# Where watermarks are persisted between runs
+WATERMARK_FILE = os.getenv("TWITCH_WATERMARK_FILE", os.path.join(".scraper_state", "watermarks.json"))
+
+# Re-fetch a little before the last watermark so late-indexed clips aren't missed
+DEFAULT_OVERLAP = timedelta(minutes=15)
+
+
+def parse_helix_time(value):
+    """Parse a Helix timestamp (e.g. created_at) into a naive UTC datetime"""
+    try:
+        return datetime.strptime(value, HELIX_TIME_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+class WatermarkStore:
+    def __init__(self, path=WATERMARK_FILE, overlap=DEFAULT_OVERLAP):
+        self.path = path
+        self.overlap = overlap
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self):
+        """Load persisted watermarks, starting fresh if the file is missing or corrupt"""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠️ Ignoring unreadable watermark file: {self.path}")
+            return {}
+
+    def _save(self):
+        """Write watermarks atomically so a crash never leaves a half-written file"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+    def resume_window(self, key, start_time, limit):
+        """
+        Work out where an incremental fetch should start.
+        Returns (fetch_start, previous_clips) where previous_clips are the
+        clips from the last run that still fall inside the requested window.
+        The last run's clips are only reused if they were the top `limit` (or
+        more) of a window of the same length starting no later than this one;
+        a wider, narrower or deeper request starts over with a full fetch.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if not entry:
+            return start_time, []
+
+        covered_from = parse_helix_time(entry.get('covered_from'))
+        if not covered_from or start_time < covered_from or limit > entry.get('limit', 0):
+            # Older than what the last run looked at, or more clips than it kept
+            return start_time, []
+
+        watermark = parse_helix_time(entry.get('watermark'))
+        if not watermark or watermark <= start_time:
+            # Last run is older than the window, nothing to reuse
+            return start_time, []
+
+        if datetime.utcnow() - start_time < watermark - covered_from - self.overlap:
+            # A narrower window's top clips aren't the last run's top clips that fall inside it
+            return start_time, []
+
+        fetch_start = max(start_time, watermark - self.overlap)
+        previous_clips = []
+        for clip in entry.get('clips', []):
+            created_at = parse_helix_time(clip.get('created_at'))
+            if created_at and created_at >= start_time:
+                previous_clips.append(Clip.from_helix(clip))
+
+        return fetch_start, previous_clips
+
+    def update(self, key, watermark, clips, covered_from, limit):
+        """Record the window just fetched ([covered_from, watermark], top `limit`) and the clips it produced"""
+        with self._lock:
+            self._entries[key] = {
+                'watermark': watermark.strftime(HELIX_TIME_FORMAT),
+                'covered_from': covered_from.strftime(HELIX_TIME_FORMAT),
+                'limit': limit,
+                'clips': json_ready(clips)
+            }
+            try:
+                self._save()
+            except OSError as e:
+                print(f"⚠️ Could not save watermarks: {e}")
+
+    def clear(self, key=None):
+        """Forget one watermark, or all of them"""
+        with self._lock:
+            if key is None:
+                self._entries = {}
+            else:
+                self._entries.pop(key, None)
+            try:
+                self._save()
+            except OSError as e:
+                print(f"⚠️ Could not save watermarks: {e}")
+
+
+def refresh_clip_view_counts(clips):
+    """Update view_count in place for clips fetched in an earlier run"""
+    clip_ids = [clip['id'] for clip in clips if clip.get('id')]
+    if not clip_ids:
+        return clips
+
+    url = f'{HELIX_URL}/clips'
+    latest_views = {}
+
+    # Process in chunks of 100 (API limit)
+    for i in range(0, len(clip_ids), 100):
+        chunk = clip_ids[i:i+100]
+        try:
+            data = make_twitch_request(url, {'id': chunk})
+            for clip in data.get('data', []):
+                latest_views[clip['id']] = clip.get('view_count', 0)
+        except Exception as e:
+            print(f"⚠️ Exception refreshing view counts: {e}")
+
+    for clip in clips:
+        if clip.get('id') in latest_views:
+            clip['view_count'] = latest_views[clip['id']]
+
+    return clips
+
+
+def merge_incremental(previous_clips, new_clips, limit):
+    """
+    Merge clips from the last run with freshly fetched ones.
+    Only previous clips that could still make the top `limit` get their
+    view counts refreshed; fresh clips win when the same id shows up twice.
+    """
+    merged = {}
+    for clip in previous_clips:
+        merged[clip.get('id')] = clip
+    for clip in new_clips:
+        merged[clip.get('id')] = clip
+
+    candidates = top_k(merged.values(), limit)
+
+    new_ids = set(clip.get('id') for clip in new_clips)
+    still_in_running = [clip for clip in candidates if clip.get('id') not in new_ids]
+    if still_in_running:
+        refresh_clip_view_counts(still_in_running)
+
+    return sorted(candidates, key=lambda x: x.get('view_count', 0), reverse=True)
+
+
+# Global instance for easy access
+_watermark_store = None
+
+def get_watermark_store():
+    """Get shared WatermarkStore instance"""
+    global _watermark_store
+    if _watermark_store is None:
+        _watermark_store = WatermarkStore()
+    return _watermark_store